@@ -4,19 +4,34 @@ from controllers.api_controller import api_bp
 from controllers.web_controller import web_bp
 from controllers.inventory_controller import inventory_api_bp
 from controllers.weekly_order_controller import weekly_order_bp
+from controllers.job_controller import job_bp
+from services.job_service import job_runner
+from services.change_tracker import change_tracker
+from services.request_metrics import request_metrics
+from services.lookup_cache import lookup_cache
+from services.compression import compression
+from services.json_provider import FastJSONProvider
 from extensions import db, migrate # Import from extensions
 
-def create_app():
-    """應用程式工廠函數"""
+def create_app(config=None):
+    """應用程式工廠函數，config 可覆寫預設設定（例如檢查工具使用暫存資料庫）"""
     app = Flask(__name__)
     app.secret_key = 'your-secret-key-here'  # 在生產環境中請使用環境變數
     
     # Configure SQLAlchemy
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///hardware.db' # Use the existing database file
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False # Suppress warning
+    if config:
+        app.config.update(config)
+    app.json = FastJSONProvider(app) # orjson（有安裝時）序列化 JSON，可由 JSON_BACKEND 指定
     
     db.init_app(app) # Initialize db with the app
     migrate.init_app(app, db) # Initialize migrate with the app and db
+    job_runner.init_app(app) # Background import jobs
+    change_tracker.init_app(app) # 資料表異動版本號（結果快取與 ETag 使用）
+    request_metrics.init_app(app) # 請求 SQL 次數與延遲統計（METRICS_ENABLED=1 時啟用）
+    lookup_cache.init_app(app) # 掃描查詢零件的回應快取（LOOKUP_CACHE_*）
+    compression.init_app(app) # gzip / br 回應壓縮（COMPRESS_*）
     
     # Enable Cross-Origin Resource Sharing for mobile app
     CORS(app)
@@ -26,6 +41,7 @@ def create_app():
     app.register_blueprint(inventory_api_bp)    # 庫存 API 路由 (/api/inventory/...)
     app.register_blueprint(web_bp)              # 網頁路由 (/...)
     app.register_blueprint(weekly_order_bp)     # 週期訂單路由 (/weekly-orders/...)
+    app.register_blueprint(job_bp)              # 背景匯入工作 API (/api/jobs/...)
     
     return app
 
@@ -36,8 +52,9 @@ app = create_app()
 from models.part import Part, Warehouse, WarehouseLocation, PartWarehouseLocation
 from models.order import Order
 from models.inventory import CurrentInventory, InventoryTransaction, StockCount, StockCountDetail
-from models.work_order import WorkOrderDemand # ADD THIS LINE
+from models.work_order import WorkOrderDemand, PartDemandSummary # ADD THIS LINE
 from models.weekly_order import WeeklyOrderCycle, OrderRegistration, User, OrderReviewLog
+from models.import_job import ImportJob
 
 if __name__ == '__main__':
     import os
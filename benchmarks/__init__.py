@@ -0,0 +1,7 @@
+"""
+效能基準測試套件
+以 ORM 模型產生可設定規模的合成資料（零件、倉庫、倉位、庫存、異動記錄、訂單、工單需求），
+透過 Flask test client 與多執行緒負載驅動器對主要端點發出請求，輸出吞吐量與 p50/p95/p99 延遲的 JSON 結果，
+供不同版本之間比較。
+執行方式: python -m benchmarks --scale small --output results.json （python -m benchmarks --help 查看所有參數）
+"""
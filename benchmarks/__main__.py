@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask_migrate import upgrade
+
+from app import create_app
+from extensions import db
+from benchmarks.dataset import EPOCH, SCALES, generate
+from benchmarks.load import build_scenarios, run_scenario
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='以合成資料對主要端點執行效能基準測試')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='資料規模（預設 small）')
+    for name in ('parts', 'warehouses', 'transactions', 'demand_lines', 'orders'):
+        parser.add_argument(f'--{name.replace("_", "-")}', type=int, dest=name, help=f'覆寫 {name} 筆數')
+    parser.add_argument('--db', help='SQLite 資料庫路徑（預設為暫存檔，結束後刪除）')
+    parser.add_argument('--reuse', action='store_true', help='--db 已存在時沿用既有資料，不重新產生')
+    parser.add_argument('--scenarios', help='只執行指定情境，以逗號分隔')
+    parser.add_argument('--requests', type=int, default=200, help='一般情境的請求數（預設 200）')
+    parser.add_argument('--heavy-requests', type=int, default=10, help='報表、匯出、匯入情境的請求數（預設 10）')
+    parser.add_argument('--threads', type=int, default=4, help='並行執行緒數（預設 4）')
+    parser.add_argument('--import-rows', type=int, default=1_000, help='匯入情境的 Excel 列數')
+    parser.add_argument('--seed', type=int, default=42, help='亂數種子')
+    parser.add_argument('--now', type=date.fromisoformat, default=EPOCH.date(),
+                        help=f'資料日期與日期區間情境的基準日 YYYY-MM-DD（預設 {EPOCH.date()}；--reuse 時需與產生資料時相同）')
+    parser.add_argument('--output', help='結果 JSON 檔案路徑（預設輸出至標準輸出）')
+    return parser.parse_args()
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    log = lambda message: print(message, file=sys.stderr)
+
+    now = datetime.combine(args.now, datetime.min.time())
+    sizes = dict(SCALES[args.scale])
+    sizes.update({name: getattr(args, name) for name in sizes if getattr(args, name) is not None})
+
+    temporary = args.db is None
+    path = os.path.abspath(args.db) if args.db else tempfile.mkstemp(suffix='.db')[1]
+    reuse = args.reuse and not temporary and os.path.exists(path) and os.path.getsize(path) > 0
+    if not reuse and os.path.exists(path):
+        os.remove(path)
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path,
+        'IMPORT_SPOOL_DIR': tempfile.mkdtemp(),
+    })
+
+    try:
+        with app.app_context():
+            if reuse:
+                log(f'沿用既有資料庫 {path}')
+                counts = dict(sizes)
+                from models.part import Part, Warehouse
+                counts['parts'] = Part.query.count()
+                counts['warehouses'] = Warehouse.query.count()
+            else:
+                log(f'建立資料庫 {path} ({args.scale}: {sizes})')
+                upgrade(directory=os.path.join(ROOT, 'migrations'))
+                started = time.perf_counter()
+                counts = generate(seed=args.seed, now=now, progress=log, **sizes)
+                log(f'資料產生完成，耗時 {time.perf_counter() - started:.1f} 秒')
+
+        scenarios = build_scenarios(counts, import_rows=args.import_rows, now=now)
+        if args.scenarios:
+            selected = {name.strip() for name in args.scenarios.split(',')}
+            unknown = selected - {scenario.name for scenario in scenarios}
+            if unknown:
+                sys.exit(f'未知的情境: {", ".join(sorted(unknown))}')
+            scenarios = [scenario for scenario in scenarios if scenario.name in selected]
+
+        results = {}
+        for scenario in scenarios:
+            requests = args.heavy_requests if scenario.heavy else args.requests
+            log(f'執行 {scenario.name}: {requests} 個請求, {args.threads} 個執行緒')
+            results[scenario.name] = run_scenario(app, scenario, requests=requests, threads=args.threads, seed=args.seed)
+            latency = results[scenario.name]['latency_ms']
+            log(f'  {results[scenario.name]["throughput_rps"]} req/s, p50 {latency.get("p50")} ms, '
+                f'p95 {latency.get("p95")} ms, p99 {latency.get("p99")} ms')
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'scale': args.scale,
+                'dataset': counts,
+                'threads': args.threads,
+                'seed': args.seed,
+                'now': now.isoformat(timespec='seconds'),
+            },
+            'results': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            log(f'結果已寫入 {args.output}')
+        else:
+            print(output)
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        if temporary and os.path.exists(path):
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
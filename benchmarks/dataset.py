@@ -0,0 +1,150 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from extensions import db
+from models.part import Part, Warehouse, WarehouseLocation, PartWarehouseLocation
+from models.order import Order
+from models.inventory import CurrentInventory, InventoryTransaction
+from models.work_order import WorkOrderDemand, PartDemandSummary
+
+# 預設資料規模
+SCALES = {
+    'tiny': dict(parts=500, warehouses=3, transactions=5_000, demand_lines=2_000, orders=500),
+    'small': dict(parts=5_000, warehouses=10, transactions=100_000, demand_lines=20_000, orders=5_000),
+    'medium': dict(parts=20_000, warehouses=20, transactions=1_000_000, demand_lines=100_000, orders=20_000),
+    'production': dict(parts=100_000, warehouses=50, transactions=5_000_000, demand_lines=500_000, orders=100_000),
+}
+
+# 每個零件存放的倉庫數
+WAREHOUSES_PER_PART = 2
+# 每張工單的需求料號數
+LINES_PER_WORK_ORDER = 20
+INSERT_CHUNK_SIZE = 10_000
+# 資料日期的預設基準時間；以固定時間產生，日期區間類的情境（匯出最近 30 天、MRP 淨需求）每次選到相同的資料
+EPOCH = datetime(2025, 1, 1)
+
+TRANSACTION_TYPES = ['IN_PURCHASE', 'IN_TRANSFER', 'IN_RETURN', 'OUT_ISSUE', 'OUT_WORK_ORDER', 'OUT_TRANSFER']
+PART_TYPES = ['螺絲', '螺帽', '墊片', '彈簧', '銷']
+NAME_WORDS = ['不鏽鋼', '六角', '內六角', '十字', '平頭', '圓頭', '沉頭', '華司', '鍍鋅', '黑色']
+
+
+def part_number(index):
+    return f'BM-{index:07d}'
+
+
+def _insert(model, rows):
+    """以 ORM 批量 INSERT 分段寫入"""
+    rows = iter(rows)
+    while True:
+        chunk = [row for _, row in zip(range(INSERT_CHUNK_SIZE), rows)]
+        if not chunk:
+            return
+        db.session.execute(insert(model), chunk)
+
+
+def generate(parts, warehouses, transactions, demand_lines, orders, seed=42, now=None, progress=print):
+    """
+    產生合成資料並 commit；需在 app context 中、對空白資料庫執行。
+    以固定 seed 的亂數產生，所有日期以 now（預設 EPOCH）為基準，相同參數每次產生相同資料。
+    Returns 各資料表的筆數
+    """
+    rng = random.Random(seed)
+    now = (now or EPOCH).replace(microsecond=0)
+
+    progress(f'倉庫與倉位: {warehouses} 個倉庫')
+    _insert(Warehouse, ({'id': index + 1, 'code': f'WH{index + 1:03d}', 'name': f'倉庫{index + 1}',
+                         'is_active': True, 'created_at': now} for index in range(warehouses)))
+
+    progress(f'零件: {parts} 筆')
+    _insert(Part, ({
+        'id': index + 1,
+        'part_number': part_number(index),
+        'name': f'{rng.choice(NAME_WORDS)}{rng.choice(PART_TYPES)} M{rng.randint(2, 24)}x{rng.randint(5, 120)}',
+        'type': rng.choice(PART_TYPES),
+        'unit': '個',
+        'quantity_per_box': rng.choice([1, 50, 100, 500]),
+        'safety_stock': rng.randint(0, 200),
+        'reorder_point': rng.randint(0, 300),
+        'standard_cost': round(rng.uniform(0.1, 50), 2),
+        'is_active': True,
+        'created_at': now,
+    } for index in range(parts)))
+
+    # 每個零件固定存放於 WAREHOUSES_PER_PART 個倉庫，各有一個倉位
+    stocked = [(index + 1, rng.sample(range(1, warehouses + 1), min(WAREHOUSES_PER_PART, warehouses)))
+               for index in range(parts)]
+    progress(f'倉位與庫存: {sum(len(ids) for _, ids in stocked)} 筆')
+    locations = [(part_id, warehouse_id) for part_id, warehouse_ids in stocked for warehouse_id in warehouse_ids]
+    _insert(WarehouseLocation, ({'id': index + 1, 'warehouse_id': warehouse_id, 'location_code': f'L-{part_id:07d}'}
+                                for index, (part_id, warehouse_id) in enumerate(locations)))
+    _insert(PartWarehouseLocation, ({'part_id': part_id, 'warehouse_location_id': index + 1}
+                                    for index, (part_id, _) in enumerate(locations)))
+    quantities = [rng.randint(0, 2_000) for _ in locations]
+    _insert(CurrentInventory, ({'part_id': part_id, 'warehouse_id': warehouse_id, 'quantity_on_hand': quantity,
+                                'reserved_quantity': 0, 'available_quantity': quantity, 'last_updated': now}
+                               for (part_id, warehouse_id), quantity in zip(locations, quantities)))
+
+    progress(f'異動記錄: {transactions} 筆')
+    def transaction_rows():
+        for index in range(transactions):
+            part_id, warehouse_id = locations[rng.randrange(len(locations))]
+            transaction_type = rng.choice(TRANSACTION_TYPES)
+            quantity = rng.randint(1, 100)
+            yield {
+                'part_id': part_id,
+                'warehouse_id': warehouse_id,
+                'transaction_type': transaction_type,
+                'quantity': -quantity if transaction_type.startswith('OUT') else quantity,
+                'unit_cost': 0,
+                'reference_type': 'MANUAL',
+                'transaction_date': now - timedelta(seconds=rng.randint(0, 365 * 86400)),
+                'created_by': 'benchmark',
+                'created_at': now,
+            }
+    _insert(InventoryTransaction, transaction_rows())
+
+    progress(f'訂單: {orders} 筆')
+    _insert(Order, ({
+        'part_id': rng.randint(1, parts),
+        'warehouse_id': rng.randint(1, warehouses),
+        'order_date': now - timedelta(days=rng.randint(0, 180)),
+        'quantity_ordered': rng.randint(10, 1_000),
+        'quantity_received': 0,
+        'unit_cost': 0,
+        'status': rng.choice(['pending', 'confirmed', 'migrated']),
+        'expected_date': now + timedelta(days=rng.randint(-10, 60)),
+        'created_at': now,
+    } for _ in range(orders)))
+
+    progress(f'工單需求: {demand_lines} 筆')
+    def demand_rows():
+        remaining = demand_lines
+        order_index = 0
+        while remaining > 0:
+            count = min(LINES_PER_WORK_ORDER, remaining, parts)
+            for part_index in rng.sample(range(parts), count):
+                yield {
+                    'order_id': f'WO{order_index:08d}',
+                    'part_number': part_number(part_index),
+                    'required_quantity': float(rng.randint(1, 500)),
+                    'material_description': f'物料 {part_number(part_index)}',
+                    'required_date': now + timedelta(days=rng.randint(-5, 90)),
+                    'created_at': now,
+                }
+            remaining -= count
+            order_index += 1
+    _insert(WorkOrderDemand, demand_rows())
+    db.session.commit()
+
+    progress('工單需求彙總')
+    PartDemandSummary.rebuild()
+
+    return {
+        'parts': parts,
+        'warehouses': warehouses,
+        'part_locations': len(locations),
+        'current_inventory': len(locations),
+        'inventory_transactions': transactions,
+        'order_history': orders,
+        'work_order_demand': demand_lines,
+    }
@@ -0,0 +1,167 @@
+import io
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from benchmarks.dataset import EPOCH, part_number
+
+
+class Scenario:
+    """
+    一個基準測試情境：make_request(rng) 回傳 test client 的請求參數 (method, url, kwargs)。
+    每個情境以固定 seed 的亂數產生請求，相同參數的執行結果可互相比較。
+    heavy 為 True 的情境（報表、匯出、匯入）每次請求處理整個資料集，預設以較少的請求數執行。
+    """
+
+    def __init__(self, name, make_request, description='', heavy=False):
+        self.name = name
+        self.make_request = make_request
+        self.description = description
+        self.heavy = heavy
+
+
+def build_scenarios(counts, import_rows=1_000, now=EPOCH):
+    """
+    依資料規模建立各端點的情境，counts 為 dataset.generate 的回傳值。
+    now 為產生資料時的基準時間，日期區間類的情境以它為準，不隨執行當天改變。
+    """
+    parts = counts['parts']
+    warehouses = counts['warehouses']
+    date_to = now.strftime('%Y-%m-%d')
+    date_from = (now - timedelta(days=30)).strftime('%Y-%m-%d')
+
+    def random_part(rng):
+        return part_number(rng.randrange(parts))
+
+    def stock_movement(transaction_type):
+        def make_request(rng):
+            return 'POST', f'/api/inventory/{"stock-in" if transaction_type.startswith("IN") else "stock-out"}', {'json': {
+                'part_number': random_part(rng),
+                'warehouse_id': rng.randint(1, warehouses),
+                'quantity': rng.randint(1, 5),
+                'transaction_type': transaction_type,
+                'notes': 'benchmark',
+            }}
+        return make_request
+
+    import_file = work_order_import_file(parts, import_rows, now=now)
+
+    def work_order_import(rng):
+        return 'POST', '/work-orders/import', {
+            'data': {'excel_file': (io.BytesIO(import_file), 'benchmark.xlsx')},
+            'content_type': 'multipart/form-data',
+        }
+
+    return [
+        Scenario('part_lookup', lambda rng: ('GET', f'/api/part/{random_part(rng)}', {}), '零件條碼查詢'),
+        Scenario('part_batch_lookup', lambda rng: ('POST', '/api/parts/lookup', {
+            'json': {'part_numbers': [random_part(rng) for _ in range(50)]}
+        }), '連續掃描批次查詢（50 個零件）'),
+        Scenario('part_search', lambda rng: ('GET', f'/api/parts/search?q={random_part(rng)[:-2]}&mode=prefix', {}),
+                 '零件編號前綴搜尋'),
+        Scenario('inventory_list', lambda rng: ('GET', f'/api/inventory/stock?warehouse_id={rng.randint(1, warehouses)}', {}),
+                 '單一倉庫庫存清單'),
+        Scenario('transactions_page', lambda rng: ('GET', '/api/inventory/transactions?limit=100', {}), '異動記錄第一頁'),
+        Scenario('stock_in', stock_movement('IN_PURCHASE'), '入庫'),
+        Scenario('stock_out', stock_movement('OUT_ISSUE'), '出庫（庫存不足時回應 400）'),
+        Scenario('comparison_report', lambda rng: ('GET', '/reports/parts-comparison/data', {}), '工單需求與庫存比對報表', heavy=True),
+        Scenario('mrp_netting', lambda rng: ('GET', f'/api/mrp/netting?include_buckets=0&today={date_to}', {}),
+                 'MRP 淨需求', heavy=True),
+        Scenario('transactions_export', lambda rng: ('GET', '/api/inventory/transactions/export?format=csv'
+                                                     f'&date_from={date_from}&date_to={date_to}', {}),
+                 '異動記錄 CSV 匯出（最近 30 天）', heavy=True),
+        Scenario('work_order_import', work_order_import, f'工單需求 Excel 匯入（{import_rows} 列）', heavy=True),
+    ]
+
+
+def work_order_import_file(parts, rows, seed=7, now=EPOCH):
+    """產生工單需求匯入用的 Excel 檔案內容（bytes），需求日期以 now 為基準"""
+    rng = random.Random(seed)
+    today = pd.Timestamp(now).normalize()
+    frame = pd.DataFrame({
+        '訂單': [f'BMIMPORT{index // 20:06d}' for index in range(rows)],
+        '物料': [part_number(rng.randrange(parts)) for _ in range(rows)],
+        '需求數量 (EINHEIT)': [rng.randint(1, 100) for _ in range(rows)],
+        '物料說明': ['benchmark'] * rows,
+        '作業說明': [''] * rows,
+        '上層物料說明': [''] * rows,
+        '需求日期': [today + pd.Timedelta(days=rng.randint(0, 60)) for _ in range(rows)],
+        '散裝物料': [''] * rows,
+    })
+    output = io.BytesIO()
+    frame.to_excel(output, index=False)
+    return output.getvalue()
+
+
+def percentiles(latencies):
+    """延遲（秒）轉為毫秒統計"""
+    if not latencies:
+        return {}
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'p50': round(float(p50), 3),
+        'p95': round(float(p95), 3),
+        'p99': round(float(p99), 3),
+        'mean': round(float(values.mean()), 3),
+        'max': round(float(values.max()), 3),
+    }
+
+
+def run_scenario(app, scenario, requests=100, threads=4, seed=1):
+    """
+    以 threads 個執行緒（各自使用一個 test client）共送出 requests 個請求，回傳吞吐量與延遲統計。
+    5xx 回應與例外視為錯誤；4xx 回應（例如出庫庫存不足）記錄於 status_counts。
+    """
+    counter = iter(range(requests))
+    counter_lock = threading.Lock()
+    latencies = []
+    status_counts = {}
+    errors = []
+    results_lock = threading.Lock()
+
+    def worker(worker_index):
+        rng = random.Random(seed * 1000 + worker_index)
+        client = app.test_client()
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    return
+            method, url, kwargs = scenario.make_request(rng)
+            started = time.perf_counter()
+            try:
+                response = client.open(url, method=method, **kwargs)
+                response.get_data()  # 串流回應需讀完內容才算完成
+                status = response.status_code
+                response.close()
+            except Exception as e:
+                status = 'exception'
+                with results_lock:
+                    errors.append(f'{type(e).__name__}: {e}')
+            elapsed = time.perf_counter() - started
+            with results_lock:
+                latencies.append(elapsed)
+                status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, range(threads)))
+    wall_seconds = time.perf_counter() - started
+
+    error_count = sum(
+        count for status, count in status_counts.items() if status == 'exception' or int(status) >= 500
+    )
+    return {
+        'description': scenario.description,
+        'requests': len(latencies),
+        'threads': threads,
+        'seconds': round(wall_seconds, 3),
+        'throughput_rps': round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+        'latency_ms': percentiles(latencies),
+        'status_counts': status_counts,
+        'errors': error_count,
+        'error_samples': errors[:5],
+    }
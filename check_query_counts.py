@@ -0,0 +1,141 @@
+"""
+列表端點的查詢次數檢查工具
+以暫存 SQLite 資料庫分別建立少量與大量的測試資料，對各列表端點發出請求並計算執行的 SQL 數量，
+確認查詢次數不隨資料筆數增加，避免序列化時逐筆延遲載入零件、倉庫等關聯（N+1 查詢）。
+執行方式: python check_query_counts.py [--small 20] [--large 200]
+有端點的查詢次數隨資料量增加時以結束代碼 1 結束。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import create_app
+from extensions import db
+from models.part import Part, Warehouse, WarehouseLocation, PartWarehouseLocation
+from models.order import Order
+from models.inventory import CurrentInventory, InventoryTransaction, StockCount, StockCountDetail
+
+# (說明, 網址)；盤點 id 固定為 1（seed 只建立一筆盤點）
+ENDPOINTS = [
+    ('庫存清單', '/api/inventory/stock'),
+    ('低庫存清單', '/api/inventory/low-stock'),
+    ('異動記錄', '/api/inventory/transactions?limit=1000'),
+    ('盤點清單', '/api/inventory/stock-counts'),
+    ('盤點明細', '/api/inventory/stock-counts/1'),
+    ('待處理訂單', '/api/pending_orders'),
+    ('所有訂單', '/api/all_orders'),
+    ('零件清單 API', '/api/parts?per_page=500'),
+    ('零件管理頁面', '/parts?per_page=500'),
+    ('入庫作業頁面', '/inventory/stock-in'),
+    ('歷史訂單頁面', '/order-history'),
+]
+
+
+@contextmanager
+def count_queries(engine):
+    """計算區塊內於 engine 執行的 SQL 數量，以 list 回傳（結束後 counter[0] 為次數）"""
+    counter = [0]
+
+    def before_cursor_execute(*args):
+        counter[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed(rows):
+    """建立 rows 筆零件，每個零件各有倉位、庫存、異動記錄、訂單與盤點明細"""
+    now = datetime.now()
+    warehouses = [Warehouse(code=f'W{index}', name=f'倉庫{index}') for index in range(2)]
+    db.session.add_all(warehouses)
+    db.session.flush()
+
+    stock_count = StockCount(count_number='SC-CHECK', warehouse_id=warehouses[0].id, count_date=now)
+    db.session.add(stock_count)
+    db.session.flush()
+
+    for index in range(rows):
+        warehouse = warehouses[index % len(warehouses)]
+        part = Part(part_number=f'P{index:06d}', name=f'零件{index}', quantity_per_box=1, reorder_point=10)
+        location = WarehouseLocation(warehouse_id=warehouse.id, location_code=f'L-{index:06d}')
+        db.session.add_all([part, location])
+        db.session.flush()
+
+        db.session.add_all([
+            PartWarehouseLocation(part.id, location.id),
+            CurrentInventory(part_id=part.id, warehouse_id=warehouse.id, quantity_on_hand=index % 20,
+                             available_quantity=index % 20),
+            InventoryTransaction(part_id=part.id, warehouse_id=warehouse.id, transaction_type='IN_PURCHASE',
+                                 quantity=index % 20, transaction_date=now - timedelta(minutes=index)),
+            Order(part_id=part.id, warehouse_id=warehouse.id, quantity_ordered=10,
+                  status=('pending', 'migrated', 'confirmed')[index % 3], order_date=now - timedelta(minutes=index)),
+            StockCountDetail(stock_count_id=stock_count.id, part_id=part.id, system_quantity=index % 20),
+        ])
+    db.session.commit()
+
+
+def measure(rows):
+    """以 rows 筆測試資料建立暫存資料庫，回傳 {網址: (狀態碼, 查詢次數)}"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path,
+            'TESTING': True,
+            'IMPORT_SPOOL_DIR': tempfile.mkdtemp(),
+        })
+        with app.app_context():
+            db.create_all()
+            seed(rows)
+            engine = db.engine
+
+        client = app.test_client()
+        client.get('/')  # 第一個請求會檢查未完成的匯入工作，不列入計算
+
+        results = {}
+        for _, url in ENDPOINTS:
+            with count_queries(engine) as counter:
+                response = client.get(url)
+            results[url] = (response.status_code, counter[0])
+        with app.app_context():
+            db.engine.dispose()
+        return results
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='檢查列表端點的查詢次數是否與資料筆數無關')
+    parser.add_argument('--small', type=int, default=20, help='少量資料的筆數')
+    parser.add_argument('--large', type=int, default=200, help='大量資料的筆數')
+    args = parser.parse_args()
+
+    small = measure(args.small)
+    large = measure(args.large)
+
+    failed = False
+    print(f'{"端點":<14}{args.small:>8}{args.large:>8}  網址')
+    for label, url in ENDPOINTS:
+        (small_status, small_count), (large_status, large_count) = small[url], large[url]
+        ok = small_status == large_status == 200 and small_count == large_count
+        failed = failed or not ok
+        status = '' if small_status == large_status == 200 else f'  HTTP {small_status}/{large_status}'
+        print(f'{"✅" if ok else "❌"} {label:<12}{small_count:>8}{large_count:>8}  {url}{status}')
+
+    if failed:
+        print('❌ 部分端點的查詢次數隨資料量增加或請求失敗')
+        sys.exit(1)
+    print('✅ 所有端點的查詢次數與資料筆數無關')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+熱門查詢的索引檢查工具
+對控制器中常用的查詢執行 EXPLAIN QUERY PLAN，確認每個查詢都有使用索引，避免索引被移除或查詢改寫後退化為全表掃描。
+執行方式: python check_query_plans.py （使用 app 設定的資料庫，需先執行 flask db upgrade）
+有查詢未使用索引時以結束代碼 1 結束。
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from app import app
+from extensions import db
+from models.part import Part, Warehouse, WarehouseLocation
+from models.order import Order
+from models.inventory import InventoryTransaction
+from models.work_order import WorkOrderDemand
+from models.weekly_order import OrderRegistration
+
+
+def hot_queries():
+    """(說明, 主要查詢的資料表, SQLAlchemy 查詢)，與控制器中的查詢條件與排序一致"""
+    since = datetime.now() - timedelta(days=30)
+    transactions = InventoryTransaction.query.join(Part).join(Warehouse)
+    transaction_order = (db.desc(InventoryTransaction.transaction_date), db.desc(InventoryTransaction.id))
+
+    return [
+        ('異動記錄：依零件篩選', 'inventory_transactions',
+         transactions.filter(InventoryTransaction.part_id == 1).order_by(*transaction_order).limit(50)),
+        ('異動記錄：依倉庫篩選', 'inventory_transactions',
+         transactions.filter(InventoryTransaction.warehouse_id == 1).order_by(*transaction_order).limit(50)),
+        ('異動記錄：依異動類型篩選', 'inventory_transactions',
+         transactions.filter(InventoryTransaction.transaction_type == 'IN_PURCHASE').order_by(*transaction_order).limit(50)),
+        ('異動記錄：依日期區間篩選', 'inventory_transactions',
+         transactions.filter(InventoryTransaction.transaction_date >= since).order_by(*transaction_order).limit(50)),
+        ('異動記錄：未篩選', 'inventory_transactions',
+         transactions.order_by(*transaction_order).limit(50)),
+        ('異動摘要：零件近期異動', 'inventory_transactions',
+         db.session.query(db.func.count(InventoryTransaction.id)).filter(
+             InventoryTransaction.part_id == 1, InventoryTransaction.transaction_date >= since)),
+        ('訂單：依狀態篩選', 'order_history',
+         Order.query.filter_by(status='pending').order_by(db.desc(Order.order_date))),
+        ('訂單：零件訂購歷史', 'order_history',
+         Order.query.filter_by(part_id=1).order_by(db.desc(Order.order_date))),
+        ('週期申請：依週期列出', 'order_registrations',
+         OrderRegistration.query.filter_by(cycle_id=1).order_by(OrderRegistration.item_sequence)),
+        ('週期申請：依週期與狀態列出', 'order_registrations',
+         OrderRegistration.query.filter_by(cycle_id=1, status='approved').order_by(OrderRegistration.item_sequence)),
+        ('工單需求：未來需求', 'work_order_demand',
+         WorkOrderDemand.query.filter(WorkOrderDemand.required_date >= datetime.now())),
+        ('倉位：依倉庫與位置代碼查詢', 'warehouse_locations',
+         WarehouseLocation.query.filter_by(warehouse_id=1, location_code='A-01')),
+    ]
+
+
+def explain(connection, query):
+    """回傳查詢的 EXPLAIN QUERY PLAN 明細 (detail 欄位)"""
+    compiled = query.statement.compile(dialect=connection.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup or [])
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def uses_index(plan, table):
+    """主要資料表的每一個存取步驟都必須透過索引（不可為 SCAN 全表）"""
+    steps = [detail for detail in plan if table in detail.split()]
+    if not steps:
+        return False
+    return all(('USING' in detail and 'INDEX' in detail) or 'PRIMARY KEY' in detail for detail in steps)
+
+
+def check_query_plans(connection):
+    """檢查所有熱門查詢，回傳未使用索引的查詢清單 [(說明, 查詢計畫), ...]"""
+    failures = []
+    for description, table, query in hot_queries():
+        plan = explain(connection, query)
+        if uses_index(plan, table):
+            print(f"✅ {description}")
+        else:
+            print(f"❌ {description}")
+            failures.append((description, plan))
+        for detail in plan:
+            print(f"     {detail}")
+    return failures
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        with db.engine.connect() as connection:
+            failures = check_query_plans(connection)
+
+    if failures:
+        print(f"\n⚠️  {len(failures)} 個查詢未使用索引")
+        sys.exit(1)
+    print("\n🎉 所有熱門查詢皆使用索引")
@@ -0,0 +1,107 @@
+"""
+異動記錄分頁檢查工具
+以暫存 SQLite 資料庫建立異動記錄，依 next_cursor 逐頁往後、再依 prev_cursor 逐頁往前，
+確認每筆記錄剛好出現一次且順序正確（依 transaction_date, id 倒序）。
+測試資料包含以不含微秒的文字儲存的日期（舊版 database_setup_inventory.py 的寫入格式）、
+相同日期的多筆記錄與含微秒的日期，避免游標與儲存格式不同時重複或遺漏記錄。
+執行方式: python check_transaction_paging.py [--limit 2]
+有頁面重複或遺漏記錄時以結束代碼 1 結束。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app import create_app
+from extensions import db
+from models.part import Part, Warehouse
+from models.inventory import InventoryTransaction
+
+
+def seed():
+    """建立異動記錄，回傳預期的順序（id 清單，依 transaction_date, id 倒序）"""
+    warehouse = Warehouse(code='W1', name='倉庫1')
+    part = Part(part_number='P-PAGING', name='分頁測試零件', quantity_per_box=1)
+    db.session.add_all([warehouse, part])
+    db.session.flush()
+
+    # 以 SQL 直接寫入文字日期，與舊版建立資料庫的腳本相同
+    dates = [f'2025-01-01 10:00:0{second}' for second in range(1, 7)]
+    dates += ['2025-01-01 10:00:03', '2025-01-01 10:00:03']  # 相同日期，依 id 排序
+    for transaction_date in dates:
+        db.session.execute(text(
+            'INSERT INTO inventory_transactions (part_id, warehouse_id, transaction_type, quantity, transaction_date) '
+            "VALUES (:part_id, :warehouse_id, 'IN_PURCHASE', 1, :transaction_date)"
+        ), {'part_id': part.id, 'warehouse_id': warehouse.id, 'transaction_date': transaction_date})
+    # 以 ORM 寫入含微秒的日期
+    for microsecond in (500000, 0):
+        db.session.add(InventoryTransaction(
+            part_id=part.id, warehouse_id=warehouse.id, transaction_type='IN_PURCHASE', quantity=1,
+            transaction_date=datetime(2025, 1, 1, 10, 0, 4, microsecond)
+        ))
+    db.session.commit()
+
+    rows = db.session.execute(text(
+        'SELECT id FROM inventory_transactions ORDER BY transaction_date DESC, id DESC'
+    )).all()
+    return [row.id for row in rows]
+
+
+def walk(limit):
+    """逐頁往後再往前，回傳 (預期順序, 往後各頁, 往前各頁)"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path,
+            'TESTING': True,
+            'IMPORT_SPOOL_DIR': tempfile.mkdtemp(),
+        })
+        with app.app_context():
+            db.create_all()
+            expected = seed()
+
+            forward = []
+            page = InventoryTransaction.get_transactions_page(limit=limit)
+            while True:
+                forward.append([transaction['id'] for transaction in page['transactions']])
+                if not page['has_next'] or len(forward) > len(expected):
+                    break
+                page = InventoryTransaction.get_transactions_page(cursor=page['next_cursor'], limit=limit)
+
+            backward = []
+            while page['has_prev'] and len(backward) <= len(expected):
+                page = InventoryTransaction.get_transactions_page(
+                    cursor=page['prev_cursor'], direction='prev', limit=limit
+                )
+                backward.insert(0, [transaction['id'] for transaction in page['transactions']])
+            db.engine.dispose()
+        return expected, forward, backward
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='檢查異動記錄的游標分頁不會重複或遺漏記錄')
+    parser.add_argument('--limit', type=int, default=2, help='每頁筆數')
+    args = parser.parse_args()
+
+    expected, forward, backward = walk(args.limit)
+    forward_ids = [transaction_id for page in forward for transaction_id in page]
+    backward_ids = [transaction_id for page in backward + forward[-1:] for transaction_id in page]
+
+    print(f'預期順序: {expected}')
+    print(f'往後分頁: {forward}')
+    print(f'往前分頁: {backward + forward[-1:]}')
+    if forward_ids != expected or backward_ids != expected:
+        print('❌ 分頁結果有重複或遺漏的記錄')
+        sys.exit(1)
+    print('✅ 分頁結果與預期順序相同')
+
+
+if __name__ == '__main__':
+    main()
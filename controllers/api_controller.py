@@ -1,49 +1,34 @@
 from flask import Blueprint, jsonify, request
 from models.part import Part, Warehouse
 from models.order import Order
+from services.part_search_service import PartSearchService
+from services.part_lookup_service import PartLookupService
+from services.lookup_cache import lookup_cache
+from services.conditional_get import conditional_get, SHORT_LIVED
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 @api_bp.route('/part/<string:part_number>', methods=['GET'])
 def get_part_details(part_number):
     """
-    Fetches part details and its order history from the database.
+    Fetches part details, recent order history and per-warehouse stock.
     The part_number is the value scanned from the barcode.
+    Query params: history_limit (most recent orders to include, default 50)
     """
-    from models.inventory import CurrentInventory
+    result = PartLookupService.lookup(part_number, request.args.get('history_limit', type=int))
     
-    # Find the part by its part_number
-    part = Part.get_by_part_number(part_number)
-    
-    if part is None:
+    if result is None:
         return jsonify({'error': '找不到零件'}), 404
-        
-    # Fetch order history for the found part - 確保返回字典列表
-    order_history = Order.get_history_by_part_number(part_number)
-    order_history_data = [order.to_dict() for order in order_history] if order_history else []
-    
-    # Fetch inventory for the part from all warehouses
-    inventories = CurrentInventory.query.filter_by(part_id=part.id).all()
-    inventory_data = []
-    for inv in inventories:
-        inventory_data.append({
-            'warehouse_id': inv.warehouse_id,
-            'warehouse_name': inv.warehouse.name if inv.warehouse else '未知',
-            'warehouse_code': inv.warehouse.code if inv.warehouse else '未知',
-            'quantity_on_hand': inv.quantity_on_hand,
-            'reserved_quantity': inv.reserved_quantity,
-            'available_quantity': inv.available_quantity
-        })
-    
-    # Combine the results into a single JSON response
-    result = {
-        'part_info': part.to_dict(include_locations=True), # Convert Part object to dictionary and include locations
-        'order_history': order_history_data,
-        'inventories': inventory_data
-    }
     
     return jsonify(result)
 
+@api_bp.route('/part-lookup-cache/stats', methods=['GET'])
+def get_part_lookup_cache_stats():
+    """
+    Hit/miss/eviction counters of the part lookup cache.
+    """
+    return jsonify(lookup_cache.stats())
+
 @api_bp.route('/order', methods=['POST'])
 def place_order():
     """
@@ -106,12 +91,23 @@ def confirm_orders():
         return jsonify({'error': 'Failed to confirm orders'}), 500
 
 @api_bp.route('/parts', methods=['GET'])
+@conditional_get('parts', 'part_locations', 'warehouse_locations', 'warehouses')
 def get_all_parts():
-    """Get all parts for management interface."""
-    parts = Part.get_all()
-    return jsonify(parts)
+    """
+    Get parts for management interface (paginated).
+    Query params: search, sort_by, sort_order, page, per_page
+    """
+    pagination = Part.get_all(
+        search_term=request.args.get('search', ''),
+        sort_by=request.args.get('sort_by', 'part_number'),
+        sort_order=request.args.get('sort_order', 'asc'),
+        page=request.args.get('page', 1, type=int),
+        per_page=max(1, min(request.args.get('per_page', 50, type=int), 500))
+    )
+    return jsonify([part.to_dict(include_locations=True) for part in pagination.items])
 
 @api_bp.route('/warehouses', methods=['GET'])
+@conditional_get('warehouses', cache_control=SHORT_LIVED)
 def get_warehouses():
     """Gets a list of all active warehouses."""
     warehouses = Warehouse.get_all() # This already returns a list of dicts
@@ -119,10 +115,40 @@ def get_warehouses():
 
 @api_bp.route('/parts/search', methods=['GET'])
 def search_parts():
-    """Searches for parts by part_number or name."""
+    """
+    Searches for parts by part_number or name, ranked by relevance.
+    Query params: q, mode ('prefix' for autocomplete), limit
+    """
     query = request.args.get('q', '')
-    parts = Part.get_all(search_term=query)
-    return jsonify({'parts': [part.to_dict() for part in parts]})
+    prefix = request.args.get('mode', '') == 'prefix'
+    limit = request.args.get('limit', PartSearchService.DEFAULT_LIMIT, type=int)
+    parts = PartSearchService.search(query, prefix=prefix, limit=limit)
+    return jsonify({'parts': parts})
+
+@api_bp.route('/parts/lookup', methods=['POST'])
+def lookup_parts():
+    """
+    Batch version of /api/part/<part_number> for continuous scanning.
+    Expects a JSON body with 'part_numbers' (list of strings, at most 200).
+    Returns part info, locations and per-warehouse stock for each part (no order history);
+    unknown part numbers are returned with found=False and listed in 'not_found'.
+    """
+    data = request.get_json(silent=True) or {}
+    part_numbers = data.get('part_numbers')
+
+    if not isinstance(part_numbers, list) or not part_numbers:
+        return jsonify({'error': 'part_numbers must be a non-empty list'}), 400
+    if not all(isinstance(part_number, str) for part_number in part_numbers):
+        return jsonify({'error': 'part_numbers must contain only strings'}), 400
+    part_numbers = [part_number.strip() for part_number in part_numbers if part_number.strip()]
+    if len(part_numbers) > PartLookupService.MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {PartLookupService.MAX_BATCH_SIZE} part numbers per request'}), 400
+
+    results = PartLookupService.lookup_many(part_numbers)
+    return jsonify({
+        'results': results,
+        'not_found': [result['part_number'] for result in results if not result['found']]
+    })
 
 @api_bp.route('/parts', methods=['POST'])
 def create_part():
@@ -233,7 +259,19 @@ def get_work_order_by_id(order_id):
     
     return jsonify(result)
 
+@api_bp.route('/work-orders/<string:order_id>', methods=['DELETE'])
+def delete_work_order(order_id):
+    """刪除訂單的所有工單需求（同步扣除需求彙總）"""
+    from services.work_order_service import WorkOrderService
+    
+    result = WorkOrderService.delete_order_demands(order_id)
+    
+    if result['success']:
+        return jsonify(result), 200
+    return jsonify(result), 404 if result.get('deleted_count') == 0 else 500
+
 @api_bp.route('/work-orders/orders', methods=['GET'])
+@conditional_get('work_order_demand')
 def get_all_work_order_numbers():
     """獲取所有工單編號"""
     from models.work_order import WorkOrderDemand
@@ -260,14 +298,45 @@ def search_work_orders_by_part(part_number):
     
     return jsonify(result)
 
+@api_bp.route('/mrp/netting', methods=['GET'])
+def get_mrp_netting():
+    """
+    分時段淨需求計算（依需求日期與在途訂單到貨日期，以週為時段）
+    Query params: part_number (可重複或以逗號分隔), shortage_only (1: 只列出會缺料的料號), include_buckets (0: 不含各週明細),
+                  today (YYYY-MM-DD，計算基準日，預設為今天)
+    """
+    from services.mrp_service import MrpService
+    from datetime import datetime
+    
+    part_numbers = [
+        part_number.strip()
+        for value in request.args.getlist('part_number')
+        for part_number in value.split(',') if part_number.strip()
+    ] or None
+    shortage_only = request.args.get('shortage_only', '0') == '1'
+    include_buckets = request.args.get('include_buckets', '1') != '0'
+    today = request.args.get('today')
+    if today:
+        try:
+            today = datetime.strptime(today, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Invalid today. Must be YYYY-MM-DD.'}), 400
+    
+    parts, buckets = MrpService.run(part_numbers, today=today)
+    if shortage_only:
+        parts = parts[parts['first_shortage_date'].notna()]
+    
+    return jsonify(MrpService.to_payload(parts, buckets, include_buckets=include_buckets))
+
 @api_bp.route('/inventory/transactions/export', methods=['GET'])
 def export_inventory_transactions():
-    """匯出庫存異動記錄為 Excel 檔案"""
-    from models.inventory import InventoryTransaction
+    """
+    匯出庫存異動記錄為 Excel 檔案（format=csv 時以 CSV 串流輸出）
+    資料以分批查詢逐列寫出，記憶體用量不隨筆數增加
+    """
+    from services.inventory_service import InventoryService
     from datetime import datetime, timedelta
-    import pandas as pd
-    from io import BytesIO
-    from flask import send_file
+    from flask import Response, send_file, stream_with_context
     
     # 取得篩選參數
     part_id = request.args.get('part_id', type=int)
@@ -275,6 +344,7 @@ def export_inventory_transactions():
     transaction_type = request.args.get('transaction_type')
     date_from = request.args.get('date_from')
     date_to = request.args.get('date_to')
+    export_format = request.args.get('format', 'xlsx')
     
     # 如果沒有指定日期範圍，預設為最近30天
     if not date_from and not date_to:
@@ -283,65 +353,25 @@ def export_inventory_transactions():
         date_from = thirty_days_ago.strftime('%Y-%m-%d')
         date_to = today.strftime('%Y-%m-%d')
     
-    # 建立查詢
-    transactions_query = InventoryTransaction.query.join(Part).join(Warehouse)
-    
-    # 應用篩選條件
-    if part_id:
-        transactions_query = transactions_query.filter(InventoryTransaction.part_id == part_id)
-    if warehouse_id:
-        transactions_query = transactions_query.filter(InventoryTransaction.warehouse_id == warehouse_id)
-    if transaction_type:
-        transactions_query = transactions_query.filter(InventoryTransaction.transaction_type == transaction_type)
-    if date_from:
-        try:
-            from_date = datetime.strptime(date_from, '%Y-%m-%d')
-            transactions_query = transactions_query.filter(InventoryTransaction.transaction_date >= from_date)
-        except ValueError:
-            pass
-    if date_to:
-        try:
-            to_date = datetime.strptime(date_to, '%Y-%m-%d')
-            to_date = to_date.replace(hour=23, minute=59, second=59)
-            transactions_query = transactions_query.filter(InventoryTransaction.transaction_date <= to_date)
-        except ValueError:
-            pass
-    
-    # 取得所有符合條件的交易記錄
-    transactions = transactions_query.order_by(
-        InventoryTransaction.transaction_date.desc(),
-        InventoryTransaction.id.desc()
-    ).all()
-    
-    # 準備匯出資料
-    export_data = []
-    for transaction in transactions:
-        export_data.append({
-            '異動時間': transaction.transaction_date.strftime('%Y-%m-%d %H:%M:%S'),
-            '異動類型': transaction.transaction_type,
-            '零件編號': transaction.part.part_number if transaction.part else 'N/A',
-            '零件名稱': transaction.part.name if transaction.part else 'N/A',
-            '倉庫': transaction.warehouse.name if transaction.warehouse else 'N/A',
-            '數量變化': transaction.quantity,
-            '參考類型': transaction.reference_type or '',
-            '參考編號': transaction.reference_id or '',
-            '備註': transaction.notes or ''
-        })
-    
-    # 建立 DataFrame 並匯出為 Excel
-    df = pd.DataFrame(export_data)
-    
-    # 建立 Excel 檔案
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='庫存異動記錄', index=False)
-    output.seek(0)
+    rows = InventoryService.iter_transaction_export_rows(
+        part_id, warehouse_id, transaction_type, date_from, date_to
+    )
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    if export_format == 'csv':
+        # 使用英文檔名避免 Content-Disposition 編碼問題
+        filename = f"inventory_transactions_{timestamp}.csv"
+        return Response(
+            stream_with_context(InventoryService.stream_transactions_csv(rows)),
+            mimetype='text/csv; charset=utf-8',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
     
     # 產生檔案名稱
-    filename = f"庫存異動記錄_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    filename = f"庫存異動記錄_{timestamp}.xlsx"
     
     return send_file(
-        output,
+        InventoryService.write_transactions_xlsx(rows),
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         as_attachment=True,
         download_name=filename
@@ -4,11 +4,13 @@ from models.part import Part, Warehouse
 import csv
 import io
 from services.inventory_service import InventoryService # Import the new service
+from services.conditional_get import conditional_get, SHORT_LIVED
 
 inventory_api_bp = Blueprint('inventory_api', __name__, url_prefix='/api/inventory')
 
 # 倉庫管理 API
 @inventory_api_bp.route('/warehouses', methods=['GET'])
+@conditional_get('warehouses', cache_control=SHORT_LIVED)
 def get_warehouses():
     """取得所有倉庫"""
     warehouses = Warehouse.get_all()
@@ -16,6 +18,7 @@ def get_warehouses():
 
 # 庫存查詢 API
 @inventory_api_bp.route('/stock', methods=['GET'])
+@conditional_get('current_inventory', 'parts', 'warehouses')
 def get_inventory():
     """取得庫存清單"""
     warehouse_id = request.args.get('warehouse_id', type=int)
@@ -161,13 +164,31 @@ def export_low_stock():
 # 交易記錄 API
 @inventory_api_bp.route('/transactions', methods=['GET'])
 def get_transactions():
-    """取得交易記錄"""
+    """
+    取得交易記錄（keyset 分頁，依異動時間倒序）
+    Query params: part_id, warehouse_id, transaction_type, date_from, date_to, limit,
+                  cursor + direction (next/prev), include_total=1 才計算總筆數
+    """
     part_id = request.args.get('part_id', type=int)
     warehouse_id = request.args.get('warehouse_id', type=int)
-    limit = request.args.get('limit', 100, type=int)
+    transaction_type = request.args.get('transaction_type')
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    cursor = request.args.get('cursor') or None
+    direction = request.args.get('direction', 'next')
+    if direction not in ('next', 'prev'):
+        return jsonify({'error': 'Invalid direction'}), 400
+    include_total = request.args.get('include_total') in ('1', 'true')
     
-    transactions = InventoryTransaction.get_transactions(part_id, warehouse_id, limit)
-    return jsonify(transactions)
+    try:
+        page = InventoryTransaction.get_transactions_page(
+            part_id, warehouse_id, transaction_type, date_from, date_to,
+            cursor=cursor, direction=direction, limit=limit, include_total=include_total
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify(page)
 
 @inventory_api_bp.route('/transaction-summary/<int:part_id>', methods=['GET'])
 def get_transaction_summary(part_id):
@@ -267,20 +288,18 @@ def stock_out():
         if transaction_type not in valid_out_types:
             return jsonify({'error': 'Invalid transaction type for stock out'}), 400
         
-        # 檢查庫存是否足夠
-        current_stock = CurrentInventory.get_current_stock(part.id, warehouse_id)
-        if not current_stock or current_stock['available_quantity'] < quantity:
-            return jsonify({
-                'error': f'Insufficient stock. Available: {current_stock["available_quantity"] if current_stock else 0}'
-            }), 400
-        
-        # 執行出庫（負數量）
-        success = CurrentInventory.update_stock(
+        # 執行出庫（負數量），庫存是否足夠由條件式 UPDATE 在同一交易內判斷
+        result = CurrentInventory.apply_stock_change(
             part.id, warehouse_id, -quantity, transaction_type,
             reference_type, reference_id, notes
         )
         
-        if success:
+        if result.get('error') == 'insufficient_stock':
+            return jsonify({
+                'error': f'Insufficient stock. Available: {result["available_quantity"]}'
+            }), 400
+        
+        if result['success']:
             return jsonify({
                 'success': True,
                 'message': f'{part_number} 出庫 {quantity} {part.unit} 成功'
@@ -292,6 +311,21 @@ def stock_out():
         print(f"Error during stock out: {e}")
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+# 整批入出庫 API
+@inventory_api_bp.route('/movements/batch', methods=['POST'])
+def batch_stock_movements():
+    """
+    整批入庫/出庫，全部成功或全部回滾。
+    Body: {"lines": [{"part_number", "warehouse_id", "qty", "type", "reference", "notes"}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    lines = data.get('lines')
+    if not isinstance(lines, list) or not lines:
+        return jsonify({'error': 'Missing required field: lines'}), 400
+
+    result = InventoryService.apply_stock_movements(lines)
+    return jsonify(result), 201 if result['success'] else 400
+
 # 盤點管理 API
 @inventory_api_bp.route('/stock-counts', methods=['GET'])
 def get_stock_counts():
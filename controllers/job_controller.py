@@ -0,0 +1,46 @@
+from flask import Blueprint, jsonify, request, url_for
+from services.job_service import job_runner
+
+job_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+@job_bp.route('/imports', methods=['POST'])
+def submit_import_job():
+    """
+    上傳檔案並建立背景匯入工作。
+    Form fields: job_type (parts, work_orders, stock_count), file, warehouse_id (盤點匯入必填)
+    """
+    job_type = request.form.get('job_type', '')
+    if job_type not in job_runner.HANDLERS:
+        return jsonify({'success': False, 'error': f'不支援的匯入類型: {job_type}'}), 400
+
+    file = request.files.get('file')
+    if file is None or not file.filename:
+        return jsonify({'success': False, 'error': '沒有選擇檔案'}), 400
+
+    if not job_runner.allowed_file(job_type, file.filename):
+        allowed = ', '.join(job_runner.HANDLERS[job_type][1])
+        return jsonify({'success': False, 'error': f'檔案格式錯誤，僅接受 {allowed}'}), 400
+
+    params = {}
+    if job_type == 'stock_count':
+        warehouse_id = request.form.get('warehouse_id', type=int)
+        if not warehouse_id:
+            return jsonify({'success': False, 'error': 'Warehouse ID is required'}), 400
+        params['warehouse_id'] = warehouse_id
+
+    job = job_runner.submit(job_type, file, params)
+
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('jobs.get_job_status', job_id=job.id)
+    }), 202
+
+@job_bp.route('/<string:job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """取得匯入工作的進度、處理速度與錯誤清單"""
+    status = job_runner.get_status(job_id)
+    if status is None:
+        return jsonify({'error': '找不到匯入工作'}), 404
+    return jsonify(status)
@@ -1,14 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, current_app
 from models.part import Part, Warehouse, WarehouseLocation, PartWarehouseLocation # Import PartWarehouseLocation for dummy object
 from models.order import Order
 from models.inventory import CurrentInventory, InventoryTransaction, StockCount
 from extensions import db
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 import os
 import pandas as pd
 from werkzeug.utils import secure_filename
 from io import BytesIO
 from services.part_service import PartService # Import the new service
+from services.work_order_service import WorkOrderService
 
 web_bp = Blueprint('web', __name__)
 
@@ -55,8 +57,10 @@ def orders():
 @web_bp.route('/order-history')
 def order_history():
     """歷史訂單記錄頁面 - 只顯示已遷移的訂單"""
-    migrated_orders = Order.query.filter_by(status='migrated').order_by(db.desc(Order.order_date)).all()
-    confirmed_orders = Order.query.filter_by(status='confirmed').order_by(db.desc(Order.order_date)).all()
+    # 表格顯示零件與倉庫名稱，以 JOIN 一併載入
+    history_query = Order.query.options(joinedload(Order.part), joinedload(Order.warehouse))
+    migrated_orders = history_query.filter_by(status='migrated').order_by(db.desc(Order.order_date)).all()
+    confirmed_orders = history_query.filter_by(status='confirmed').order_by(db.desc(Order.order_date)).all()
     
     all_history_orders = migrated_orders + confirmed_orders
     
@@ -98,10 +102,6 @@ def work_orders():
 @web_bp.route('/work-orders/import', methods=['POST'])
 def import_work_order_demands():
     """匯入工單需求資料"""
-    from models.work_order import WorkOrderDemand
-    from datetime import datetime
-    from extensions import db
-    
     if 'excel_file' not in request.files:
         return jsonify({'success': False, 'error': '沒有檔案被上傳'})
 
@@ -112,108 +112,9 @@ def import_work_order_demands():
     if not (file and file.filename is not None and file.filename.lower().endswith(('.xlsx', '.xls'))):
         return jsonify({'success': False, 'error': '請上傳 Excel 檔案 (.xlsx 或 .xls 格式)'})
 
-    try:
-        # 讀取 Excel 檔案
-        df = pd.read_excel(file.stream)
-        
-        # 驗證必要欄位
-        required_columns = ['訂單', '物料', '需求數量 (EINHEIT)', '物料說明', '作業說明', '上層物料說明', '需求日期', '散裝物料']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            return jsonify({
-                'success': False, 
-                'error': f'Excel 檔案缺少必要欄位: {", ".join(missing_columns)}'
-            })
-        
-        imported_count = 0
-        updated_count = 0
-        error_count = 0
-        filtered_count = 0  # 新增：被篩選掉的數量
-        
-        # 處理每一行資料
-        for index, row in df.iterrows():
-            try:
-                # 讀取欄位資料
-                order_id = str(row['訂單']).strip()
-                part_number = str(row['物料']).strip()
-                required_quantity = float(row['需求數量 (EINHEIT)'])
-                
-                # 處理可能為空的欄位
-                material_description = str(row['物料說明']).strip() if not pd.isna(row['物料說明']) else ''
-                operation_description = str(row['作業說明']).strip() if not pd.isna(row['作業說明']) else ''
-                parent_material_description = str(row['上層物料說明']).strip() if not pd.isna(row['上層物料說明']) else ''
-                bulk_material = str(row['散裝物料']).strip() if not pd.isna(row['散裝物料']) else ''
-                
-                # 篩選：跳過物料說明包含"圖"的項目
-                if '圖' in material_description:
-                    filtered_count += 1
-                    continue  # 跳過此項目，不進行匯入
-                
-                # 解析需求日期
-                required_date = row['需求日期']
-                if pd.isna(required_date):
-                    required_date = datetime.now()
-                elif isinstance(required_date, str):
-                    try:
-                        required_date = datetime.strptime(required_date, '%Y-%m-%d')
-                    except:
-                        required_date = datetime.now()
-                elif not isinstance(required_date, datetime):
-                    required_date = datetime.now()
-                
-                # 檢查記錄是否已存在
-                existing_demand = WorkOrderDemand.query.filter_by(
-                    order_id=order_id, 
-                    part_number=part_number
-                ).first()
-                
-                if existing_demand:
-                    # 更新現有記錄
-                    existing_demand.required_quantity = required_quantity
-                    existing_demand.material_description = material_description
-                    existing_demand.operation_description = operation_description
-                    existing_demand.parent_material_description = parent_material_description
-                    existing_demand.required_date = required_date
-                    existing_demand.bulk_material = bulk_material
-                    updated_count += 1
-                else:
-                    # 建立新記錄
-                    new_demand = WorkOrderDemand()
-                    new_demand.order_id = order_id
-                    new_demand.part_number = part_number
-                    new_demand.required_quantity = required_quantity
-                    new_demand.material_description = material_description
-                    new_demand.operation_description = operation_description
-                    new_demand.parent_material_description = parent_material_description
-                    new_demand.required_date = required_date
-                    new_demand.bulk_material = bulk_material
-                    
-                    db.session.add(new_demand)
-                    imported_count += 1
-                    
-            except Exception as e:
-                error_count += 1
-                print(f"處理第 {index + 2} 行時發生錯誤: {e}")
-        
-        # 提交資料庫變更
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'imported_count': imported_count,
-            'updated_count': updated_count,
-            'error_count': error_count,
-            'filtered_count': filtered_count,  # 新增：被篩選掉的數量
-            'total_processed': len(df)
-        })
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({
-            'success': False, 
-            'error': f'匯入過程發生錯誤: {str(e)}'
-        })
+    # Pass the file stream to the service layer
+    result = WorkOrderService.import_work_order_demands(file.stream)
+    return jsonify(result)
 
 @web_bp.route('/part_lookup')
 def part_lookup():
@@ -544,7 +445,9 @@ def inventory_transactions():
     transaction_type = request.args.get('transaction_type')
     date_from = request.args.get('date_from')
     date_to = request.args.get('date_to')
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor') or None
+    direction = request.args.get('direction', 'next')
+    show_total = request.args.get('count') == '1'
     per_page = 50  # 每頁顯示筆數
     
     # 如果沒有指定日期範圍，預設為最近30天
@@ -557,67 +460,31 @@ def inventory_transactions():
     # 取得所有倉庫供篩選使用
     warehouses = Warehouse.get_all()  # 這已經返回字典列表了
     
-    # 取得篩選後的交易記錄
-    transactions_query = InventoryTransaction.query.join(Part).join(Warehouse)
-    
-    # 應用篩選條件
-    if part_id:
-        transactions_query = transactions_query.filter(InventoryTransaction.part_id == part_id)
-    if warehouse_id:
-        transactions_query = transactions_query.filter(InventoryTransaction.warehouse_id == warehouse_id)
-    if transaction_type:
-        transactions_query = transactions_query.filter(InventoryTransaction.transaction_type == transaction_type)
-    if date_from:
-        try:
-            from_date = datetime.strptime(date_from, '%Y-%m-%d')
-            transactions_query = transactions_query.filter(InventoryTransaction.transaction_date >= from_date)
-        except ValueError:
-            pass
-    if date_to:
-        try:
-            to_date = datetime.strptime(date_to, '%Y-%m-%d')
-            # 加上一天，使結束日期包含當天的所有記錄
-            to_date = to_date.replace(hour=23, minute=59, second=59)
-            transactions_query = transactions_query.filter(InventoryTransaction.transaction_date <= to_date)
-        except ValueError:
-            pass
-    
-    # 按日期排序並分頁
-    transactions_query = transactions_query.order_by(db.desc(InventoryTransaction.transaction_date), 
-                                                   db.desc(InventoryTransaction.id))
-    
-    # 執行分頁查詢
-    paginated = transactions_query.paginate(
-        page=page, 
-        per_page=per_page, 
-        error_out=False
-    )
+    # 以 keyset 分頁取得篩選後的交易記錄（依日期倒序），總筆數只在要求時計算
+    try:
+        page = InventoryTransaction.get_transactions_page(
+            part_id, warehouse_id, transaction_type, date_from, date_to,
+            cursor=cursor, direction=direction, limit=per_page, include_total=show_total
+        )
+    except ValueError:
+        flash('分頁參數無效，已回到第一頁', 'warning')
+        page = InventoryTransaction.get_transactions_page(
+            part_id, warehouse_id, transaction_type, date_from, date_to,
+            limit=per_page, include_total=show_total
+        )
     
-    # 準備交易記錄資料
-    transactions = []
-    for transaction in paginated.items:
-        transactions.append({
-            'id': transaction.id,
-            'transaction_date': transaction.transaction_date.strftime('%Y-%m-%d %H:%M:%S'),
-            'transaction_type': transaction.transaction_type,
-            'part_number': transaction.part.part_number if transaction.part else 'N/A',
-            'part_name': transaction.part.name if transaction.part else 'N/A',
-            'warehouse_name': transaction.warehouse.name if transaction.warehouse else 'N/A',
-            'quantity': transaction.quantity,
-            'reference_type': transaction.reference_type,
-            'reference_id': transaction.reference_id,
-            'notes': transaction.notes
-        })
+    transactions = page['transactions']
+    for transaction in transactions:
+        transaction['transaction_date'] = transaction['transaction_date'][:19].replace('T', ' ')
     
     # 準備分頁資訊
     page_info = None
-    if paginated.total and paginated.total > 0:
+    if transactions:
         page_info = {
-            'current_page': page,
-            'total_pages': paginated.pages,
-            'total': paginated.total,
-            'start': (page - 1) * per_page + 1,
-            'end': min(page * per_page, paginated.total)
+            'count': len(transactions),
+            'total': page['total'],
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor']
         }
     
     return render_template('inventory/transactions.html',
@@ -637,128 +504,22 @@ def parts_comparison_report():
 
 @web_bp.route('/reports/parts-comparison/data')
 def parts_comparison_data():
-    """獲取零件差異分析數據"""
-    from models.work_order import WorkOrderDemand
-    from models.inventory import CurrentInventory
-    from models.part import Part
+    """
+    獲取零件差異分析數據
+    結果依資料版本快取並附上 ETag，資料未異動時以 304 回應，不查詢資料庫
+    """
+    from services.parts_comparison_service import PartsComparisonService
     
     try:
-        # 1. 取得工單需求零件的詳細資訊
-        work_order_details = db.session.query(
-            WorkOrderDemand.part_number,
-            WorkOrderDemand.material_description,
-            db.func.sum(WorkOrderDemand.required_quantity).label('total_required'),
-            db.func.count(WorkOrderDemand.order_id).label('order_count')
-        ).group_by(
-            WorkOrderDemand.part_number,
-            WorkOrderDemand.material_description
-        ).all()
-        
-        work_order_dict = {}
-        for row in work_order_details:
-            work_order_dict[row[0]] = {
-                'description': row[1],
-                'total_required': float(row[2]),
-                'order_count': int(row[3])
-            }
-        
-        # 2. 取得零件倉零件的詳細資訊
-        inventory_details = db.session.query(Part).all()
-        
-        inventory_dict = {}
-        for part in inventory_details:
-            inventory_dict[part.part_number] = {
-                'name': part.name,
-                'unit': part.unit or '',
-                'description': part.description or ''
-            }
-        
-        # 3. 取得零件庫存資訊
-        stock_details = db.session.query(
-            Part.part_number,
-            db.func.sum(CurrentInventory.quantity_on_hand).label('total_stock'),
-            db.func.sum(CurrentInventory.available_quantity).label('available_stock')
-        ).join(CurrentInventory, Part.id == CurrentInventory.part_id).group_by(Part.part_number).all()
-        
-        stock_dict = {}
-        for row in stock_details:
-            stock_dict[row[0]] = {
-                'total_stock': float(row[1]) if row[1] else 0,
-                'available_stock': float(row[2]) if row[2] else 0
-            }
-        
-        # 4. 分析差異
-        # 4.1 工單需求有但零件倉沒有的零件
-        missing_in_inventory = []
-        for part_number, details in work_order_dict.items():
-            if part_number not in inventory_dict:
-                missing_in_inventory.append({
-                    'part_number': part_number,
-                    'description': details['description'],
-                    'total_required': details['total_required'],
-                    'order_count': details['order_count'],
-                    'status': '工單需求有，零件倉缺少',
-                    'action': '新增至零件倉'
-                })
-        
-        # 4.2 零件倉有的零件與工單需求對比
-        inventory_with_demand = []
-        for part_number, details in inventory_dict.items():
-            work_order_info = work_order_dict.get(part_number, {})
-            stock_info = stock_dict.get(part_number, {'total_stock': 0, 'available_stock': 0})
-            
-            required_qty = work_order_info.get('total_required', 0)
-            available_qty = stock_info.get('available_stock', 0)
-            shortage = max(0, required_qty - available_qty)
-            
-            inventory_with_demand.append({
-                'part_number': part_number,
-                'name': details['name'],
-                'description': details['description'],
-                'unit': details['unit'],
-                'required_quantity': required_qty,
-                'total_stock': stock_info.get('total_stock', 0),
-                'available_stock': available_qty,
-                'shortage': shortage,
-                'order_count': work_order_info.get('order_count', 0),
-                'has_demand': required_qty > 0,
-                'stock_status': '充足' if shortage == 0 and required_qty > 0 else ('缺料' if shortage > 0 else '無需求')
-            })
-        
-        # 4.3 零件倉有但工單需求沒有的零件
-        unused_inventory = []
-        for part_number, details in inventory_dict.items():
-            if part_number not in work_order_dict:
-                stock_info = stock_dict.get(part_number, {'total_stock': 0, 'available_stock': 0})
-                unused_inventory.append({
-                    'part_number': part_number,
-                    'name': details['name'],
-                    'description': details['description'],
-                    'unit': details['unit'],
-                    'total_stock': stock_info.get('total_stock', 0),
-                    'available_stock': stock_info.get('available_stock', 0),
-                    'status': '零件倉有，無工單需求',
-                    'action': '檢視是否為過剩庫存'
-                })
-        
-        # 5. 計算統計資訊
-        summary = {
-            'work_order_parts_count': len(work_order_dict),
-            'inventory_parts_count': len(inventory_dict),
-            'common_parts_count': len(set(work_order_dict.keys()) & set(inventory_dict.keys())),
-            'missing_in_inventory_count': len(missing_in_inventory),
-            'unused_in_inventory_count': len(unused_inventory),
-            'shortage_parts_count': len([item for item in inventory_with_demand if item['shortage'] > 0]),
-            'sufficient_parts_count': len([item for item in inventory_with_demand if item['stock_status'] == '充足'])
-        }
-        
-        return jsonify({
-            'success': True,
-            'summary': summary,
-            'missing_in_inventory': sorted(missing_in_inventory, key=lambda x: x['total_required'], reverse=True),
-            'inventory_with_demand': sorted(inventory_with_demand, key=lambda x: x['shortage'], reverse=True),
-            'unused_inventory': sorted(unused_inventory, key=lambda x: x['total_stock'], reverse=True)
-        })
+        etag = PartsComparisonService.etag()
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            etag, body = PartsComparisonService.cached_payload_json(current_app.json.dumps)
+            response = current_app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
         
     except Exception as e:
         return jsonify({
@@ -1097,14 +858,6 @@ def stock_out():
             flash('請輸入有效的數量', 'error')
             return redirect(url_for('web.stock_out'))
         
-        # 檢查庫存
-        # current_stock is expected to be a dictionary or None when warehouse_id is provided
-        current_stock = CurrentInventory.get_current_stock(part.id, warehouse_id)
-        if not current_stock or current_stock.get('available_quantity', 0) < quantity: # Use .get with default
-            available = current_stock.get('available_quantity', 0) if current_stock else 0
-            flash(f'庫存不足。可用數量: {available}', 'error')
-            return redirect(url_for('web.stock_out'))
-        
         # 準備備註資訊
         final_notes = notes
         if transaction_type == 'OUT_WORK_ORDER' and work_order_id:
@@ -1112,13 +865,15 @@ def stock_out():
             if notes:
                 final_notes += f"\n備註: {notes}"
         
-        # 執行出庫
-        success = CurrentInventory.update_stock(
+        # 執行出庫，庫存是否足夠由條件式 UPDATE 在同一交易內判斷
+        result = CurrentInventory.apply_stock_change(
             part.id, warehouse_id, -quantity, transaction_type,
             'MANUAL', None, final_notes
         )
         
-        if success:
+        if result.get('error') == 'insufficient_stock':
+            flash(f'庫存不足。可用數量: {result["available_quantity"]}', 'error')
+        elif result['success']:
             success_msg = f'{part_number} 出庫 {quantity} {part.unit} 成功'
             if transaction_type == 'OUT_WORK_ORDER':
                 success_msg += f' (工單: {work_order_id})'
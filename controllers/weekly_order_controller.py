@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, jsonify, flash, redirect,
 from extensions import db
 from models.weekly_order import WeeklyOrderCycle, OrderRegistration, OrderReviewLog, User
 from datetime import datetime, timedelta
+from sqlalchemy import insert
 import pandas as pd
 from io import BytesIO
 import os
@@ -26,6 +27,8 @@ def weekly_orders():
     
     # 獲取歷史週期（最近10個）
     historical_cycles = WeeklyOrderCycle.query.order_by(WeeklyOrderCycle.created_at.desc()).limit(10).all()
+    # 登記數量以單一彙總查詢取得，不逐週期載入登記資料
+    WeeklyOrderCycle.load_stats(historical_cycles)
     
     return render_template('weekly_orders/index.html', 
                          current_cycle=current_cycle,
@@ -59,9 +62,8 @@ def register_order():
     
     if request.method == 'POST':
         try:
-            # 獲取下一個項次
-            max_sequence = db.session.query(db.func.max(OrderRegistration.item_sequence)).filter_by(cycle_id=current_cycle.id).scalar()
-            next_sequence = (max_sequence or 0) + 1
+            # 配置項次
+            next_sequence = WeeklyOrderCycle.reserve_sequences(current_cycle.id, 1)
             
             # 創建新的登記記錄
             registration = OrderRegistration(
@@ -112,31 +114,28 @@ def batch_register():
         return jsonify({'success': False, 'message': '沒有提供要登記的零件資料'})
     
     try:
-        added_count = 0
-        
+        records = []
         for part_data in parts:
-            # 獲取下一個項次
-            max_sequence = db.session.query(db.func.max(OrderRegistration.item_sequence)).filter_by(cycle_id=current_cycle.id).scalar()
-            next_sequence = (max_sequence or 0) + 1
-            
-            # 創建新的登記記錄
-            registration = OrderRegistration()
-            registration.cycle_id = current_cycle.id
-            registration.item_sequence = next_sequence
-            registration.part_number = part_data.get('part_number', '').strip()
-            registration.part_name = part_data.get('part_name', '').strip()
-            registration.quantity = int(part_data.get('quantity', 1))
-            registration.unit = part_data.get('unit', '個').strip()
-            registration.category = part_data.get('category', '').strip()
-            registration.priority = part_data.get('priority', 'normal').strip()
-            registration.purpose_notes = f'自動匯入自{source}'
-            registration.applicant_name = '系統自動'
-            registration.department = '自動申請'
-            
-            db.session.add(registration)
-            added_count += 1
+            records.append({
+                'cycle_id': current_cycle.id,
+                'part_number': part_data.get('part_number', '').strip(),
+                'part_name': part_data.get('part_name', '').strip(),
+                'quantity': int(part_data.get('quantity', 1)),
+                'unit': part_data.get('unit', '個').strip(),
+                'category': part_data.get('category', '').strip(),
+                'priority': part_data.get('priority', 'normal').strip(),
+                'purpose_notes': f'自動匯入自{source}',
+                'applicant_name': '系統自動',
+                'department': '自動申請'
+            })
         
+        # 一次配置所有項次後批量寫入
+        first_sequence = WeeklyOrderCycle.reserve_sequences(current_cycle.id, len(records))
+        for offset, record in enumerate(records):
+            record['item_sequence'] = first_sequence + offset
+        db.session.execute(insert(OrderRegistration), records)
         db.session.commit()
+        added_count = len(records)
         
         return jsonify({
             'success': True,
@@ -187,7 +186,7 @@ def batch_register_form():
                 flash('請填寫申請人和申請單位', 'error')
                 return redirect(request.url)
             
-            added_count = 0
+            records = []
             
             # 處理批量項目
             item_index = 0
@@ -209,42 +208,41 @@ def batch_register_form():
                     item_index += 1
                     continue
                 
-                # 獲取下一個項次
-                max_sequence = db.session.query(db.func.max(OrderRegistration.item_sequence)).filter_by(cycle_id=current_cycle.id).scalar()
-                next_sequence = (max_sequence or 0) + 1
-                
-                # 創建新的登記記錄
-                registration = OrderRegistration()
-                registration.cycle_id = current_cycle.id
-                registration.item_sequence = next_sequence
-                registration.part_number = part_number
-                registration.part_name = part_name
-                registration.quantity = quantity
-                registration.unit = request.form.get(f'items[{item_index}][unit]', '個').strip()
-                registration.category = request.form.get(f'items[{item_index}][category]', '').strip()
-                registration.priority = request.form.get(f'items[{item_index}][priority]', 'normal').strip()
-                registration.purpose_notes = request.form.get(f'items[{item_index}][purpose_notes]', '').strip()
-                registration.applicant_name = applicant_name
-                registration.department = department
-                
                 # 處理需用日期
+                required_date = None
                 required_date_str = request.form.get(f'items[{item_index}][required_date]', '')
                 if required_date_str:
                     try:
-                        registration.required_date = datetime.strptime(required_date_str, '%Y-%m-%d')
+                        required_date = datetime.strptime(required_date_str, '%Y-%m-%d')
                     except ValueError:
                         pass
                 
-                db.session.add(registration)
-                added_count += 1
+                records.append({
+                    'cycle_id': current_cycle.id,
+                    'part_number': part_number,
+                    'part_name': part_name,
+                    'quantity': quantity,
+                    'unit': request.form.get(f'items[{item_index}][unit]', '個').strip(),
+                    'category': request.form.get(f'items[{item_index}][category]', '').strip(),
+                    'required_date': required_date,
+                    'priority': request.form.get(f'items[{item_index}][priority]', 'normal').strip(),
+                    'purpose_notes': request.form.get(f'items[{item_index}][purpose_notes]', '').strip(),
+                    'applicant_name': applicant_name,
+                    'department': department
+                })
                 item_index += 1
             
-            if added_count == 0:
+            if not records:
                 flash('沒有有效的申請項目', 'error')
                 return redirect(request.url)
             
+            # 一次配置所有項次後批量寫入
+            first_sequence = WeeklyOrderCycle.reserve_sequences(current_cycle.id, len(records))
+            for offset, record in enumerate(records):
+                record['item_sequence'] = first_sequence + offset
+            db.session.execute(insert(OrderRegistration), records)
             db.session.commit()
-            flash(f'成功提交 {added_count} 個申請項目', 'success')
+            flash(f'成功提交 {len(records)} 個申請項目', 'success')
             return redirect(url_for('weekly_order.weekly_orders'))
             
         except Exception as e:
@@ -338,38 +336,40 @@ def review_registration(registration_id):
 
 @weekly_order_bp.route('/weekly_orders/batch_review', methods=['POST'])
 def batch_review():
-    """批量審查登記項目"""
-    data = request.get_json()
-    registration_ids = data.get('registration_ids', [])
+    """
+    批量審查登記項目
+    JSON: {"action": "approved"|"rejected", "registration_ids": [...]}
+       或 {"action": ..., "filter": {"cycle_id": 1, "department": ..., "priority": ..., "category": ...}}
+    條件模式會審查該週期中所有符合條件的待審查項目，不需由瀏覽器傳送 id 清單
+    """
+    data = request.get_json() or {}
     action = data.get('action', 'approved')
     reviewer_name = '主管'
     
     try:
-        updated_count = 0
-        for reg_id in registration_ids:
-            registration = OrderRegistration.query.get(reg_id)
-            if registration and registration.status == 'registered':
-                old_status = registration.status
-                registration.status = action
-                
-                # 記錄審查log
-                review_log = OrderReviewLog()
-                review_log.cycle_id = registration.cycle_id
-                review_log.registration_id = registration.id
-                review_log.reviewer_name = reviewer_name
-                review_log.action = action
-                review_log.old_status = old_status
-                review_log.new_status = registration.status
-                review_log.notes = f'批量{action}'
-                
-                db.session.add(review_log)
-                updated_count += 1
+        if 'registration_ids' in data:
+            result = OrderRegistration.batch_review(
+                action, reviewer_name, registration_ids=data.get('registration_ids') or []
+            )
+        else:
+            filters = dict(data.get('filter') or {})
+            cycle_id = filters.pop('cycle_id', None)
+            if not cycle_id:
+                return jsonify({'success': False, 'message': '條件審查必須指定週期'})
+            result = OrderRegistration.batch_review(
+                action, reviewer_name, cycle_id=int(cycle_id), filters=filters
+            )
+        
+        if not result['success']:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': result['error']})
         
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'message': f'已批量處理 {updated_count} 個項目'
+            'message': f'已批量處理 {result["updated_count"]} 個項目',
+            'updated_count': result['updated_count']
         })
         
     except Exception as e:
@@ -470,17 +470,10 @@ def cycle_summary():
             'message': '目前沒有活躍的申請週期'
         })
     
-    registrations = OrderRegistration.query.filter_by(cycle_id=current_cycle.id).all()
-    
     summary = {
         'has_active_cycle': True,
         'cycle': current_cycle.to_dict(),
-        'stats': {
-            'total': len(registrations),
-            'registered': len([r for r in registrations if r.status == 'registered']),
-            'approved': len([r for r in registrations if r.status == 'approved']),
-            'rejected': len([r for r in registrations if r.status == 'rejected'])
-        },
+        'stats': current_cycle.stats,
         'time_remaining': None
     }
     
@@ -504,6 +497,18 @@ def cycle_summary():
     
     return jsonify(summary)
 
+@weekly_order_bp.route('/weekly-orders/api/auto-reorder', methods=['POST'])
+def auto_reorder():
+    """依庫存、在途訂單與工單需求產生補貨建議並登記至當前週期（dry_run 時只回傳建議）"""
+    from services.reorder_service import ReorderService
+    
+    data = request.get_json(silent=True) or {}
+    result = ReorderService.generate(dry_run=bool(data.get('dry_run')))
+    
+    if result['success']:
+        result['message'] = f'已登記 {result["added_count"]} 個補貨建議項目'
+    return jsonify(result)
+
 @weekly_order_bp.route('/weekly-orders/api/create-cycle', methods=['POST'])
 def create_new_cycle():
     """手動創建新週期（管理員功能）"""
@@ -0,0 +1,29 @@
+"""
+自動補貨建議產生工具
+依可用庫存、在途訂單、工單需求（分時段淨需求）與再訂購點／安全庫存計算所有零件的建議訂購量，
+以「系統自動」登記至當前週期申請，可由排程定期執行。
+執行方式: python generate_reorder_suggestions.py [--dry-run]
+--dry-run 只列出建議，不寫入資料庫。
+"""
+
+import sys
+
+from app import app
+from services.reorder_service import ReorderService
+
+
+if __name__ == '__main__':
+    dry_run = '--dry-run' in sys.argv[1:]
+    with app.app_context():
+        result = ReorderService.generate(dry_run=dry_run)
+
+    if not result['success']:
+        print(f"❌ {result['error']}")
+        sys.exit(1)
+
+    for item in result['suggestions']:
+        print(f"  {item['part_number']:<20} {item['quantity']:>8} {item['priority']:<7} {item['required_date'] or '-'}")
+    if dry_run:
+        print(f"\n📋 共 {result['suggestion_count']} 個補貨建議（未寫入）")
+    else:
+        print(f"\n✅ 已登記 {result['added_count']} 個補貨建議至週期 #{result['cycle_id']}")
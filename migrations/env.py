@@ -1,7 +1,8 @@
 import logging
+from contextlib import nullcontext
 from logging.config import fileConfig
 
-from flask import current_app
+from flask import current_app, has_app_context
 from app import app # ADD THIS LINE
 from extensions import db # ADD THIS LINE
 
@@ -43,6 +44,13 @@ def get_engine_url():
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata # This line will be set within app context
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Skip the FTS5 search index (parts_fts and its shadow tables) during autogenerate."""
+    if type_ == 'table' and name.startswith('parts_fts'):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -91,6 +99,8 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -109,7 +119,8 @@ if context.is_offline_mode():
     run_migrations_offline()
 else:
     # Ensure app context is pushed for online mode
-    with app.app_context():
+    # 已有 app context 時（flask db 指令，或以其他資料庫設定呼叫 flask_migrate.upgrade()）沿用該 app 的資料庫
+    with nullcontext() if has_app_context() else app.app_context():
         # These lines now execute within the app context
         config.set_main_option('sqlalchemy.url', get_engine_url())
         # target_db = current_app.extensions['migrate'].db # No longer needed as db is imported directly
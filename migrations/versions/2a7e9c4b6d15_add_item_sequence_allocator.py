@@ -0,0 +1,52 @@
+"""Add item sequence allocator to weekly order cycles
+
+Revision ID: 2a7e9c4b6d15
+Revises: 8f3c5a2d1b64
+Create Date: 2026-10-18 17:42:06.913572
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a7e9c4b6d15'
+down_revision = '8f3c5a2d1b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('weekly_order_cycles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_item_sequence', sa.Integer(), server_default='0', nullable=False, comment='已配置的最後項次'))
+
+    # 舊的登記流程以 MAX(item_sequence) + 1 取號，並行登記可能產生重複項次；
+    # 有重複項次的週期依原項次與建立順序重新編號，才能建立唯一約束
+    op.execute(
+        "UPDATE order_registrations SET item_sequence = ("
+        "SELECT numbered.sequence FROM ("
+        "SELECT id, ROW_NUMBER() OVER (PARTITION BY cycle_id ORDER BY item_sequence, id) AS sequence "
+        "FROM order_registrations) AS numbered WHERE numbered.id = order_registrations.id"
+        ") WHERE cycle_id IN ("
+        "SELECT cycle_id FROM order_registrations GROUP BY cycle_id, item_sequence HAVING COUNT(*) > 1)"
+    )
+
+    # 計數器從各週期現有的最大項次開始
+    op.execute(
+        "UPDATE weekly_order_cycles SET last_item_sequence = COALESCE(("
+        "SELECT MAX(item_sequence) FROM order_registrations "
+        "WHERE order_registrations.cycle_id = weekly_order_cycles.id), 0)"
+    )
+
+    with op.batch_alter_table('order_registrations', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_registrations_cycle_sequence')
+        batch_op.create_unique_constraint('uq_order_registrations_cycle_sequence', ['cycle_id', 'item_sequence'])
+
+
+def downgrade():
+    with op.batch_alter_table('order_registrations', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_order_registrations_cycle_sequence', type_='unique')
+        batch_op.create_index('ix_order_registrations_cycle_sequence', ['cycle_id', 'item_sequence'], unique=False)
+
+    with op.batch_alter_table('weekly_order_cycles', schema=None) as batch_op:
+        batch_op.drop_column('last_item_sequence')
@@ -0,0 +1,50 @@
+"""Add parts_fts full-text search index
+
+Revision ID: 4b8e2f61c3a7
+Revises: d7a41c9e5b20
+Create Date: 2026-10-18 13:05:22.481937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8e2f61c3a7'
+down_revision = 'd7a41c9e5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 external-content table over parts, trigram tokenizer for substring matches
+    op.execute(
+        "CREATE VIRTUAL TABLE parts_fts USING fts5("
+        "part_number, name, description, content='parts', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER parts_fts_ai AFTER INSERT ON parts BEGIN "
+        "INSERT INTO parts_fts(rowid, part_number, name, description) "
+        "VALUES (new.id, new.part_number, new.name, new.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER parts_fts_ad AFTER DELETE ON parts BEGIN "
+        "INSERT INTO parts_fts(parts_fts, rowid, part_number, name, description) "
+        "VALUES ('delete', old.id, old.part_number, old.name, old.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER parts_fts_au AFTER UPDATE OF part_number, name, description ON parts BEGIN "
+        "INSERT INTO parts_fts(parts_fts, rowid, part_number, name, description) "
+        "VALUES ('delete', old.id, old.part_number, old.name, old.description); "
+        "INSERT INTO parts_fts(rowid, part_number, name, description) "
+        "VALUES (new.id, new.part_number, new.name, new.description); END"
+    )
+    # Index existing parts
+    op.execute("INSERT INTO parts_fts(parts_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS parts_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS parts_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS parts_fts_ai")
+    op.execute("DROP TABLE IF EXISTS parts_fts")
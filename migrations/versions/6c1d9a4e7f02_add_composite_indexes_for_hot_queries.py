@@ -0,0 +1,55 @@
+"""Add composite indexes for hot query paths
+
+Revision ID: 6c1d9a4e7f02
+Revises: 4b8e2f61c3a7
+Create Date: 2026-10-18 14:20:51.302846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1d9a4e7f02'
+down_revision = '4b8e2f61c3a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # warehouse_locations (warehouse_id, location_code) is already covered by _warehouse_location_uc
+    with op.batch_alter_table('inventory_transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_inventory_transactions_date', ['transaction_date', 'id'], unique=False)
+        batch_op.create_index('ix_inventory_transactions_part_date', ['part_id', 'transaction_date', 'id'], unique=False)
+        batch_op.create_index('ix_inventory_transactions_warehouse_date', ['warehouse_id', 'transaction_date', 'id'], unique=False)
+        batch_op.create_index('ix_inventory_transactions_type_date', ['transaction_type', 'transaction_date', 'id'], unique=False)
+
+    with op.batch_alter_table('order_history', schema=None) as batch_op:
+        batch_op.create_index('ix_order_history_status_date', ['status', 'order_date'], unique=False)
+        batch_op.create_index('ix_order_history_part_date', ['part_id', 'order_date'], unique=False)
+
+    with op.batch_alter_table('order_registrations', schema=None) as batch_op:
+        batch_op.create_index('ix_order_registrations_cycle_sequence', ['cycle_id', 'item_sequence'], unique=False)
+        batch_op.create_index('ix_order_registrations_cycle_status_sequence', ['cycle_id', 'status', 'item_sequence'], unique=False)
+
+    with op.batch_alter_table('work_order_demand', schema=None) as batch_op:
+        batch_op.create_index('ix_work_order_demand_required_date', ['required_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('work_order_demand', schema=None) as batch_op:
+        batch_op.drop_index('ix_work_order_demand_required_date')
+
+    with op.batch_alter_table('order_registrations', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_registrations_cycle_status_sequence')
+        batch_op.drop_index('ix_order_registrations_cycle_sequence')
+
+    with op.batch_alter_table('order_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_history_part_date')
+        batch_op.drop_index('ix_order_history_status_date')
+
+    with op.batch_alter_table('inventory_transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_transactions_type_date')
+        batch_op.drop_index('ix_inventory_transactions_warehouse_date')
+        batch_op.drop_index('ix_inventory_transactions_part_date')
+        batch_op.drop_index('ix_inventory_transactions_date')
@@ -0,0 +1,38 @@
+"""Create part_demand_summary table
+
+Revision ID: 8f3c5a2d1b64
+Revises: 6c1d9a4e7f02
+Create Date: 2026-10-18 16:05:12.448317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3c5a2d1b64'
+down_revision = '6c1d9a4e7f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('part_demand_summary',
+        sa.Column('part_number', sa.String(length=100), nullable=False),
+        sa.Column('total_required', sa.Float(), nullable=False),
+        sa.Column('order_count', sa.Integer(), nullable=False),
+        sa.Column('material_description', sa.String(length=255), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('part_number')
+    )
+
+    # 以現有工單需求建立初始彙總
+    op.execute(
+        "INSERT INTO part_demand_summary (part_number, total_required, order_count, material_description, updated_at) "
+        "SELECT part_number, SUM(required_quantity), COUNT(order_id), MAX(material_description), CURRENT_TIMESTAMP "
+        "FROM work_order_demand GROUP BY part_number"
+    )
+
+
+def downgrade():
+    op.drop_table('part_demand_summary')
@@ -0,0 +1,39 @@
+"""Create import_jobs table
+
+Revision ID: d7a41c9e5b20
+Revises: 9e045d7078e3
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a41c9e5b20'
+down_revision = '9e045d7078e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('import_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('job_type', sa.String(length=50), nullable=False, comment='匯入類型: parts, work_orders, stock_count'),
+        sa.Column('status', sa.String(length=20), nullable=False, comment='狀態: queued, running, completed, failed'),
+        sa.Column('original_filename', sa.String(length=255), nullable=True, comment='上傳檔名'),
+        sa.Column('spool_path', sa.String(length=500), nullable=True, comment='暫存檔案路徑'),
+        sa.Column('params', sa.Text(), nullable=True, comment='匯入參數(JSON)'),
+        sa.Column('total_rows', sa.Integer(), nullable=True),
+        sa.Column('processed_rows', sa.Integer(), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True, comment='匯入結果(JSON)'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('import_jobs')
@@ -0,0 +1,51 @@
+from extensions import db
+from datetime import datetime, timedelta
+import json
+
+# Helper function to get current time in UTC+8
+def get_taipei_time():
+    from datetime import timezone
+    tz_taipei = timezone(timedelta(hours=8))
+    return datetime.now(tz_taipei)
+
+class ImportJob(db.Model):
+    """背景匯入工作 - 記錄上傳檔案的處理狀態，服務重啟後仍可查詢"""
+    __tablename__ = 'import_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, comment='匯入類型: parts, work_orders, stock_count')
+    status = db.Column(db.String(20), nullable=False, default='queued', comment='狀態: queued, running, completed, failed')
+    original_filename = db.Column(db.String(255), comment='上傳檔名')
+    spool_path = db.Column(db.String(500), comment='暫存檔案路徑')
+    params = db.Column(db.Text, comment='匯入參數(JSON)')
+    total_rows = db.Column(db.Integer, default=0)
+    processed_rows = db.Column(db.Integer, default=0)
+    result = db.Column(db.Text, comment='匯入結果(JSON)')
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=get_taipei_time)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.job_type}:{self.status}>'
+
+    def get_params(self):
+        return json.loads(self.params) if self.params else {}
+
+    def get_result(self):
+        return json.loads(self.result) if self.result else None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'filename': self.original_filename,
+            'total_rows': self.total_rows or 0,
+            'processed_rows': self.processed_rows or 0,
+            'result': self.get_result(),
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
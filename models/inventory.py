@@ -1,7 +1,11 @@
 from extensions import db
-from sqlalchemy.orm import relationship
+from sqlalchemy import case, func, insert, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased, relationship
 from datetime import datetime, timedelta
 from .part import Part, Warehouse # Import Part and Warehouse models
+import base64
+import json
 import random
 
 # Helper function to get current time in UTC+8
@@ -44,56 +48,114 @@ class CurrentInventory(db.Model):
             'warehouse_code': self.warehouse.code if self.warehouse else None,
         }
 
+    @classmethod
+    def list_query(cls):
+        """
+        列表用的欄位查詢：以單一 JOIN 取得 to_dict 的所有欄位，不建立 ORM 物件，也不逐筆載入零件與倉庫。
+        以 row_to_dict 轉為與 to_dict 相同格式的字典。
+        """
+        return db.session.query(
+            cls.id, cls.part_id, cls.warehouse_id, cls.quantity_on_hand, cls.reserved_quantity,
+            cls.available_quantity, cls.last_updated,
+            Part.part_number, Part.name.label('part_name'), Part.unit, Part.safety_stock, Part.reorder_point,
+            Warehouse.name.label('warehouse_name'), Warehouse.code.label('warehouse_code')
+        ).join(Part, cls.part_id == Part.id).join(Warehouse, cls.warehouse_id == Warehouse.id)
+
+    @staticmethod
+    def row_to_dict(row):
+        data = row._asdict()
+        data['last_updated'] = row.last_updated.isoformat() if row.last_updated else None
+        return data
+
     @classmethod
     def get_current_stock(cls, part_id, warehouse_id=None):
-        query = cls.query.filter_by(part_id=part_id)
+        query = cls.list_query().filter(cls.part_id == part_id)
         if warehouse_id:
-            stock = query.filter_by(warehouse_id=warehouse_id).first()
-            return stock.to_dict() if stock else None
-        stocks = query.all()
-        return [stock.to_dict() for stock in stocks]
+            stock = query.filter(cls.warehouse_id == warehouse_id).first()
+            return cls.row_to_dict(stock) if stock else None
+        return [cls.row_to_dict(row) for row in query.all()]
 
     @classmethod
     def get_all_inventory(cls, warehouse_id=None):
-        query = cls.query.join(Part).join(Warehouse)
+        query = cls.list_query()
         if warehouse_id:
             query = query.filter(cls.warehouse_id == warehouse_id)
-        inventories = query.order_by(Warehouse.code, Part.part_number).all()
-        return [inv.to_dict() for inv in inventories]
+        rows = query.order_by(Warehouse.code, Part.part_number).all()
+        return [cls.row_to_dict(row) for row in rows]
 
     @classmethod
     def get_low_stock_items(cls, warehouse_id=None):
-        query = cls.query.join(Part).join(Warehouse)
+        query = cls.list_query()
         if warehouse_id:
             query = query.filter(cls.warehouse_id == warehouse_id)
         query = query.filter(cls.available_quantity <= Part.reorder_point)
-        items = query.order_by(cls.available_quantity - Part.reorder_point).all()
-        return [item.to_dict() for item in items]
+        rows = query.order_by(cls.available_quantity - Part.reorder_point).all()
+        return [cls.row_to_dict(row) for row in rows]
 
     @classmethod
-    def update_stock(cls, part_id, warehouse_id, quantity_change, transaction_type, reference_type=None, reference_id=None, notes=None):
-        current_stock = cls.query.filter_by(part_id=part_id, warehouse_id=warehouse_id).first()
-        
-        if not current_stock:
-            # If inventory record doesn't exist, create a new one
-            new_quantity = max(0, quantity_change)
-            new_available = new_quantity
-            current_stock = cls(
+    def apply_stock_change(cls, part_id, warehouse_id, quantity_change, transaction_type, reference_type=None,
+                           reference_id=None, notes=None, require_available=True, commit=True):
+        """
+        以單一條件式 UPDATE（入庫為 INSERT ... ON CONFLICT DO UPDATE）原子性地異動庫存，並在同一交易寫入異動記錄。
+        不先讀取庫存再寫回，並行出庫時不會遺失更新。
+        出庫且 require_available 為 True 時，只有可用庫存足夠才會扣帳，是否足夠由 UPDATE 的影響筆數判斷；
+        require_available 為 False 時（例如盤點調整），扣帳後的數量最低為 0。
+        commit 為 False 時由呼叫端負責提交或回滾（批次異動使用）。
+        Returns {'success': True} or {'success': False, 'error': ..., 'available_quantity': ...}
+        """
+        table = cls.__table__
+        now = get_taipei_time()
+
+        if quantity_change >= 0:
+            stmt = sqlite_insert(table).values(
                 part_id=part_id,
                 warehouse_id=warehouse_id,
-                quantity_on_hand=new_quantity,
-                available_quantity=new_available
+                quantity_on_hand=quantity_change,
+                reserved_quantity=0,
+                available_quantity=quantity_change,
+                last_updated=now
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.part_id, table.c.warehouse_id],
+                set_={
+                    'quantity_on_hand': table.c.quantity_on_hand + quantity_change,
+                    'available_quantity': table.c.available_quantity + quantity_change,
+                    'last_updated': now
+                }
             )
-            db.session.add(current_stock)
+            db.session.execute(stmt)
         else:
-            # Update existing inventory
-            current_stock.quantity_on_hand += quantity_change
-            current_stock.available_quantity = current_stock.quantity_on_hand # Simplified, not considering reserved
-            current_stock.quantity_on_hand = max(0, current_stock.quantity_on_hand)
-            current_stock.available_quantity = max(0, current_stock.available_quantity)
-        
+            conditions = [table.c.part_id == part_id, table.c.warehouse_id == warehouse_id]
+            if require_available:
+                conditions.append(table.c.available_quantity >= -quantity_change)
+                values = {
+                    'quantity_on_hand': table.c.quantity_on_hand + quantity_change,
+                    'available_quantity': table.c.available_quantity + quantity_change,
+                }
+            else:
+                values = {
+                    'quantity_on_hand': case((table.c.quantity_on_hand + quantity_change < 0, 0),
+                                             else_=table.c.quantity_on_hand + quantity_change),
+                    'available_quantity': case((table.c.available_quantity + quantity_change < 0, 0),
+                                               else_=table.c.available_quantity + quantity_change),
+                }
+            values['last_updated'] = now
+            result = db.session.execute(update(table).where(*conditions).values(**values))
+
+            if result.rowcount == 0:
+                if require_available:
+                    available = db.session.query(cls.available_quantity).filter_by(
+                        part_id=part_id, warehouse_id=warehouse_id
+                    ).scalar()
+                    return {'success': False, 'error': 'insufficient_stock', 'available_quantity': available or 0}
+                # If inventory record doesn't exist, create an empty one
+                db.session.execute(sqlite_insert(table).values(
+                    part_id=part_id, warehouse_id=warehouse_id, quantity_on_hand=0,
+                    reserved_quantity=0, available_quantity=0, last_updated=now
+                ).on_conflict_do_nothing())
+
         # Record transaction
-        transaction = InventoryTransaction(
+        db.session.execute(insert(InventoryTransaction.__table__).values(
             part_id=part_id,
             warehouse_id=warehouse_id,
             transaction_type=transaction_type,
@@ -101,17 +163,31 @@ class CurrentInventory(db.Model):
             reference_type=reference_type,
             reference_id=reference_id,
             notes=notes,
-            transaction_date=get_taipei_time()
-        )
-        db.session.add(transaction)
-        
+            transaction_date=now
+        ))
+
+        if commit:
+            try:
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"更新庫存失敗: {e}")
+                return {'success': False, 'error': str(e)}
+        return {'success': True}
+
+    @classmethod
+    def update_stock(cls, part_id, warehouse_id, quantity_change, transaction_type, reference_type=None, reference_id=None, notes=None):
+        """異動庫存（不檢查可用量，扣帳後最低為 0），成功回傳 True"""
         try:
-            db.session.commit()
-            return True
+            result = cls.apply_stock_change(
+                part_id, warehouse_id, quantity_change, transaction_type,
+                reference_type, reference_id, notes, require_available=False
+            )
         except Exception as e:
             db.session.rollback()
             print(f"更新庫存失敗: {e}")
             return False
+        return result['success']
 
 class InventoryTransaction(db.Model):
     __tablename__ = 'inventory_transactions'
@@ -128,6 +204,14 @@ class InventoryTransaction(db.Model):
     created_by = db.Column(db.String(100), default='system')
     created_at = db.Column(db.DateTime, default=get_taipei_time)
 
+    # 異動記錄查詢皆依 transaction_date, id 倒序排列
+    __table_args__ = (
+        db.Index('ix_inventory_transactions_date', 'transaction_date', 'id'),
+        db.Index('ix_inventory_transactions_part_date', 'part_id', 'transaction_date', 'id'),
+        db.Index('ix_inventory_transactions_warehouse_date', 'warehouse_id', 'transaction_date', 'id'),
+        db.Index('ix_inventory_transactions_type_date', 'transaction_type', 'transaction_date', 'id'),
+    )
+
     # Relationships
     part = relationship("Part", backref="transactions")
     warehouse = relationship("Warehouse", backref="transactions")
@@ -151,14 +235,131 @@ class InventoryTransaction(db.Model):
             'warehouse_name': self.warehouse.name if self.warehouse else None,
         }
 
+    @classmethod
+    def list_query(cls):
+        """列表用的欄位查詢：以單一 JOIN 取得異動記錄與零件、倉庫名稱，以 row_to_dict 轉為與 to_dict 相同格式的字典"""
+        return db.session.query(
+            cls.id, cls.part_id, cls.warehouse_id, cls.transaction_type, cls.quantity, cls.unit_cost,
+            cls.reference_type, cls.reference_id, cls.notes, cls.transaction_date, cls.created_by, cls.created_at,
+            Part.part_number, Part.name.label('part_name'), Warehouse.name.label('warehouse_name')
+        ).join(Part, cls.part_id == Part.id).join(Warehouse, cls.warehouse_id == Warehouse.id)
+
+    @staticmethod
+    def row_to_dict(row):
+        data = row._asdict()
+        # 以 SQL 直接寫入的舊資料可能沒有 unit_cost，視為欄位預設值 0
+        data['unit_cost'] = float(row.unit_cost or 0)
+        data['transaction_date'] = row.transaction_date.isoformat() if row.transaction_date else None
+        data['created_at'] = row.created_at.isoformat() if row.created_at else None
+        return data
+
     @classmethod
     def get_transactions(cls, part_id=None, warehouse_id=None, limit=100):
-        query = cls.query.join(Part).join(Warehouse)
+        query = cls.list_query()
         if part_id:
             query = query.filter(cls.part_id == part_id)
         if warehouse_id:
             query = query.filter(cls.warehouse_id == warehouse_id)
-        return query.order_by(db.desc(cls.transaction_date), db.desc(cls.id)).limit(limit).all()
+        rows = query.order_by(db.desc(cls.transaction_date), db.desc(cls.id)).limit(limit).all()
+        return [cls.row_to_dict(row) for row in rows]
+
+    @classmethod
+    def apply_filters(cls, query, part_id=None, warehouse_id=None, transaction_type=None, date_from=None, date_to=None):
+        """
+        異動記錄列表、API 與匯出共用的篩選條件。
+        date_from / date_to 為 'YYYY-MM-DD' 字串，結束日期包含當天所有記錄，格式錯誤時忽略。
+        """
+        if part_id:
+            query = query.filter(cls.part_id == part_id)
+        if warehouse_id:
+            query = query.filter(cls.warehouse_id == warehouse_id)
+        if transaction_type:
+            query = query.filter(cls.transaction_type == transaction_type)
+        if date_from:
+            try:
+                from_date = datetime.strptime(date_from, '%Y-%m-%d')
+                query = query.filter(cls.transaction_date >= from_date)
+            except ValueError:
+                pass
+        if date_to:
+            try:
+                to_date = datetime.strptime(date_to, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+                query = query.filter(cls.transaction_date <= to_date)
+            except ValueError:
+                pass
+        return query
+
+    @staticmethod
+    def encode_cursor(transaction_date, transaction_id):
+        """將排序鍵 (transaction_date, id) 編碼為不透明的分頁游標"""
+        payload = json.dumps([transaction_date.isoformat(), transaction_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """解碼分頁游標，格式錯誤時拋出 ValueError"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            transaction_date, transaction_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            return datetime.fromisoformat(transaction_date), int(transaction_id)
+        except (TypeError, ValueError, UnicodeError) as e:
+            raise ValueError(f'Invalid cursor: {cursor}') from e
+
+    @classmethod
+    def seek_position(cls, transaction_date, transaction_id):
+        """
+        游標對應的排序鍵：日期取自資料庫中該筆記錄儲存的值，而非游標中的 datetime。
+        舊資料的日期以不含微秒的文字儲存（例如 database_setup_inventory.py 寫入的 'YYYY-MM-DD HH:MM:SS'），
+        與綁定參數的 'YYYY-MM-DD HH:MM:SS.ffffff' 以字串比較時，游標所在的記錄會被再次回傳。
+        游標的記錄已刪除時才使用游標中的日期。
+        """
+        cursor_row = aliased(cls)
+        stored_date = select(cursor_row.transaction_date).where(cursor_row.id == transaction_id).scalar_subquery()
+        return tuple_(func.coalesce(stored_date, transaction_date), transaction_id)
+
+    @classmethod
+    def get_transactions_page(cls, part_id=None, warehouse_id=None, transaction_type=None, date_from=None,
+                              date_to=None, cursor=None, direction='next', limit=50, include_total=False):
+        """
+        以 keyset 分頁取得異動記錄（依 transaction_date, id 倒序），不使用 OFFSET。
+        cursor 為上一頁回傳的 next_cursor（direction='next'）或 prev_cursor（direction='prev'）。
+        只有 include_total 為 True 時才計算總筆數。
+        Returns {'transactions': [...], 'next_cursor', 'prev_cursor', 'has_next', 'has_prev', 'total'}
+        """
+        sort_key = tuple_(cls.transaction_date, cls.id)
+        query = cls.list_query()
+        query = cls.apply_filters(query, part_id, warehouse_id, transaction_type, date_from, date_to)
+
+        total = query.order_by(None).count() if include_total else None
+
+        backwards = direction == 'prev' and cursor is not None
+        if cursor is not None:
+            position = cls.seek_position(*cls.decode_cursor(cursor))
+            query = query.filter(sort_key > position if backwards else sort_key < position)
+        if backwards:
+            query = query.order_by(cls.transaction_date, cls.id)
+        else:
+            query = query.order_by(db.desc(cls.transaction_date), db.desc(cls.id))
+
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+
+        has_next = True if backwards else has_more
+        has_prev = has_more if backwards else cursor is not None
+
+        transactions = [cls.row_to_dict(row) for row in rows]
+
+        return {
+            'transactions': transactions,
+            'next_cursor': cls.encode_cursor(rows[-1].transaction_date, rows[-1].id) if rows and has_next else None,
+            'prev_cursor': cls.encode_cursor(rows[0].transaction_date, rows[0].id) if rows and has_prev else None,
+            'has_next': bool(rows) and has_next,
+            'has_prev': bool(rows) and has_prev,
+            'total': total
+        }
 
     @classmethod
     def get_transaction_summary(cls, part_id, warehouse_id=None, days=30):
@@ -221,15 +422,31 @@ class StockCount(db.Model):
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
         }
 
+    @classmethod
+    def list_query(cls):
+        """列表用的欄位查詢：倉庫名稱以 LEFT JOIN 取得，以 row_to_dict 轉為與 to_dict 相同格式的字典"""
+        return db.session.query(
+            cls.id, cls.count_number, cls.warehouse_id, Warehouse.name.label('warehouse_name'),
+            cls.count_date, cls.status, cls.count_type, cls.description, cls.counted_by, cls.verified_by,
+            cls.total_items, cls.variance_items, cls.created_at, cls.completed_at
+        ).outerjoin(Warehouse, cls.warehouse_id == Warehouse.id)
+
+    @staticmethod
+    def row_to_dict(row):
+        data = row._asdict()
+        for key in ('count_date', 'created_at', 'completed_at'):
+            data[key] = data[key].isoformat() if data[key] else None
+        return data
+
     @classmethod
     def get_all_counts(cls):
-        counts = cls.query.order_by(db.desc(cls.created_at)).all()
-        return [count.to_dict() for count in counts]
+        rows = cls.list_query().order_by(db.desc(cls.created_at)).all()
+        return [cls.row_to_dict(row) for row in rows]
 
     @classmethod
     def get_count_by_id(cls, count_id):
-        count = cls.query.get(count_id)
-        return count.to_dict() if count else None
+        row = cls.list_query().filter(cls.id == count_id).first()
+        return cls.row_to_dict(row) if row else None
 
     @classmethod
     def create_count(cls, warehouse_id, count_type='full', description='', counted_by=''):
@@ -331,10 +548,10 @@ class StockCount(db.Model):
 
     @classmethod
     def get_count_details(cls, count_id):
-        details = StockCountDetail.query.join(Part).filter(
+        rows = StockCountDetail.list_query().filter(
             StockCountDetail.stock_count_id == count_id
         ).order_by(Part.part_number).all()
-        return [detail.to_dict() for detail in details]
+        return [StockCountDetail.row_to_dict(row) for row in rows]
 
     @classmethod
     def update_count_detail(cls, detail_id, counted_quantity, notes=''):
@@ -370,11 +587,15 @@ class StockCount(db.Model):
         return True
 
     @classmethod
-    def import_count_data(cls, count_id, count_data):
+    def import_count_data(cls, count_id, count_data, progress_callback=None):
         success_count = 0
         error_list = []
+        total_rows = len(count_data)
         
         for row_num, row_data in enumerate(count_data, 1):
+            if progress_callback:
+                progress_callback(row_num - 1, total_rows)
+
             try:
                 part_number = row_data.get('part_number', '').strip()
                 counted_qty = row_data.get('counted_quantity', 0)
@@ -411,6 +632,8 @@ class StockCount(db.Model):
                 error_list.append(f"第{row_num}行: 處理錯誤 - {str(e)}")
         
         db.session.commit()
+        if progress_callback:
+            progress_callback(total_rows, total_rows)
         return success_count, error_list
 
 class StockCountDetail(db.Model):
@@ -444,3 +667,17 @@ class StockCountDetail(db.Model):
             'notes': self.notes,
             'counted_at': self.counted_at.isoformat() if self.counted_at else None,
         }
+
+    @classmethod
+    def list_query(cls):
+        """列表用的欄位查詢：以單一 JOIN 取得盤點明細與零件資料，以 row_to_dict 轉為與 to_dict 相同格式的字典"""
+        return db.session.query(
+            cls.id, cls.stock_count_id, cls.part_id, Part.part_number, Part.name.label('part_name'), Part.unit,
+            cls.system_quantity, cls.counted_quantity, cls.variance_quantity, cls.notes, cls.counted_at
+        ).join(Part, cls.part_id == Part.id)
+
+    @staticmethod
+    def row_to_dict(row):
+        data = row._asdict()
+        data['counted_at'] = row.counted_at.isoformat() if row.counted_at else None
+        return data
@@ -27,6 +27,11 @@ class Order(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=get_taipei_time)
 
+    __table_args__ = (
+        db.Index('ix_order_history_status_date', 'status', 'order_date'),
+        db.Index('ix_order_history_part_date', 'part_id', 'order_date'),
+    )
+
     # Relationships
     part = relationship("Part", backref="order_history")
     warehouse = relationship("Warehouse", backref="orders")
@@ -77,6 +82,27 @@ class Order(db.Model):
         db.session.commit()
         return True
     
+    @classmethod
+    def list_query(cls):
+        """
+        列表用的欄位查詢：零件與倉庫名稱以 LEFT JOIN 一次取得，不建立 ORM 物件。
+        以 row_to_dict 轉為與 to_dict 相同格式的字典。
+        """
+        return db.session.query(
+            cls.id, cls.part_id, Part.part_number, Part.name.label('part_name'),
+            cls.warehouse_id, Warehouse.name.label('warehouse_name'), cls.location_code,
+            cls.order_date, cls.quantity_ordered, cls.quantity_received, cls.unit_cost, cls.status,
+            cls.supplier, cls.expected_date, cls.received_date, cls.notes, cls.created_at
+        ).outerjoin(Part, cls.part_id == Part.id).outerjoin(Warehouse, cls.warehouse_id == Warehouse.id)
+
+    @staticmethod
+    def row_to_dict(row):
+        data = row._asdict()
+        data['unit_cost'] = float(row.unit_cost or 0)
+        for key in ('order_date', 'expected_date', 'received_date', 'created_at'):
+            data[key] = data[key].isoformat() if data[key] else None
+        return data
+
     @classmethod
     def get_history_by_part_id(cls, part_id):
         return cls.query.filter_by(part_id=part_id).order_by(db.desc(cls.order_date)).all()
@@ -87,13 +113,13 @@ class Order(db.Model):
     
     @classmethod
     def get_pending_orders(cls):
-        from sqlalchemy.orm import joinedload
-        return cls.query.options(joinedload(cls.part), joinedload(cls.warehouse)).filter_by(status='pending').order_by(db.desc(cls.order_date)).all()
+        rows = cls.list_query().filter(cls.status == 'pending').order_by(db.desc(cls.order_date)).all()
+        return [cls.row_to_dict(row) for row in rows]
     
     @classmethod
     def get_all_orders(cls):
-        from sqlalchemy.orm import joinedload
-        return cls.query.options(joinedload(cls.part), joinedload(cls.warehouse)).order_by(db.desc(cls.order_date)).all()
+        rows = cls.list_query().order_by(db.desc(cls.order_date)).all()
+        return [cls.row_to_dict(row) for row in rows]
     
     @classmethod
     def confirm_orders(cls, order_ids):
@@ -1,5 +1,5 @@
 from extensions import db # Import the SQLAlchemy db instance
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import joinedload, relationship, selectinload
 from sqlalchemy import event
 from datetime import datetime
 
@@ -127,6 +127,7 @@ class Part(db.Model):
     def to_dict(self, include_locations=False):
         data = {
             'id': self.id,
+            'part_number': self.part_number,
             'name': self.name,
             'type': self.type,
             'remarks': self.description, # Renamed from description
@@ -143,6 +144,21 @@ class Part(db.Model):
             data['locations'] = [assoc.warehouse_location.to_dict() for assoc in self.location_associations]
         return data
 
+    @classmethod
+    def list_query(cls):
+        """欄位查詢：只取 to_dict 所需欄位，不建立 ORM 物件，以 row_to_dict 轉為與 to_dict 相同格式的字典"""
+        return db.session.query(
+            cls.id, cls.part_number, cls.name, cls.type, cls.description.label('remarks'), cls.unit,
+            cls.quantity_per_box, cls.safety_stock, cls.reorder_point, cls.standard_cost, cls.is_active, cls.created_at
+        )
+
+    @staticmethod
+    def row_to_dict(row):
+        data = row._asdict()
+        data['standard_cost'] = float(row.standard_cost or 0)
+        data['created_at'] = row.created_at.isoformat() if row.created_at else None
+        return data
+
     @classmethod
     def get_by_part_number(cls, part_number):
         return cls.query.filter_by(part_number=part_number).first()
@@ -153,14 +169,17 @@ class Part(db.Model):
     
     @classmethod
     def get_all(cls, search_term=None, sort_by='part_number', sort_order='asc', page=1, per_page=50):
-        from sqlalchemy import or_
-        query = cls.query
+        from services.part_search_service import PartSearchService
+        # 列表頁面顯示各零件的倉位，以兩次 IN 查詢預先載入，避免逐零件查詢
+        query = cls.query.options(
+            selectinload(cls.location_associations)
+            .selectinload(PartWarehouseLocation.warehouse_location)
+            .joinedload(WarehouseLocation.warehouse)
+        )
 
         if search_term:
-            query = query.filter(or_(
-                cls.name.ilike(f'%{search_term}%'),
-                cls.part_number.ilike(f'%{search_term}%')
-            ))
+            # 關鍵字夠長時使用 parts_fts 全文檢索索引，否則為 LIKE 查詢
+            query = query.filter(PartSearchService.matching_ids_clause(search_term))
         
         # Basic validation for sort_by
         valid_columns = ['part_number', 'name', 'description', 'unit', 'quantity_per_box', 
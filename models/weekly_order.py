@@ -1,5 +1,6 @@
 from extensions import db
 from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
 from sqlalchemy.orm import relationship
 
 # Helper function to get current time in UTC+8
@@ -22,6 +23,7 @@ class WeeklyOrderCycle(db.Model):
     excel_generated = db.Column(db.Boolean, default=False, comment='是否已生成Excel')
     excel_path = db.Column(db.String(500), nullable=True, comment='Excel檔案路徑')
     notes = db.Column(db.Text, nullable=True, comment='備註')
+    last_item_sequence = db.Column(db.Integer, nullable=False, default=0, server_default='0', comment='已配置的最後項次')
     created_at = db.Column(db.DateTime, default=get_taipei_time)
     updated_at = db.Column(db.DateTime, default=get_taipei_time, onupdate=get_taipei_time)
     
@@ -56,15 +58,58 @@ class WeeklyOrderCycle(db.Model):
             deadline_aware = deadline_aware.replace(tzinfo=tz_taipei)
         return now > deadline_aware
     
+    # 統計的登記狀態
+    REGISTRATION_STATUSES = ('registered', 'approved', 'rejected')
+    
+    @classmethod
+    def registration_stats(cls, cycle_ids):
+        """
+        以單一 GROUP BY 查詢統計多個週期的登記數量，不載入登記資料。
+        Returns {cycle_id: {'total': int, 'registered': int, 'approved': int, 'rejected': int}}
+        """
+        cycle_ids = list(cycle_ids)
+        stats = {cycle_id: dict.fromkeys(('total',) + cls.REGISTRATION_STATUSES, 0) for cycle_id in cycle_ids}
+        if not cycle_ids:
+            return stats
+        
+        rows = db.session.query(
+            OrderRegistration.cycle_id, OrderRegistration.status, db.func.count(OrderRegistration.id)
+        ).filter(
+            OrderRegistration.cycle_id.in_(cycle_ids)
+        ).group_by(OrderRegistration.cycle_id, OrderRegistration.status).all()
+        
+        for cycle_id, status, count in rows:
+            stats[cycle_id]['total'] += count
+            if status in cls.REGISTRATION_STATUSES:
+                stats[cycle_id][status] += count
+        return stats
+    
+    @classmethod
+    def load_stats(cls, cycles):
+        """為多個週期一次查詢並暫存登記統計，之後讀取 stats 屬性不再查詢"""
+        stats = cls.registration_stats(cycle.id for cycle in cycles)
+        for cycle in cycles:
+            cycle._stats = stats[cycle.id]
+        return cycles
+    
+    @property
+    def stats(self):
+        """登記狀態統計（未預先載入時查詢本週期）"""
+        cached = self.__dict__.get('_stats')
+        if cached is None:
+            cached = self.registration_stats([self.id])[self.id]
+            self._stats = cached
+        return cached
+    
     @property
     def total_registrations(self):
         """總登記數量"""
-        return len(self.registrations)
+        return self.stats['total']
     
     @property
     def approved_registrations(self):
         """已核准的登記數量"""
-        return len([r for r in self.registrations if r.status == 'approved'])
+        return self.stats['approved']
     
     def to_dict(self):
         return {
@@ -81,6 +126,22 @@ class WeeklyOrderCycle(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
+    @classmethod
+    def reserve_sequences(cls, cycle_id, count):
+        """
+        以單一 UPDATE ... RETURNING 原子性地保留 count 個連續項次，回傳第一個項次。
+        項次計數器與登記資料在同一交易中更新（不 commit），交易回滾時計數器一併回滾，項次不會跳號；
+        並行登記時由資料庫的寫入鎖序列化，不會取得重複項次。
+        """
+        table = cls.__table__
+        last_sequence = db.session.execute(
+            table.update()
+            .where(table.c.id == cycle_id)
+            .values(last_item_sequence=table.c.last_item_sequence + count)
+            .returning(table.c.last_item_sequence)
+        ).scalar_one()
+        return last_sequence - count + 1
+    
     @classmethod
     def get_current_cycle(cls):
         """獲取當前活躍的申請週期"""
@@ -140,6 +201,11 @@ class OrderRegistration(db.Model):
     created_at = db.Column(db.DateTime, default=get_taipei_time)
     updated_at = db.Column(db.DateTime, default=get_taipei_time, onupdate=get_taipei_time)
     
+    __table_args__ = (
+        db.UniqueConstraint('cycle_id', 'item_sequence', name='uq_order_registrations_cycle_sequence'),
+        db.Index('ix_order_registrations_cycle_status_sequence', 'cycle_id', 'status', 'item_sequence'),
+    )
+    
     # 關聯
     cycle = relationship("WeeklyOrderCycle", back_populates="registrations")
     
@@ -165,6 +231,69 @@ class OrderRegistration(db.Model):
             'admin_notes': self.admin_notes,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+    
+    # 批量審查時以 id 清單更新的每批筆數（避免超過 SQLite 參數數量上限）
+    REVIEW_CHUNK_SIZE = 500
+    # 條件批量審查可使用的篩選欄位
+    REVIEW_FILTER_FIELDS = ('department', 'priority', 'category')
+    
+    @classmethod
+    def batch_review(cls, action, reviewer_name, registration_ids=None, cycle_id=None, filters=None, notes=None):
+        """
+        以集合式 UPDATE 批量審查待審查 (registered) 的登記項目，並批量寫入審查記錄（不 commit）。
+        指定 registration_ids 時審查這些項目；否則審查 cycle_id 週期中符合 filters
+        (department / priority / category) 的所有待審查項目。
+        每批為一個 UPDATE ... WHERE status='registered' RETURNING，已審查過的項目不會被重複處理。
+        Returns {'success': bool, 'updated_count': int, 'registration_ids': [...]}
+        """
+        if action not in ('approved', 'rejected'):
+            return {'success': False, 'error': '無效的操作'}
+        
+        table = cls.__table__
+        base = table.update().where(table.c.status == 'registered').values(
+            status=action, updated_at=get_taipei_time()
+        ).returning(table.c.id, table.c.cycle_id)
+        
+        if registration_ids is not None:
+            ids = list(dict.fromkeys(int(reg_id) for reg_id in registration_ids))
+            statements = [
+                base.where(table.c.id.in_(ids[start:start + cls.REVIEW_CHUNK_SIZE]))
+                for start in range(0, len(ids), cls.REVIEW_CHUNK_SIZE)
+            ]
+        elif cycle_id is not None:
+            conditions = [table.c.cycle_id == cycle_id]
+            for field, value in (filters or {}).items():
+                if field not in cls.REVIEW_FILTER_FIELDS:
+                    return {'success': False, 'error': f'不支援的篩選條件: {field}'}
+                if value not in (None, ''):
+                    conditions.append(table.c[field] == value)
+            statements = [base.where(*conditions)]
+        else:
+            return {'success': False, 'error': '請提供登記項目或審查條件'}
+        
+        updated = []
+        for stmt in statements:
+            updated.extend(db.session.execute(stmt).all())
+        
+        if updated:
+            db.session.execute(insert(OrderReviewLog), [
+                {
+                    'cycle_id': row.cycle_id,
+                    'registration_id': row.id,
+                    'reviewer_name': reviewer_name,
+                    'action': action,
+                    'old_status': 'registered',
+                    'new_status': action,
+                    'notes': notes or f'批量{action}'
+                }
+                for row in updated
+            ])
+        
+        return {
+            'success': True,
+            'updated_count': len(updated),
+            'registration_ids': [row.id for row in updated]
+        }
 
 
 class User(db.Model):
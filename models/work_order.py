@@ -1,5 +1,6 @@
 from extensions import db
 from datetime import datetime, timedelta
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 def get_taipei_time():
     from datetime import timezone
@@ -19,7 +20,10 @@ class WorkOrderDemand(db.Model):
     bulk_material = db.Column(db.String(10)) # 散裝物料
     created_at = db.Column(db.DateTime, default=get_taipei_time)
 
-    __table_args__ = (db.UniqueConstraint('order_id', 'part_number', name='_order_part_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('order_id', 'part_number', name='_order_part_uc'),
+        db.Index('ix_work_order_demand_required_date', 'required_date'),
+    )
 
     def to_dict(self):
         return {
@@ -30,41 +34,11 @@ class WorkOrderDemand(db.Model):
             'material_description': self.material_description,
             'operation_description': self.operation_description,
             'parent_material_description': self.parent_material_description,
-            'required_date': self.required_date.isoformat() if self.required_date else None,
+            'required_date': self.required_date,
             'bulk_material': self.bulk_material,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'created_at': self.created_at,
         }
 
-    @classmethod
-    def create_from_excel(cls, data):
-        """從 Excel 資料創建或更新工單需求記錄"""
-        existing = cls.query.filter_by(
-            order_id=data['order_id'],
-            part_number=data['part_number']
-        ).first()
-        
-        if existing:
-            # 更新現有記錄
-            existing.required_quantity = data['required_quantity']
-            existing.material_description = data.get('material_description', '')
-            existing.operation_description = data.get('operation_description', '')
-            existing.parent_material_description = data.get('parent_material_description', '')
-            existing.required_date = data['required_date']
-            existing.bulk_material = data.get('bulk_material', '')
-            return existing
-        else:
-            # 創建新記錄
-            new_demand = cls()
-            new_demand.order_id = data['order_id']
-            new_demand.part_number = data['part_number']
-            new_demand.required_quantity = data['required_quantity']
-            new_demand.material_description = data.get('material_description', '')
-            new_demand.operation_description = data.get('operation_description', '')
-            new_demand.parent_material_description = data.get('parent_material_description', '')
-            new_demand.required_date = data['required_date']
-            new_demand.bulk_material = data.get('bulk_material', '')
-            return new_demand
-    
     @classmethod
     def get_by_order(cls, order_id):
         """依訂單編號查詢工單需求"""
@@ -88,3 +62,78 @@ class WorkOrderDemand(db.Model):
     
     def __repr__(self):
         return f'<WorkOrderDemand {self.order_id}-{self.part_number}>'
+
+
+class PartDemandSummary(db.Model):
+    """
+    每個料號的工單需求彙總（需求總量、關聯工單數），供差異分析與缺料查詢直接讀取，不需彙總整個 work_order_demand。
+    由工單匯入與刪除流程以差異量增量維護；資料不一致時以 rebuild() 或 rebuild_part_demand_summary.py 重建。
+    material_description 為該料號出現過的最大物料說明，刪除需求後不會回退，重建後才會重新計算。
+    """
+    __tablename__ = 'part_demand_summary'
+    part_number = db.Column(db.String(100), primary_key=True) # 物料
+    total_required = db.Column(db.Float, nullable=False, default=0) # 需求總量
+    order_count = db.Column(db.Integer, nullable=False, default=0) # 關聯工單數
+    material_description = db.Column(db.String(255)) # 物料說明
+    updated_at = db.Column(db.DateTime, default=get_taipei_time, onupdate=get_taipei_time)
+
+    def to_dict(self):
+        return {
+            'part_number': self.part_number,
+            'total_required': self.total_required,
+            'order_count': self.order_count,
+            'material_description': self.material_description,
+            'updated_at': self.updated_at,
+        }
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        套用需求差異量（不 commit，與需求異動在同一交易中）。
+        deltas: [{'part_number', 'total_required', 'order_count', 'material_description'}, ...]，每個料號一筆，
+        數量與工單數為增減量；工單數降為 0 的料號會刪除彙總列。
+        """
+        if not deltas:
+            return
+        table = cls.__table__
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.part_number],
+            set_={
+                'total_required': table.c.total_required + stmt.excluded.total_required,
+                'order_count': table.c.order_count + stmt.excluded.order_count,
+                'material_description': db.func.max(
+                    db.func.coalesce(table.c.material_description, ''),
+                    db.func.coalesce(stmt.excluded.material_description, '')
+                ),
+                'updated_at': stmt.excluded.updated_at,
+            }
+        )
+        now = get_taipei_time()
+        db.session.execute(stmt, [dict(delta, updated_at=now) for delta in deltas])
+        db.session.execute(table.delete().where(
+            table.c.part_number.in_([delta['part_number'] for delta in deltas]),
+            table.c.order_count <= 0
+        ))
+
+    @classmethod
+    def rebuild(cls):
+        """由 work_order_demand 重新彙總整個資料表，回傳彙總後的料號數"""
+        table = cls.__table__
+        demand = WorkOrderDemand.__table__
+        db.session.execute(table.delete())
+        db.session.execute(table.insert().from_select(
+            ['part_number', 'total_required', 'order_count', 'material_description', 'updated_at'],
+            db.select(
+                demand.c.part_number,
+                db.func.sum(demand.c.required_quantity),
+                db.func.count(demand.c.order_id),
+                db.func.max(demand.c.material_description),
+                db.literal(get_taipei_time(), db.DateTime)
+            ).group_by(demand.c.part_number)
+        ))
+        db.session.commit()
+        return db.session.query(db.func.count(cls.part_number)).scalar()
+
+    def __repr__(self):
+        return f'<PartDemandSummary {self.part_number}>'
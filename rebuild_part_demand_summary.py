@@ -0,0 +1,15 @@
+"""
+工單需求彙總重建工具
+由 work_order_demand 重新計算 part_demand_summary（每個料號的需求總量與關聯工單數），
+用於彙總資料與工單需求不一致時的修復，例如直接以 SQL 修改過 work_order_demand 之後。
+執行方式: python rebuild_part_demand_summary.py （使用 app 設定的資料庫，需先執行 flask db upgrade）
+"""
+
+from app import app
+from models.work_order import PartDemandSummary
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        count = PartDemandSummary.rebuild()
+    print(f"✅ 已重建工單需求彙總，共 {count} 個料號")
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+import uuid
+from collections import defaultdict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class ChangeTracker:
+    """
+    資料表異動版本計數器。
+    透過 SQLAlchemy session 事件記錄每個交易寫入的資料表（ORM flush 與 session.execute 的 INSERT/UPDATE/DELETE），
+    交易 commit 後才將這些資料表的版本號加一，rollback 則捨棄；供結果快取與 ETag 判斷資料是否變動。
+    版本號只存在於本行程，服務重啟後以新的 epoch 區分；其他行程（如命令列匯入腳本）的寫入不會反映在版本號上。
+    """
+
+    SESSION_KEY = 'change_tracker_tables'
+
+    def __init__(self, app=None):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not self._listening:
+            # 監聽 Session 類別，涵蓋 Flask-SQLAlchemy 的 scoped session 與背景工作建立的 session
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'do_orm_execute', self._do_orm_execute)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_soft_rollback', self._after_soft_rollback)
+            self._listening = True
+        app.extensions['change_tracker'] = self
+
+    @classmethod
+    def _pending(cls, session):
+        return session.info.setdefault(cls.SESSION_KEY, set())
+
+    def _after_flush(self, session, flush_context):
+        pending = self._pending(session)
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(obj, '__tablename__', None)
+            if table:
+                pending.add(table)
+
+    def _do_orm_execute(self, orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, 'table', None)
+            name = getattr(table, 'name', None)
+            if name:
+                self._pending(orm_execute_state.session).add(name)
+
+    def _after_commit(self, session):
+        tables = session.info.pop(self.SESSION_KEY, None)
+        if tables:
+            self.bump(*tables)
+
+    def _after_soft_rollback(self, session, previous_transaction):
+        # 只在最外層交易 rollback 時捨棄；savepoint rollback 後外層交易仍可能 commit 先前的寫入
+        if previous_transaction.parent is None:
+            session.info.pop(self.SESSION_KEY, None)
+
+    def bump(self, *tables):
+        """將資料表版本號加一（一般由 commit 事件呼叫）"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] += 1
+
+    def version(self, *tables):
+        """回傳各資料表目前的版本號 tuple，任一資料表異動後即不相等"""
+        with self._lock:
+            return (self.epoch,) + tuple(self._versions[table] for table in tables)
+
+    def etag(self, *tables):
+        """依資料表版本號產生 ETag 值（不需查詢資料庫）"""
+        key = ':'.join(str(part) for part in self.version(*tables)) + '|' + ','.join(tables)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+change_tracker = ChangeTracker()
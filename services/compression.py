@@ -0,0 +1,139 @@
+import gzip
+import re
+import threading
+from collections import OrderedDict
+from flask import current_app, g, request
+
+try:
+    import brotli
+except ImportError:  # brotli 為選用套件，未安裝時只提供 gzip
+    brotli = None
+
+
+class ResponseCompression:
+    """
+    依 Accept-Encoding 協商以 br（有安裝 brotli 時）或 gzip 壓縮回應。
+    只壓縮 COMPRESS_MIMETYPES 中的類型（JSON、HTML、CSS、JavaScript、CSV 等）且內容不少於 COMPRESS_MIN_SIZE 位元組的回應；
+    串流回應（例如匯出）、部分內容（Range）與已編碼的回應不處理。
+    靜態檔案的壓縮結果依 ETag 暫存，同一檔案不重複壓縮。
+    壓縮後的回應 ETag 加上編碼後綴（例如 "abc-gzip"），不同編碼的內容有不同的強 ETag；
+    請求的 If-None-Match 會先去除後綴，端點與 send_file 仍以原本的 ETag 判斷是否回應 304。
+    """
+
+    ETAG_SUFFIX = re.compile(r'-(gzip|br)"')
+    # 靜態檔案壓縮結果的暫存筆數
+    STATIC_CACHE_SIZE = 256
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._static_cache = OrderedDict()  # (etag, 編碼) -> 壓縮後內容
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        # brotli 品質 0~11，高品質壓縮率略好但慢很多，動態回應使用中等品質
+        app.config.setdefault('COMPRESS_BR_QUALITY', 5)
+        app.config.setdefault('COMPRESS_MIMETYPES', {
+            'application/json', 'application/javascript', 'application/manifest+json',
+            'text/html', 'text/css', 'text/javascript', 'text/plain', 'text/csv', 'image/svg+xml',
+        })
+        app.extensions['compression'] = self
+        if not app.config['COMPRESS_ENABLED']:
+            return
+
+        self.enabled = True
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    @staticmethod
+    def encodings():
+        """伺服器支援的編碼，依偏好排序"""
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def _before_request(self):
+        # 去除 If-None-Match 中的編碼後綴，須在 request.if_none_match 第一次讀取前處理
+        value = request.environ.get('HTTP_IF_NONE_MATCH')
+        match = self.ETAG_SUFFIX.search(value) if value else None
+        if match:
+            request.environ['HTTP_IF_NONE_MATCH'] = self.ETAG_SUFFIX.sub('"', value)
+            g.compression_etag_encoding = match.group(1)
+
+    def _after_request(self, response):
+        if response.status_code == 304:
+            # 304 的 ETag 需與用戶端快取的壓縮回應相同
+            if g.get('compression_etag_encoding'):
+                self._suffix_etag(response, g.compression_etag_encoding)
+            return response
+
+        config = current_app.config
+        if response.mimetype not in config['COMPRESS_MIMETYPES']:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        encoding = request.accept_encodings.best_match(self.encodings())
+
+        # send_file 的檔案回應也視為串流，但長度已知，可以讀取後壓縮
+        streamed = response.is_streamed and not response.direct_passthrough
+        if (encoding is None or response.status_code != 200 or streamed
+                or 'Content-Encoding' in response.headers or 'Content-Range' in response.headers):
+            return response
+
+        # send_file 的回應（direct_passthrough）只看 Content-Length，不讀取檔案
+        length = response.content_length if response.direct_passthrough else response.calculate_content_length()
+        if length is not None and length < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        etag, _ = response.get_etag()
+        cache_key = (etag, encoding) if response.direct_passthrough and etag else None
+        body = self._cached(cache_key)
+        if body is None:
+            response.direct_passthrough = False
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            body = self._compress(data, encoding, config)
+            self._store(cache_key, body)
+        elif hasattr(response.response, 'close'):
+            response.call_on_close(response.response.close)
+
+        response.direct_passthrough = False
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        self._suffix_etag(response, encoding)
+        return response
+
+    @staticmethod
+    def _compress(data, encoding, config):
+        if encoding == 'br':
+            return brotli.compress(data, quality=config['COMPRESS_BR_QUALITY'])
+        return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'])
+
+    @staticmethod
+    def _suffix_etag(response, encoding):
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak)
+
+    def _cached(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            body = self._static_cache.get(key)
+            if body is not None:
+                self._static_cache.move_to_end(key)
+            return body
+
+    def _store(self, key, body):
+        if key is None:
+            return
+        with self._lock:
+            self._static_cache[key] = body
+            while len(self._static_cache) > self.STATIC_CACHE_SIZE:
+                self._static_cache.popitem(last=False)
+
+
+compression = ResponseCompression()
@@ -0,0 +1,37 @@
+import hashlib
+from functools import wraps
+from flask import current_app, make_response, request
+from services.change_tracker import change_tracker
+
+# 常用的 Cache-Control 政策
+# 每次使用前向伺服器確認（ETag 相同時回應 304，不傳送內容）
+REVALIDATE = 'private, no-cache'
+# 很少異動的主檔（例如倉庫清單），一分鐘內直接使用瀏覽器快取
+SHORT_LIVED = 'private, max-age=60'
+
+
+def conditional_get(*tables, cache_control=REVALIDATE):
+    """
+    以資料表版本號（change_tracker）為 GET 端點加上強 ETag 與 Cache-Control 的 decorator。
+    ETag 由 tables 的版本號與請求路徑（含查詢參數）計算，不需執行端點的查詢；
+    請求的 If-None-Match 相符時直接回應 304，不呼叫端點函式也不存取資料庫。
+    tables 需列出回應內容讀取的所有資料表，漏列的資料表異動時用戶端會繼續使用舊的回應。
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # 先計算 ETag 再執行查詢：查詢期間有 commit 時，下一個請求的 ETag 不同而重新取得
+            key = f'{change_tracker.etag(*tables)}|{request.full_path}'
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
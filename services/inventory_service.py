@@ -1,15 +1,153 @@
 import csv
 import io
-from models.inventory import StockCount, get_taipei_time
+from tempfile import SpooledTemporaryFile
+from openpyxl import Workbook
+from models.inventory import CurrentInventory, InventoryTransaction, StockCount, get_taipei_time
 from models.part import Part, Warehouse
 from extensions import db
 
 class InventoryService:
+    # 異動記錄匯出欄位
+    TRANSACTION_EXPORT_HEADERS = ['異動時間', '異動類型', '零件編號', '零件名稱', '倉庫', '數量變化', '參考類型', '參考編號', '備註']
+    EXPORT_BATCH_SIZE = 1000
+    # 匯出檔案超過此大小才寫入磁碟暫存檔
+    EXPORT_SPOOL_SIZE = 10 * 1024 * 1024
+
+    STOCK_IN_TYPES = ['IN_PURCHASE', 'IN_TRANSFER', 'IN_RETURN']
+    STOCK_OUT_TYPES = ['OUT_ISSUE', 'OUT_WORK_ORDER', 'OUT_TRANSFER', 'OUT_SCRAP']
+
+    @staticmethod
+    def _parse_movement_line(line, parts, warehouse_ids):
+        """驗證單筆異動明細，回傳 (異動參數, 錯誤訊息)"""
+        if not isinstance(line, dict):
+            return None, 'Invalid line'
+
+        part_number = str(line.get('part_number') or '').strip()
+        transaction_type = line.get('type') or line.get('transaction_type')
+        quantity = line.get('qty', line.get('quantity'))
+        warehouse_id = line.get('warehouse_id')
+
+        if not part_number or warehouse_id in (None, '') or quantity in (None, '') or not transaction_type:
+            return None, 'Missing required field: part_number, warehouse_id, qty, type'
+
+        part = parts.get(part_number)
+        if part is None:
+            return None, 'Part not found'
+
+        try:
+            warehouse_id = int(warehouse_id)
+        except (ValueError, TypeError):
+            return None, 'Invalid warehouse_id'
+        if warehouse_id not in warehouse_ids:
+            return None, 'Warehouse not found'
+
+        try:
+            quantity = int(quantity)
+            if quantity <= 0:
+                raise ValueError("Quantity must be positive")
+        except (ValueError, TypeError):
+            return None, 'Invalid quantity'
+
+        if transaction_type in InventoryService.STOCK_IN_TYPES:
+            quantity_change = quantity
+        elif transaction_type in InventoryService.STOCK_OUT_TYPES:
+            quantity_change = -quantity
+        else:
+            return None, 'Invalid transaction type'
+
+        # reference 為單號等自由文字（例如工單、進貨單號），記錄在備註中
+        notes = line.get('notes') or ''
+        reference = line.get('reference')
+        if reference:
+            notes = f"參考單號: {reference}" + (f" | {notes}" if notes else '')
+
+        reference_id = line.get('reference_id')
+        try:
+            reference_id = int(reference_id) if reference_id not in (None, '') else None
+        except (ValueError, TypeError):
+            return None, 'Invalid reference_id'
+
+        return {
+            'part': part,
+            'warehouse_id': warehouse_id,
+            'quantity': quantity,
+            'quantity_change': quantity_change,
+            'transaction_type': transaction_type,
+            'reference_type': line.get('reference_type') or 'MANUAL',
+            'reference_id': reference_id,
+            'notes': notes
+        }, None
+
+    @staticmethod
+    def apply_stock_movements(lines):
+        """
+        整批入庫/出庫。所有零件與倉庫以一次查詢取得，所有明細的庫存異動與異動記錄在同一交易中完成，
+        任一明細失敗（驗證錯誤或庫存不足）則全部回滾。
+        Returns {'success': bool, 'results': [每筆明細的結果], 'error': ...}
+        """
+        part_numbers = {
+            str(line.get('part_number') or '').strip() for line in lines if isinstance(line, dict)
+        }
+        parts = {
+            part.part_number: part
+            for part in Part.query.filter(Part.part_number.in_(part_numbers)).all()
+        } if part_numbers else {}
+        warehouse_ids = {row[0] for row in db.session.query(Warehouse.id)}
+
+        movements = []
+        results = []
+        for index, line in enumerate(lines):
+            movement, error = InventoryService._parse_movement_line(line, parts, warehouse_ids)
+            movements.append(movement)
+            results.append({
+                'line': index,
+                'part_number': line.get('part_number') if isinstance(line, dict) else None,
+                'success': error is None,
+                'error': error
+            })
+
+        if any(not result['success'] for result in results):
+            return {'success': False, 'error': '明細驗證失敗，未異動任何庫存', 'results': results}
+
+        try:
+            for movement, result in zip(movements, results):
+                part = movement['part']
+                outcome = CurrentInventory.apply_stock_change(
+                    part.id, movement['warehouse_id'], movement['quantity_change'], movement['transaction_type'],
+                    movement['reference_type'], movement['reference_id'], movement['notes'], commit=False
+                )
+                if not outcome['success']:
+                    db.session.rollback()
+                    result['success'] = False
+                    if outcome.get('error') == 'insufficient_stock':
+                        result['error'] = f'Insufficient stock. Available: {outcome["available_quantity"]}'
+                        result['available_quantity'] = outcome['available_quantity']
+                    else:
+                        result['error'] = outcome.get('error')
+                    # 其餘明細隨整批回滾
+                    for other in results:
+                        if other is not result and other['success']:
+                            other['success'] = False
+                            other['error'] = 'Rolled back'
+                            other.pop('message', None)
+                    return {'success': False, 'error': f'第 {result["line"] + 1} 筆明細異動失敗，已全部回滾', 'results': results}
+
+                result['message'] = f'{part.part_number} {"入庫" if movement["quantity_change"] > 0 else "出庫"} {movement["quantity"]} {part.unit} 成功'
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"整批庫存異動失敗: {e}")
+            return {'success': False, 'error': str(e), 'results': results}
+
+        return {'success': True, 'results': results}
+
     @staticmethod
-    def import_stock_count_data(warehouse_id, file_stream):
+    def import_stock_count_data(warehouse_id, file_stream, progress_callback=None):
         """
         Handles the batch import of stock count data from a CSV file.
         Returns a dictionary with success status, count_id, processed counts, and errors.
+        progress_callback(processed_rows, total_rows) is called after each row.
         """
         try:
             # Read the file content and try decoding with multiple encodings
@@ -46,7 +184,9 @@ class InventoryService:
                 return {'success': False, 'error': '無法建立盤點記錄'}
             
             # Import data into the stock count
-            success_count, error_list = StockCount.import_count_data(count_id, count_data)
+            success_count, error_list = StockCount.import_count_data(
+                count_id, count_data, progress_callback=progress_callback
+            )
             
             return {
                 'success': True,
@@ -59,3 +199,74 @@ class InventoryService:
         except Exception as e:
             db.session.rollback()
             return {'success': False, 'error': f'處理檔案時發生錯誤: {str(e)}'}
+
+    @staticmethod
+    def iter_transaction_export_rows(part_id=None, warehouse_id=None, transaction_type=None, date_from=None, date_to=None):
+        """
+        以單一 JOIN 查詢只取匯出所需欄位，並以 yield_per 分批讀取，逐列產生匯出資料。
+        記憶體用量與匯出筆數無關。
+        """
+        query = db.session.query(
+            InventoryTransaction.transaction_date,
+            InventoryTransaction.transaction_type,
+            Part.part_number,
+            Part.name,
+            Warehouse.name,
+            InventoryTransaction.quantity,
+            InventoryTransaction.reference_type,
+            InventoryTransaction.reference_id,
+            InventoryTransaction.notes
+        ).join(Part, InventoryTransaction.part_id == Part.id).join(
+            Warehouse, InventoryTransaction.warehouse_id == Warehouse.id
+        )
+        query = InventoryTransaction.apply_filters(query, part_id, warehouse_id, transaction_type, date_from, date_to)
+        query = query.order_by(
+            InventoryTransaction.transaction_date.desc(),
+            InventoryTransaction.id.desc()
+        ).yield_per(InventoryService.EXPORT_BATCH_SIZE)
+
+        for (transaction_date, transaction_type, part_number, part_name, warehouse_name,
+             quantity, reference_type, reference_id, notes) in query:
+            yield [
+                transaction_date.strftime('%Y-%m-%d %H:%M:%S'),
+                transaction_type,
+                part_number,
+                part_name,
+                warehouse_name,
+                quantity,
+                reference_type or '',
+                reference_id or '',
+                notes or ''
+            ]
+
+    @staticmethod
+    def write_transactions_xlsx(rows):
+        """
+        以 openpyxl write-only 模式逐列寫入活頁簿，寫入 SpooledTemporaryFile（超過 EXPORT_SPOOL_SIZE 時改存磁碟）。
+        Returns 已移至開頭的檔案物件，由呼叫端負責關閉。
+        """
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('庫存異動記錄')
+        sheet.append(InventoryService.TRANSACTION_EXPORT_HEADERS)
+        for row in rows:
+            sheet.append(row)
+
+        output = SpooledTemporaryFile(max_size=InventoryService.EXPORT_SPOOL_SIZE)
+        workbook.save(output)
+        output.seek(0)
+        return output
+
+    @staticmethod
+    def stream_transactions_csv(rows):
+        """逐批產生 CSV 內容（UTF-8 BOM），供串流回應使用"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow(InventoryService.TRANSACTION_EXPORT_HEADERS)
+        for index, row in enumerate(rows, 1):
+            writer.writerow(row)
+            if index % InventoryService.EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
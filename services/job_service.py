@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.utils import secure_filename
+from extensions import db
+from models.import_job import ImportJob, get_taipei_time
+
+
+def _run_parts_import(file_stream, params, progress_callback):
+    from services.part_service import PartService
+    return PartService.import_parts_from_excel(file_stream, progress_callback=progress_callback)
+
+
+def _run_work_order_import(file_stream, params, progress_callback):
+    from services.work_order_service import WorkOrderService
+    return WorkOrderService.import_work_order_demands(file_stream, progress_callback=progress_callback)
+
+
+def _run_stock_count_import(file_stream, params, progress_callback):
+    from services.inventory_service import InventoryService
+    return InventoryService.import_stock_count_data(
+        int(params['warehouse_id']), file_stream, progress_callback=progress_callback
+    )
+
+
+class ImportJobRunner:
+    """
+    本機背景匯入工作執行器。
+    上傳檔案先存入暫存目錄並寫入 import_jobs 資料表，再交由執行緒池處理；
+    不依賴任何外部佇列服務，服務重啟後會接續處理尚未開始的工作。
+    """
+
+    # 匯入類型 -> (處理函數, 允許的副檔名)
+    HANDLERS = {
+        'parts': (_run_parts_import, ('.xlsx',)),
+        'work_orders': (_run_work_order_import, ('.xlsx', '.xls')),
+        'stock_count': (_run_stock_count_import, ('.csv',)),
+    }
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._progress = {}
+        self._lock = threading.Lock()
+        self._recovered = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('IMPORT_JOB_WORKERS', 2)
+        app.config.setdefault('IMPORT_SPOOL_DIR', os.path.join(app.instance_path, 'import_spool'))
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config['IMPORT_JOB_WORKERS'], thread_name_prefix='import-job'
+        )
+        # 第一個請求進來時才接續未完成的工作，避免匯入 app 的命令列腳本也開始執行匯入
+        app.before_request(self._recover_pending_jobs)
+        app.extensions['import_job_runner'] = self
+
+    def allowed_file(self, job_type, filename):
+        handler = self.HANDLERS.get(job_type)
+        return bool(handler and filename and filename.lower().endswith(handler[1]))
+
+    def submit(self, job_type, file_storage, params=None):
+        """將上傳檔案寫入暫存目錄並建立匯入工作，回傳 ImportJob"""
+        if job_type not in self.HANDLERS:
+            raise ValueError(f'不支援的匯入類型: {job_type}')
+
+        spool_dir = self.app.config['IMPORT_SPOOL_DIR']
+        os.makedirs(spool_dir, exist_ok=True)
+
+        job_id = uuid.uuid4().hex
+        spool_path = os.path.join(spool_dir, f'{job_id}_{secure_filename(file_storage.filename) or "upload"}')
+        file_storage.save(spool_path)
+
+        job = ImportJob(
+            id=job_id,
+            job_type=job_type,
+            status='queued',
+            original_filename=file_storage.filename,
+            spool_path=spool_path,
+            params=json.dumps(params or {}),
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        self._enqueue(job_id)
+        return job
+
+    def get_status(self, job_id):
+        """取得工作狀態，執行中的工作附帶即時的列數進度與處理速度"""
+        job = db.session.get(ImportJob, job_id)
+        if job is None:
+            return None
+
+        data = job.to_dict()
+        live = self._progress.get(job_id)
+        if live and data['status'] == 'running':
+            data['processed_rows'] = live['processed']
+            data['total_rows'] = live['total']
+            elapsed = time.monotonic() - live['started']
+        elif job.started_at and job.finished_at:
+            elapsed = (job.finished_at - job.started_at).total_seconds()
+        else:
+            elapsed = 0
+
+        total = data['total_rows']
+        data['progress'] = round(data['processed_rows'] * 100 / total, 1) if total else 0
+        data['elapsed_seconds'] = round(elapsed, 2)
+        data['rows_per_second'] = round(data['processed_rows'] / elapsed, 1) if elapsed > 0 else 0
+        result = data['result'] or {}
+        data['errors'] = result.get('errors', []) if isinstance(result, dict) else []
+        return data
+
+    def _enqueue(self, job_id):
+        self._executor.submit(self._run, job_id)
+
+    def _recover_pending_jobs(self):
+        if self._recovered:
+            return
+        with self._lock:
+            if self._recovered:
+                return
+            self._recovered = True
+            try:
+                pending = ImportJob.query.filter(ImportJob.status.in_(['queued', 'running'])).all()
+            except Exception as e:
+                # import_jobs 資料表尚未建立（尚未執行 migration）
+                db.session.rollback()
+                print(f"無法讀取匯入工作: {e}")
+                return
+
+            for job in pending:
+                if job.status == 'running':
+                    # 執行到一半的工作可能已部分寫入，不自動重跑
+                    job.status = 'failed'
+                    job.error = '服務重新啟動，匯入工作中斷，請確認資料後重新上傳'
+                    job.finished_at = get_taipei_time()
+                else:
+                    self._enqueue(job.id)
+            db.session.commit()
+
+    def _claim(self, job_id):
+        """以條件式 UPDATE 取得工作，確保同一工作只會被執行一次"""
+        table = ImportJob.__table__
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id == job_id, table.c.status == 'queued')
+            .values(status='running', started_at=get_taipei_time())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            if not self._claim(job_id):
+                return
+
+            job = db.session.get(ImportJob, job_id)
+            progress = {'processed': 0, 'total': 0, 'started': time.monotonic()}
+            self._progress[job_id] = progress
+
+            def progress_callback(processed, total):
+                progress['processed'] = processed
+                progress['total'] = total
+
+            handler = self.HANDLERS[job.job_type][0]
+            try:
+                with open(job.spool_path, 'rb') as file_stream:
+                    result = handler(file_stream, job.get_params(), progress_callback)
+            except Exception as e:
+                db.session.rollback()
+                result = {'success': False, 'error': f'處理檔案時發生錯誤: {str(e)}'}
+
+            job = db.session.get(ImportJob, job_id)
+            job.status = 'completed' if result.get('success') else 'failed'
+            job.result = json.dumps(result, ensure_ascii=False, default=str)
+            job.error = result.get('error')
+            job.total_rows = progress['total']
+            job.processed_rows = progress['processed']
+            job.finished_at = get_taipei_time()
+            db.session.commit()
+
+            self._progress.pop(job_id, None)
+            try:
+                os.remove(job.spool_path)
+            except OSError:
+                pass
+
+
+job_runner = ImportJobRunner()
@@ -0,0 +1,64 @@
+import datetime
+import decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用套件，未安裝時使用標準函式庫 json
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask 的 JSON provider（jsonify、request.get_json 與 current_app.json 使用）。
+    有安裝 orjson 時以 orjson 序列化與解析，否則使用標準函式庫 json；可由設定 JSON_BACKEND（'orjson' 或 'json'）指定。
+    兩者輸出的格式相同：datetime、date、time 為 ISO 8601 字串（與 isoformat() 相同），Decimal 為數字，
+    to_dict 可直接放入這些型別，不需逐欄轉換。
+    差異：orjson 不跳脫非 ASCII 字元（中文直接以 UTF-8 輸出），NaN 與 Infinity 輸出為 null。
+    呼叫 dumps 時帶入額外參數（例如 indent、separators）會改用標準函式庫處理。
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        backend = app.config.get('JSON_BACKEND') or ('orjson' if orjson is not None else 'json')
+        if backend not in ('orjson', 'json'):
+            raise ValueError(f'不支援的 JSON_BACKEND: {backend}')
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError('JSON_BACKEND 設定為 orjson，但未安裝 orjson 套件')
+        self.backend = backend
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, decimal.Decimal):
+            return float(o)
+        return DefaultJSONProvider.default(o)
+
+    def _orjson_options(self, pretty=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if self.backend != 'orjson' or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if self.backend != 'orjson' or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.backend != 'orjson':
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # 與 DefaultJSONProvider 相同：debug 模式或 compact 為 False 時縮排輸出
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        # 直接以 bytes 建立回應，省去轉為字串再編碼
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options(pretty) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
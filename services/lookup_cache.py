@@ -0,0 +1,338 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+_MISSING = object()
+
+
+class _SqliteStore:
+    """
+    多個行程共用的快取儲存（本機 SQLite 檔案）。
+    失效時遞增 generation 並刪除相關項目；寫入時只有 generation 與讀取資料前相同才寫入，
+    避免其他行程在讀取資料期間 commit 的異動被舊資料覆蓋。
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, part_id INTEGER, value TEXT, "
+        "expires_at REAL, stored_at REAL)",
+        "CREATE INDEX IF NOT EXISTS ix_entries_part_id ON entries (part_id)",
+        "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)",
+        "INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)",
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        for statement in self.SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            self._local.connection = connection
+        return connection
+
+    def generation(self):
+        return self._connection().execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def get(self, key, now):
+        row = self._connection().execute(
+            'SELECT value FROM entries WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return json.loads(row[0]) if row else _MISSING
+
+    def set(self, key, part_id, value, expires_at, generation, max_entries, now):
+        """寫入項目並刪除超過 max_entries 的最舊項目，回傳 (是否寫入, 刪除筆數)"""
+        connection = self._connection()
+        stored = connection.execute(
+            'INSERT OR REPLACE INTO entries (key, part_id, value, expires_at, stored_at) '
+            "SELECT ?, ?, ?, ?, ? WHERE (SELECT value FROM meta WHERE name = 'generation') = ?",
+            (key, part_id, json.dumps(value, ensure_ascii=False), expires_at, now, generation)
+        ).rowcount > 0
+        evicted = connection.execute(
+            'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires_at <= ? DESC, stored_at '
+            'LIMIT max(0, (SELECT count(*) FROM entries) - ?))', (now, max_entries)
+        ).rowcount if stored else 0
+        return stored, evicted
+
+    def invalidate(self, part_ids=None):
+        """刪除指定零件的項目，part_ids 為 None 時清除全部"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            if part_ids is None:
+                connection.execute('DELETE FROM entries')
+            else:
+                ids = list(part_ids)
+                connection.execute(
+                    f'DELETE FROM entries WHERE part_id IN ({",".join("?" * len(ids))})', ids
+                )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+
+class LookupCache:
+    """
+    零件掃描查詢的回應快取（LRU + TTL）。
+    掃描站反覆查詢少數常用零件，回應以零件編號（與查詢參數）為鍵暫存，最多 LOOKUP_CACHE_SIZE 筆，
+    超過 LOOKUP_CACHE_TTL 秒後重新查詢。
+    透過 SQLAlchemy session 事件記錄交易中異動的零件（parts、part_locations、current_inventory、order_history），
+    commit 後使這些零件的項目失效，rollback 則捨棄；倉庫或倉位資料異動時清除全部項目。
+    設定 LOOKUP_CACHE_PATH 時改以該 SQLite 檔案作為多個行程共用的快取（不使用本機 LRU），
+    任一行程 commit 的異動會使所有行程的項目失效。
+    未經本應用程式 session 的寫入（例如直接以 sqlite3 修改資料庫）只能等待 TTL 到期。
+    """
+
+    # 異動可對應到零件的資料表 -> 零件 id 欄位
+    PART_TABLES = {
+        'parts': 'id',
+        'part_locations': 'part_id',
+        'current_inventory': 'part_id',
+        'order_history': 'part_id',
+    }
+    # 異動無法對應到單一零件（倉庫、倉位名稱出現在回應中），清除全部項目
+    GLOBAL_TABLES = ('warehouses', 'warehouse_locations')
+    SESSION_KEY = 'lookup_cache_parts'
+    # 待失效零件集合中代表「全部」的標記
+    ALL = '*'
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.max_entries = 1024
+        self.ttl = 60
+        self._store = None
+        self._entries = OrderedDict()  # key -> (expires_at, part_id, value)
+        self._keys_by_part = defaultdict(set)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listening = False
+        self.reset_stats()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOOKUP_CACHE_ENABLED', True)
+        app.config.setdefault('LOOKUP_CACHE_SIZE', 1024)
+        app.config.setdefault('LOOKUP_CACHE_TTL', 60)
+        app.config.setdefault('LOOKUP_CACHE_PATH', os.environ.get('LOOKUP_CACHE_PATH'))
+
+        self.enabled = bool(app.config['LOOKUP_CACHE_ENABLED'])
+        self.max_entries = app.config['LOOKUP_CACHE_SIZE']
+        self.ttl = app.config['LOOKUP_CACHE_TTL']
+        path = app.config['LOOKUP_CACHE_PATH']
+        self._store = _SqliteStore(path) if self.enabled and path else None
+        self.clear()
+
+        if self.enabled and not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'do_orm_execute', self._do_orm_execute)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_soft_rollback', self._after_soft_rollback)
+            self._listening = True
+        app.extensions['lookup_cache'] = self
+
+    # 查詢
+
+    def get_or_load(self, part_number, variant, loader):
+        """
+        取得快取的回應，沒有時呼叫 loader() 查詢並暫存。
+        loader 回傳 (part_id, value)；value 為 None（找不到零件）時不暫存。
+        """
+        if not self.enabled:
+            return loader()[1]
+
+        key = f'{part_number}\x1f{variant}'
+        now = time.monotonic() if self._store is None else time.time()
+        value = self._get(key, now)
+        if value is not _MISSING:
+            return value
+
+        generation = self._store.generation() if self._store else self._generation
+        part_id, value = loader()
+        if value is not None:
+            self._set(key, part_id, value, now, generation)
+        return value
+
+    def _get(self, key, now):
+        if self._store is not None:
+            value = self._store.get(key, now)
+            with self._lock:
+                if value is _MISSING:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            return value
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, part_id, value = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _set(self, key, part_id, value, now, generation):
+        if self._store is not None:
+            _, evicted = self._store.set(key, part_id, value, now + self.ttl, generation, self.max_entries, now)
+            with self._lock:
+                self.evictions += evicted
+            return
+
+        with self._lock:
+            # 查詢期間有 commit 使項目失效時不寫入，避免暫存失效前讀到的資料
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (now + self.ttl, part_id, value)
+            self._keys_by_part[part_id].add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, part_id, _ = self._entries.pop(key)
+        keys = self._keys_by_part.get(part_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_part[part_id]
+
+    # 失效
+
+    def invalidate(self, part_ids=None):
+        """使指定零件 id 的項目失效，part_ids 為 None 時清除全部"""
+        if self._store is not None:
+            self._store.invalidate(part_ids)
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if part_ids is None:
+                self._entries.clear()
+                self._keys_by_part.clear()
+                return
+            for part_id in part_ids:
+                for key in list(self._keys_by_part.get(part_id, ())):
+                    self._remove(key)
+
+    def clear(self):
+        self.invalidate()
+
+    @classmethod
+    def _pending(cls, session):
+        return session.info.setdefault(cls.SESSION_KEY, set())
+
+    def _after_flush(self, session, flush_context):
+        pending = self._pending(session)
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(obj, '__tablename__', None)
+            if table in self.GLOBAL_TABLES:
+                pending.add(self.ALL)
+            column = self.PART_TABLES.get(table)
+            if column is None:
+                continue
+            pending.add(getattr(obj, column))
+            # 零件 id 欄位被修改時（例如訂單改為其他零件），原零件也需失效
+            pending.update(inspect(obj).attrs[column].history.deleted or ())
+
+    def _do_orm_execute(self, orm_execute_state):
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        table = getattr(getattr(orm_execute_state.statement, 'table', None), 'name', None)
+        if table in self.GLOBAL_TABLES:
+            self._pending(orm_execute_state.session).add(self.ALL)
+        elif table in self.PART_TABLES:
+            # 快取的記錄不可中斷使用者的寫入，無法判斷零件 id 時一律清除全部項目
+            try:
+                part_ids = self._statement_part_ids(orm_execute_state, self.PART_TABLES[table])
+            except Exception:
+                part_ids = set()
+            self._pending(orm_execute_state.session).update(part_ids if part_ids else (self.ALL,))
+
+    @classmethod
+    def _statement_part_ids(cls, orm_execute_state, column):
+        """
+        由 INSERT/UPDATE/DELETE 的參數取得零件 id（例如 apply_stock_change 的 part_id 條件與 VALUES，
+        或 part_id.in_([...]) 展開的清單）。
+        無法判斷時回傳空集合，由呼叫端清除全部項目。
+        """
+        parameters = orm_execute_state.parameters
+        rows = parameters if isinstance(parameters, list) else [parameters or {}]
+        values = [row[column] for row in rows if row.get(column) is not None]
+        try:
+            compiled = orm_execute_state.statement.compile(dialect=orm_execute_state.session.get_bind().dialect)
+        except Exception:
+            return set()
+        names = [name for name in compiled.params if name == column or name.startswith(column + '_')]
+        if not names and not values:
+            return set()
+        values.extend(compiled.params[name] for name in names if compiled.params[name] is not None)
+        return cls._flatten_part_ids(values)
+
+    @staticmethod
+    def _flatten_part_ids(values):
+        """展開 IN 條件的清單參數；含有清單以外的非純量值時回傳空集合"""
+        part_ids = set()
+        for value in values:
+            for part_id in (value if isinstance(value, (list, tuple)) else (value,)):
+                if not isinstance(part_id, (int, str)):
+                    return set()
+                part_ids.add(part_id)
+        return part_ids
+
+    def _after_commit(self, session):
+        part_ids = session.info.pop(self.SESSION_KEY, None)
+        if part_ids:
+            self.invalidate(None if self.ALL in part_ids else part_ids)
+
+    def _after_soft_rollback(self, session, previous_transaction):
+        if previous_transaction.parent is None:
+            session.info.pop(self.SESSION_KEY, None)
+
+    # 統計
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'backend': 'sqlite' if self._store is not None else 'memory',
+                'entries': len(self._entries) if self._store is None else None,
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+lookup_cache = LookupCache()
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from models.work_order import WorkOrderDemand
+from models.part import Part
+from models.order import Order
+from models.inventory import CurrentInventory
+from extensions import db
+
+class MrpService:
+    """
+    分時段 MRP 淨需求計算。
+    各料號的工單需求依需求日期排序，與在途訂單（依 expected_date 入庫）一起自可用庫存累計扣減，
+    求出第一次缺料的日期，並以週為時段計算淨需求（逐批補足：每個時段需補足多少才能使預計庫存不低於 0）。
+    以 NumPy 累計和一次計算所有料號，不逐料號迴圈。
+    早於今天的需求與逾期未到的訂單視為今天發生；沒有 expected_date 的在途訂單視為今天到貨。
+    """
+    BUCKET_DAYS = 7
+    # 視為在途的訂單狀態
+    OPEN_ORDER_STATUSES = ('pending', 'confirmed')
+
+    @staticmethod
+    def _frame(query, columns):
+        return pd.DataFrame.from_records(query.all(), columns=columns)
+
+    @classmethod
+    def load_frames(cls, part_numbers=None):
+        """
+        以欄位查詢取得計算所需資料，part_numbers 為 None 時取得全部料號：
+        demand (part_number, date, quantity)：每筆工單需求
+        receipts (part_number, date, quantity)：在途訂單未到貨數量
+        on_hand (part_number, quantity)：各倉庫可用庫存加總
+        """
+        demand_query = db.session.query(
+            WorkOrderDemand.part_number, WorkOrderDemand.required_date, WorkOrderDemand.required_quantity
+        )
+        open_quantity = Order.quantity_ordered - db.func.coalesce(Order.quantity_received, 0)
+        receipts_query = db.session.query(
+            Part.part_number, Order.expected_date, open_quantity
+        ).join(Part, Order.part_id == Part.id).filter(
+            Order.status.in_(cls.OPEN_ORDER_STATUSES), open_quantity > 0
+        )
+        on_hand_query = db.session.query(
+            Part.part_number, db.func.sum(CurrentInventory.available_quantity)
+        ).join(CurrentInventory, Part.id == CurrentInventory.part_id).group_by(Part.part_number)
+
+        if part_numbers is not None:
+            demand_query = demand_query.filter(WorkOrderDemand.part_number.in_(part_numbers))
+            receipts_query = receipts_query.filter(Part.part_number.in_(part_numbers))
+            on_hand_query = on_hand_query.filter(Part.part_number.in_(part_numbers))
+
+        columns = ['part_number', 'date', 'quantity']
+        return (
+            cls._frame(demand_query, columns),
+            cls._frame(receipts_query, columns),
+            cls._frame(on_hand_query, ['part_number', 'quantity'])
+        )
+
+    @classmethod
+    def net(cls, demand, receipts, on_hand, today=None):
+        """
+        計算有工單需求之料號的淨需求。
+        Returns (parts, buckets)：
+        parts (part_number, on_hand, total_demand, scheduled_receipts, net_requirement, first_shortage_date)：每個料號一筆
+        buckets (part_number, week_start, demand, receipts, projected, net_requirement)：每個料號有異動的週各一筆，
+        projected 為該週結束時未計入補足量的預計庫存
+        """
+        today = pd.Timestamp(today or datetime.now()).normalize()
+        first_week = today - timedelta(days=today.weekday())
+
+        demand = demand[demand['part_number'].notna()]
+        receipts = receipts[receipts['part_number'].isin(demand['part_number'])]
+        events = pd.concat([
+            pd.DataFrame({'part_number': demand['part_number'], 'date': demand['date'],
+                          'demand': demand['quantity'].astype(float), 'receipts': 0.0}),
+            pd.DataFrame({'part_number': receipts['part_number'], 'date': receipts['date'],
+                          'demand': 0.0, 'receipts': receipts['quantity'].astype(float)}),
+        ], ignore_index=True)
+        events['date'] = pd.to_datetime(events['date']).dt.normalize().fillna(today).clip(lower=today)
+
+        # 同一料號同一天的異動合併後依 (料號, 日期) 排序，同料號的列連續排列
+        daily = events.groupby(['part_number', 'date'], sort=True)[['demand', 'receipts']].sum().reset_index()
+        codes, part_numbers = pd.factorize(daily['part_number'], sort=False)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=int)
+
+        # 各料號內的累計淨流量：整體累計和減去該料號第一列之前的累計值
+        flow = (daily['receipts'] - daily['demand']).to_numpy()
+        cumulative = np.cumsum(flow)
+        before_start = cumulative[starts] - flow[starts]
+        within = cumulative - np.repeat(before_start, np.diff(np.r_[starts, len(flow)]))
+
+        stock = on_hand.groupby('part_number')['quantity'].sum().astype(float)
+        opening = stock.reindex(part_numbers).fillna(0.0).to_numpy()
+        daily['projected'] = opening[codes] + within
+
+        # 逐批補足：截至每一天需補足的累計量為預計庫存最低點的缺口
+        daily['covered'] = pd.Series(np.maximum(-daily['projected'].to_numpy(), 0.0)).groupby(codes).cummax().to_numpy()
+
+        daily['week_start'] = first_week + pd.to_timedelta(
+            (daily['date'] - first_week).dt.days // cls.BUCKET_DAYS * cls.BUCKET_DAYS, unit='D'
+        )
+        buckets = daily.groupby(['part_number', 'week_start'], sort=True).agg(
+            demand=('demand', 'sum'),
+            receipts=('receipts', 'sum'),
+            projected=('projected', 'last'),
+            covered=('covered', 'last'),
+        ).reset_index()
+        buckets['net_requirement'] = buckets.groupby('part_number')['covered'].diff().fillna(buckets['covered'])
+        buckets = buckets.drop(columns='covered')
+
+        first_shortage = daily.loc[daily['projected'] < 0].groupby('part_number')['date'].first()
+        parts = daily.groupby('part_number', sort=True).agg(
+            total_demand=('demand', 'sum'),
+            scheduled_receipts=('receipts', 'sum'),
+            net_requirement=('covered', 'last'),
+        )
+        parts.insert(0, 'on_hand', stock.reindex(parts.index).fillna(0.0))
+        parts['first_shortage_date'] = first_shortage.reindex(parts.index)
+        return parts.reset_index(), buckets
+
+    @classmethod
+    def run(cls, part_numbers=None, today=None):
+        """查詢資料並計算淨需求"""
+        return cls.net(*cls.load_frames(part_numbers), today=today)
+
+    @staticmethod
+    def format_dates(series):
+        """日期欄位轉為 YYYY-MM-DD 字串，無日期為 None"""
+        return series.dt.strftime('%Y-%m-%d').astype(object).where(series.notna(), None)
+
+    @classmethod
+    def first_shortage_dates(cls, parts):
+        """取出 (part_number, first_shortage_date) 欄位，日期轉為字串，供報表合併使用"""
+        return pd.DataFrame({
+            'part_number': parts['part_number'],
+            'first_shortage_date': cls.format_dates(parts['first_shortage_date']),
+        })
+
+    @classmethod
+    def to_payload(cls, parts, buckets, include_buckets=True):
+        """轉為 JSON 回應格式，每個料號附帶各週明細"""
+        records = cls.first_shortage_dates(parts).join(
+            parts[['on_hand', 'total_demand', 'scheduled_receipts', 'net_requirement']]
+        ).to_dict('records')
+
+        if include_buckets and records:
+            buckets = buckets[buckets['part_number'].isin(parts['part_number'])].assign(
+                week_start=cls.format_dates(buckets['week_start'])
+            )
+            # buckets 依料號排序，整批轉換後依料號邊界切片，避免逐料號轉換
+            bucket_records = buckets.drop(columns='part_number').to_dict('records')
+            keys = buckets['part_number'].to_numpy()
+            bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True]) if len(keys) else []
+            by_part = {keys[start]: bucket_records[start:end] for start, end in zip(bounds[:-1], bounds[1:])}
+            for record in records:
+                record['buckets'] = by_part.get(record['part_number'], [])
+
+        return {
+            'success': True,
+            'bucket_days': cls.BUCKET_DAYS,
+            'parts': records,
+            'count': len(records)
+        }
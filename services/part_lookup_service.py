@@ -0,0 +1,137 @@
+from models.part import Part, Warehouse, WarehouseLocation, PartWarehouseLocation
+from models.order import Order
+from models.inventory import CurrentInventory
+from extensions import db
+from services.lookup_cache import lookup_cache
+
+class PartLookupService:
+    """
+    掃描查詢零件（/api/part/<part_number>）的回應組裝。
+    零件、倉位、各倉庫存與訂購歷史各以一個欄位查詢取得（共 4 個查詢，與資料筆數無關），
+    不建立 ORM 物件也不逐筆載入關聯；回應格式與 Part.to_dict(include_locations=True)、Order.to_dict 相同。
+    """
+    # 訂購歷史預設只回傳最近的筆數，可由 history_limit 調整
+    DEFAULT_HISTORY_LIMIT = 50
+    MAX_HISTORY_LIMIT = 500
+    # 批次查詢（POST /api/parts/lookup）單次最多的零件編號數
+    MAX_BATCH_SIZE = 200
+
+    @staticmethod
+    def locations_by_part(part_ids):
+        """
+        多個零件的倉位（單一 JOIN 查詢）。
+        Returns {part_id: [與 WarehouseLocation.to_dict 相同格式的字典, ...]}
+        """
+        locations = {part_id: [] for part_id in part_ids}
+        if not locations:
+            return locations
+        rows = db.session.query(
+            PartWarehouseLocation.part_id, WarehouseLocation.id, WarehouseLocation.warehouse_id,
+            WarehouseLocation.location_code, WarehouseLocation.description,
+            Warehouse.name.label('warehouse_name'), Warehouse.code.label('warehouse_code')
+        ).join(
+            WarehouseLocation, PartWarehouseLocation.warehouse_location_id == WarehouseLocation.id
+        ).outerjoin(
+            Warehouse, WarehouseLocation.warehouse_id == Warehouse.id
+        ).filter(PartWarehouseLocation.part_id.in_(list(locations))).all()
+
+        for row in rows:
+            location = row._asdict()
+            locations[location.pop('part_id')].append(location)
+        return locations
+
+    @staticmethod
+    def inventories_by_part(part_ids):
+        """
+        多個零件在各倉庫的庫存（單一 JOIN 查詢）。
+        Returns {part_id: [{'warehouse_id', 'warehouse_name', 'warehouse_code', 'quantity_on_hand', ...}, ...]}
+        """
+        inventories = {part_id: [] for part_id in part_ids}
+        if not inventories:
+            return inventories
+        rows = db.session.query(
+            CurrentInventory.part_id, CurrentInventory.warehouse_id,
+            Warehouse.name.label('warehouse_name'), Warehouse.code.label('warehouse_code'),
+            CurrentInventory.quantity_on_hand, CurrentInventory.reserved_quantity, CurrentInventory.available_quantity
+        ).outerjoin(
+            Warehouse, CurrentInventory.warehouse_id == Warehouse.id
+        ).filter(CurrentInventory.part_id.in_(list(inventories))).order_by(CurrentInventory.warehouse_id).all()
+
+        for row in rows:
+            inventory = row._asdict()
+            inventory['warehouse_name'] = inventory['warehouse_name'] or '未知'
+            inventory['warehouse_code'] = inventory['warehouse_code'] or '未知'
+            inventories[inventory.pop('part_id')].append(inventory)
+        return inventories
+
+    @classmethod
+    def order_history(cls, part_id, limit):
+        """零件最近的訂購記錄（依訂購日期倒序，使用 ix_order_history_part_date 索引）"""
+        rows = Order.list_query().filter(
+            Order.part_id == part_id
+        ).order_by(db.desc(Order.order_date)).limit(limit).all()
+        return [Order.row_to_dict(row) for row in rows]
+
+    @classmethod
+    def normalize_history_limit(cls, history_limit):
+        """history_limit 為 None 時使用預設筆數，並限制在 0 ~ MAX_HISTORY_LIMIT"""
+        if history_limit is None:
+            return cls.DEFAULT_HISTORY_LIMIT
+        return max(0, min(history_limit, cls.MAX_HISTORY_LIMIT))
+
+    @classmethod
+    def lookup(cls, part_number, history_limit=None):
+        """
+        組裝掃描查詢的回應，找不到零件時回傳 None。
+        結果經由 lookup_cache 暫存，相關資料 commit 後自動失效。
+        Returns {'part_info': {..., 'locations': [...]}, 'order_history': [...], 'inventories': [...]}
+        """
+        history_limit = cls.normalize_history_limit(history_limit)
+        return lookup_cache.get_or_load(part_number, history_limit, lambda: cls._load(part_number, history_limit))
+
+    @classmethod
+    def _load(cls, part_number, history_limit):
+        """查詢資料庫組裝回應，回傳 (零件 id, 回應)；找不到零件時為 (None, None)"""
+        row = Part.list_query().filter(Part.part_number == part_number).first()
+        if row is None:
+            return None, None
+
+        part_info = Part.row_to_dict(row)
+        part_info['locations'] = cls.locations_by_part([row.id])[row.id]
+
+        return row.id, {
+            'part_info': part_info,
+            'order_history': cls.order_history(row.id, history_limit) if history_limit else [],
+            'inventories': cls.inventories_by_part([row.id])[row.id]
+        }
+
+    @classmethod
+    def lookup_many(cls, part_numbers):
+        """
+        批次查詢多個零件（盤點時連續掃描的條碼），零件、倉位與各倉庫存各以一個 IN 查詢取得，不含訂購歷史。
+        重複的零件編號只回傳一次，順序與傳入相同。
+        Returns [{'part_number', 'found': True, 'part_info': {..., 'locations': [...]}, 'inventories': [...]}
+                 或 {'part_number', 'found': False}, ...]
+        """
+        part_numbers = list(dict.fromkeys(part_numbers))
+        rows = Part.list_query().filter(Part.part_number.in_(part_numbers)).all() if part_numbers else []
+        parts = {row.part_number: row for row in rows}
+        part_ids = [row.id for row in rows]
+        locations = cls.locations_by_part(part_ids)
+        inventories = cls.inventories_by_part(part_ids)
+
+        results = []
+        for part_number in part_numbers:
+            row = parts.get(part_number)
+            if row is None:
+                results.append({'part_number': part_number, 'found': False})
+                continue
+            part_info = Part.row_to_dict(row)
+            part_info['locations'] = locations[row.id]
+            results.append({
+                'part_number': part_number,
+                'found': True,
+                'part_info': part_info,
+                'inventories': inventories[row.id]
+            })
+        return results
@@ -0,0 +1,182 @@
+import re
+from sqlalchemy import or_, text
+from sqlalchemy.exc import OperationalError
+from models.part import Part
+from extensions import db
+
+class PartSearchService:
+    """
+    零件全文檢索。
+    使用 SQLite FTS5 虛擬資料表 parts_fts（trigram tokenizer，由 migration 4b8e2f61c3a7 建立），以 parts 為外部內容表並由觸發器同步，
+    可對零件編號的任意片段與中文名稱做索引查詢，結果依 bm25 排序。
+    trigram 索引至少需要 3 個字元，較短的關鍵字改用 LIKE 查詢。
+    """
+    FTS_TABLE = 'parts_fts'
+    MIN_TOKEN_LENGTH = 3
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 200
+    # bm25 排序的候選筆數上限
+    RANK_CANDIDATES = 1000
+    # MATCH 查詢比對的欄位
+    SEARCH_COLUMNS = ('part_number', 'name')
+
+    # engine url -> 是否已建立 parts_fts
+    _available = {}
+
+    @classmethod
+    def is_available(cls):
+        key = str(db.engine.url)
+        if key not in cls._available:
+            found = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': cls.FTS_TABLE}
+            ).first()
+            cls._available[key] = found is not None
+        return cls._available[key]
+
+    @staticmethod
+    def _tokens(term):
+        return [token for token in re.split(r'\s+', term.strip()) if token]
+
+    @classmethod
+    def build_match_query(cls, term):
+        """
+        將使用者輸入轉為 FTS5 MATCH 語法：每個關鍵字各為一個片語（以 AND 連接），避免特殊字元被解讀為運算子。
+        只比對零件編號與名稱（與短關鍵字的 LIKE 查詢相同），不比對索引中的 description。
+        任一關鍵字短於 trigram 長度時無法使用索引，回傳 None。
+        """
+        tokens = cls._tokens(term)
+        if not tokens or any(len(token) < cls.MIN_TOKEN_LENGTH for token in tokens):
+            return None
+        phrases = ' '.join('"' + token.replace('"', '""') + '"' for token in tokens)
+        return f'{{{" ".join(cls.SEARCH_COLUMNS)}}} : ({phrases})'
+
+    @staticmethod
+    def _escape_like(value):
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    @classmethod
+    def matching_ids_clause(cls, term):
+        """
+        供 Part.get_all 等查詢使用的篩選條件：可使用索引時為 Part.id IN (FTS 子查詢)，否則為 LIKE 條件。
+        """
+        match_query = cls.build_match_query(term) if cls.is_available() else None
+        if match_query is None:
+            pattern = f"%{cls._escape_like(term.strip())}%"
+            return or_(Part.name.ilike(pattern, escape='\\'), Part.part_number.ilike(pattern, escape='\\'))
+        subquery = text("SELECT rowid FROM parts_fts WHERE parts_fts MATCH :match_query").bindparams(
+            match_query=match_query
+        ).columns(rowid=db.Integer)
+        return Part.id.in_(subquery)
+
+    @staticmethod
+    def _merge_ids(limit, *id_lists):
+        """依序合併多個 id 清單並去除重複，最多 limit 筆"""
+        merged = []
+        seen = set()
+        for ids in id_lists:
+            for part_id in ids:
+                if part_id not in seen:
+                    seen.add(part_id)
+                    merged.append(part_id)
+                    if len(merged) >= limit:
+                        return merged
+        return merged
+
+    @staticmethod
+    def _exact_ids(term):
+        """零件編號完全相符者（使用 parts.part_number 唯一索引）"""
+        return [row[0] for row in db.session.query(Part.id).filter(Part.part_number.in_({term, term.upper()}))]
+
+    @classmethod
+    def _match_ids(cls, term, limit):
+        """
+        以 MATCH 查詢索引，依 bm25 排序（零件編號權重最高）。
+        只對前 RANK_CANDIDATES 筆候選計算排序，避免極常見的關鍵字需要為數萬筆結果計分。
+        """
+        rows = db.session.execute(text(
+            "SELECT rowid FROM ("
+            "SELECT rowid, bm25(parts_fts, 10.0, 5.0, 1.0) AS score FROM parts_fts "
+            "WHERE parts_fts MATCH :match_query LIMIT :candidates"
+            ") ORDER BY score LIMIT :limit"
+        ), {'match_query': cls.build_match_query(term), 'candidates': cls.RANK_CANDIDATES, 'limit': limit})
+        return cls._merge_ids(limit, cls._exact_ids(term), [row[0] for row in rows])
+
+    @classmethod
+    def _prefix_ids(cls, term, limit):
+        """自動完成：零件編號以關鍵字開頭者優先（依零件編號排序），其次為名稱開頭者"""
+        # 零件編號以唯一索引做範圍查詢（依輸入值與大寫各查一次）
+        part_number_ids = []
+        for candidate in dict.fromkeys([term, term.upper()]):
+            part_number_ids += [row[0] for row in db.session.query(Part.id).filter(
+                Part.part_number >= candidate, Part.part_number < candidate + '\uffff'
+            ).order_by(Part.part_number).limit(limit)]
+        if len(part_number_ids) >= limit:
+            return part_number_ids[:limit]
+
+        # 名稱開頭：FTS5 trigram 索引可處理 LIKE，但加上 ESCAPE 即無法使用索引，含萬用字元時改查 parts
+        if len(term) >= cls.MIN_TOKEN_LENGTH and not any(c in term for c in '%_\\') and cls.is_available():
+            name_ids = [row[0] for row in db.session.execute(text(
+                "SELECT rowid FROM parts_fts WHERE name LIKE :pattern LIMIT :limit"
+            ), {'pattern': term + '%', 'limit': limit})]
+        else:
+            name_ids = [row[0] for row in db.session.query(Part.id).filter(
+                Part.name.like(cls._escape_like(term) + '%', escape='\\')
+            ).limit(limit)]
+        return cls._merge_ids(limit, part_number_ids, name_ids)
+
+    @classmethod
+    def _like_ids(cls, term, limit):
+        """關鍵字太短或尚未建立索引時，以 LIKE 查詢（零件編號相符者排在前面）"""
+        pattern = f"%{cls._escape_like(term)}%"
+        part_number_ids = [row[0] for row in db.session.query(Part.id).filter(
+            Part.part_number.ilike(pattern, escape='\\')
+        ).limit(limit)]
+        if len(part_number_ids) >= limit:
+            return part_number_ids
+        name_ids = [row[0] for row in db.session.query(Part.id).filter(
+            Part.name.ilike(pattern, escape='\\')
+        ).limit(limit)]
+        return cls._merge_ids(limit, part_number_ids, name_ids)
+
+    @classmethod
+    def search(cls, term, prefix=False, limit=None):
+        """
+        搜尋零件，回傳依相關度排序的零件資料清單。
+        prefix 為 True 時為自動完成模式，只比對零件編號或名稱的開頭。
+        """
+        term = (term or '').strip()
+        if not term:
+            return []
+        limit = max(1, min(limit or cls.DEFAULT_LIMIT, cls.MAX_LIMIT))
+
+        try:
+            if prefix:
+                ids = cls._prefix_ids(term, limit)
+            elif cls.is_available() and cls.build_match_query(term) is not None:
+                ids = cls._match_ids(term, limit)
+            else:
+                ids = cls._like_ids(term, limit)
+        except OperationalError as e:
+            print(f"全文檢索查詢失敗，改用 LIKE 查詢: {e}")
+            db.session.rollback()
+            ids = cls._like_ids(term, limit)
+
+        if not ids:
+            return []
+
+        rows = db.session.query(
+            Part.id, Part.part_number, Part.name, Part.type, Part.unit, Part.quantity_per_box
+        ).filter(Part.id.in_(ids)).all()
+        by_id = {row.id: row for row in rows}
+        return [
+            {
+                'id': row.id,
+                'part_number': row.part_number,
+                'name': row.name,
+                'type': row.type,
+                'unit': row.unit,
+                'quantity_per_box': row.quantity_per_box
+            }
+            for row in (by_id.get(part_id) for part_id in ids) if row is not None
+        ]
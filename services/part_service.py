@@ -1,18 +1,146 @@
 import pandas as pd
 from io import BytesIO
-from models.part import Part, Warehouse
+from sqlalchemy import insert
+from models.part import Part, Warehouse, WarehouseLocation, PartWarehouseLocation, get_taipei_time
 from extensions import db
 
+class PartImportLookup:
+    """
+    零件匯入用的查找表。
+    一次載入所有倉庫、倉位與零件倉位關聯，整批匯入期間的倉位衝突檢查都在記憶體中完成，
+    新零件、倉位與關聯則暫存後以批次 INSERT 寫入。
+    """
+
+    def __init__(self):
+        self.warehouses_by_code = {}
+        self.warehouse_names = {}
+        for warehouse_id, code, name in db.session.query(Warehouse.id, Warehouse.code, Warehouse.name):
+            self.warehouses_by_code[code] = warehouse_id
+            self.warehouse_names[warehouse_id] = name
+
+        # (warehouse_id, location_code) -> location key（既有倉位為 id，新倉位為 ('new', n)）
+        self.locations = {
+            (warehouse_id, location_code): location_id
+            for location_id, warehouse_id, location_code in db.session.query(
+                WarehouseLocation.id, WarehouseLocation.warehouse_id, WarehouseLocation.location_code
+            )
+        }
+
+        # part_number -> part key（既有零件為 id，新零件為 part_number 本身）
+        self.parts = {}
+        self.part_labels = {}
+        for part_id, part_number, name in db.session.query(Part.id, Part.part_number, Part.name):
+            self.parts[part_number] = part_id
+            self.part_labels[part_id] = f"{part_number} - {name}"
+
+        # location key -> [part key, ...]
+        self.location_parts = {}
+        for part_id, location_id in db.session.query(
+            PartWarehouseLocation.part_id, PartWarehouseLocation.warehouse_location_id
+        ):
+            self.location_parts.setdefault(location_id, []).append(part_id)
+
+        self.pending_locations = []
+        self.pending_parts = []
+        self.pending_associations = []
+
+    def get_warehouse_id(self, code):
+        return self.warehouses_by_code.get(code)
+
+    def part_exists(self, part_number):
+        return part_number in self.parts
+
+    def find_location_conflicts(self, locations_data):
+        """與 Part.create 相同的倉位衝突檢查，回傳相同格式的衝突清單"""
+        location_conflicts = []
+        for loc_data in locations_data:
+            warehouse_id = loc_data['warehouse_id']
+            location_code = loc_data['location_code']
+            location_key = self.locations.get((warehouse_id, location_code))
+            other_parts = self.location_parts.get(location_key) if location_key is not None else None
+            if other_parts:
+                location_conflicts.append({
+                    'warehouse': self.warehouse_names.get(warehouse_id, f"倉庫ID:{warehouse_id}"),
+                    'location': location_code,
+                    'parts': [self.part_labels[part_key] for part_key in other_parts]
+                })
+        return location_conflicts
+
+    def add_part(self, part_data, locations_data):
+        """暫存新零件及其倉位，並更新查找表讓後續列可看到此零件"""
+        part_number = part_data['part_number']
+        self.pending_parts.append(part_data)
+        self.parts[part_number] = part_number
+        self.part_labels[part_number] = f"{part_number} - {part_data['name']}"
+
+        for loc_data in locations_data:
+            location = (loc_data['warehouse_id'], loc_data['location_code'])
+            location_key = self.locations.get(location)
+            if location_key is None:
+                location_key = ('new', len(self.pending_locations))
+                self.locations[location] = location_key
+                self.pending_locations.append({'warehouse_id': location[0], 'location_code': location[1]})
+            part_keys = self.location_parts.setdefault(location_key, [])
+            if part_number not in part_keys:
+                part_keys.append(part_number)
+                self.pending_associations.append((part_number, location_key))
+
+    def flush(self):
+        """將暫存的倉位、零件與關聯以批次 INSERT 寫入目前的交易"""
+        location_ids = {}
+        if self.pending_locations:
+            new_location_ids = db.session.execute(
+                insert(WarehouseLocation).returning(WarehouseLocation.id, sort_by_parameter_order=True),
+                self.pending_locations
+            ).scalars().all()
+            for index, location_id in enumerate(new_location_ids):
+                location = self.pending_locations[index]
+                location_ids[('new', index)] = location_id
+                self.locations[(location['warehouse_id'], location['location_code'])] = location_id
+
+        part_ids = {}
+        if self.pending_parts:
+            rows = db.session.execute(
+                insert(Part).returning(Part.id, Part.part_number, sort_by_parameter_order=True),
+                self.pending_parts
+            ).all()
+            for part_id, part_number in rows:
+                part_ids[part_number] = part_id
+                self.parts[part_number] = part_id
+                self.part_labels[part_id] = self.part_labels.pop(part_number)
+
+        if self.pending_associations:
+            db.session.execute(insert(PartWarehouseLocation), [
+                {'part_id': part_ids[part_number], 'warehouse_location_id': location_ids.get(location_key, location_key)}
+                for part_number, location_key in self.pending_associations
+            ])
+
+        # 將暫存用的 key 換成資料庫產生的 id
+        self.location_parts = {
+            location_ids.get(location_key, location_key): [part_ids.get(key, key) for key in part_keys]
+            for location_key, part_keys in self.location_parts.items()
+        }
+        self.pending_locations = []
+        self.pending_parts = []
+        self.pending_associations = []
+
+
 class PartService:
+    # 每累積此數量的新零件即批次寫入一次
+    IMPORT_FLUSH_SIZE = 1000
+
     @staticmethod
-    def import_parts_from_excel(file_stream):
+    def import_parts_from_excel(file_stream, progress_callback=None):
         """
         Handles the batch import of parts from an XLSX file.
+        Warehouses, locations and part-location associations are resolved from in-memory lookup tables
+        and new rows are written with bulk inserts in a single transaction.
         Returns a dictionary with success status, message, and counts.
+        progress_callback(processed_rows, total_rows) is called after each row.
         """
         try:
             df = pd.read_excel(file_stream)
-            
+
             column_map = {
                 '零件編號': 'part_number',
                 '名稱': 'name',
@@ -31,8 +159,13 @@ class PartService:
             imported_count = 0
             skipped_count = 0
             errors = []
-            
+            total_rows = len(df)
+            lookup = PartImportLookup()
+
             for index, row in df.iterrows():
+                if progress_callback:
+                    progress_callback(index, total_rows)
+
                 part_number = row.get('part_number')
                 name = row.get('name')
                 unit = row.get('unit')
@@ -51,7 +184,7 @@ class PartService:
                     skipped_count += 1
                     errors.append(f"第 {index + 2} 行: 每盒數量 '{quantity_per_box_raw}' 無效，必須是數字。")
                     continue
-                
+
                 # Parse locations string into list of dicts
                 locations_data = []
                 location_parse_error = False
@@ -60,9 +193,9 @@ class PartService:
                     if len(parts) == 2:
                         warehouse_code = parts[0]
                         location_code = parts[1]
-                        warehouse = Part.get_warehouse_by_code(warehouse_code)
-                        if warehouse:
-                            locations_data.append({'warehouse_id': warehouse.id, 'location_code': location_code})
+                        warehouse_id = lookup.get_warehouse_id(warehouse_code)
+                        if warehouse_id:
+                            locations_data.append({'warehouse_id': warehouse_id, 'location_code': location_code})
                         else:
                             errors.append(f"第 {index + 2} 行: 找不到倉別代碼 '{warehouse_code}'。")
                             location_parse_error = True
@@ -71,7 +204,7 @@ class PartService:
                         errors.append(f"第 {index + 2} 行: 儲存位置格式錯誤 '{loc_pair_str}'，應為 倉別代碼:位置代碼。")
                         location_parse_error = True
                         break
-                
+
                 if location_parse_error or not locations_data:
                     skipped_count += 1
                     continue
@@ -86,34 +219,51 @@ class PartService:
                         duplicate_location_found = True
                         break
                     seen_locations.add(location_tuple)
-                
+
                 if duplicate_location_found:
                     skipped_count += 1
                     continue
 
-                # Attempt to create the part
-                result = Part.create(
-                    part_number=part_number,
-                    name=name,
-                    description=row.get('description', ''),
-                    unit=unit,
-                    quantity_per_box=quantity_per_box,
-                    locations_data=locations_data
-                )
-                
-                if result['success']:
-                    imported_count += 1
-                else:
+                part_number = str(part_number).strip()
+                if lookup.part_exists(part_number):
+                    skipped_count += 1
+                    errors.append(f"第 {index + 2} 行: 零件編號已存在")
+                    continue
+
+                conflict_details = lookup.find_location_conflicts(locations_data)
+                if conflict_details:
                     skipped_count += 1
-                    if result.get('error') == 'location_conflict':
-                        conflict_details = result.get('conflicts', [])
-                        conflict_msg = "倉位衝突！"
-                        for conflict in conflict_details:
-                            conflict_msg += f" 倉庫 {conflict['warehouse']} - 位置 {conflict['location']} 已被零件 {', '.join(conflict['parts'])} 使用。"
-                        errors.append(f"第 {index + 2} 行: {conflict_msg}")
-                    else:
-                        errors.append(f"第 {index + 2} 行: {result.get('error', '零件新增失敗')}")
-            
+                    conflict_msg = "倉位衝突！"
+                    for conflict in conflict_details:
+                        conflict_msg += f" 倉庫 {conflict['warehouse']} - 位置 {conflict['location']} 已被零件 {', '.join(conflict['parts'])} 使用。"
+                    errors.append(f"第 {index + 2} 行: {conflict_msg}")
+                    continue
+
+                description = row.get('description')
+                lookup.add_part({
+                    'part_number': part_number,
+                    'name': str(name),
+                    'type': None,
+                    'description': None if pd.isna(description) else str(description),
+                    'unit': str(unit),
+                    'quantity_per_box': quantity_per_box,
+                    'safety_stock': 0,
+                    'reorder_point': 0,
+                    'standard_cost': 0,
+                    'is_active': True,
+                    'created_at': get_taipei_time()
+                }, locations_data)
+                imported_count += 1
+
+                if len(lookup.pending_parts) >= PartService.IMPORT_FLUSH_SIZE:
+                    lookup.flush()
+
+            lookup.flush()
+            db.session.commit()
+
+            if progress_callback:
+                progress_callback(total_rows, total_rows)
+
             return {
                 'success': True,
                 'message': f'成功匯入 {imported_count} 個新零件。跳過 {skipped_count} 個零件。',
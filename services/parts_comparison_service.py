@@ -0,0 +1,245 @@
+import threading
+from datetime import date
+import numpy as np
+import pandas as pd
+from models.work_order import WorkOrderDemand, PartDemandSummary
+from models.part import Part
+from models.inventory import CurrentInventory
+from models.order import Order
+from services.mrp_service import MrpService
+from services.change_tracker import change_tracker
+from extensions import db
+
+class PartsComparisonService:
+    """
+    工單需求零件與零件倉差異分析。
+    以三個查詢取得工單需求彙總 (part_demand_summary)、零件與庫存，再以 pandas 合併計算缺少、缺料與無需求零件，
+    供網頁報表 (/reports/parts-comparison/data) 與 generate_parts_comparison_report.py 共用。
+    網頁報表的 JSON 結果依三個來源資料表的異動版本號快取，資料表有 commit 異動後才重新計算。
+    """
+
+    # 差異分析的來源資料表，任一資料表異動即需重新計算
+    SOURCE_TABLES = (
+        PartDemandSummary.__tablename__, Part.__tablename__, CurrentInventory.__tablename__,
+        WorkOrderDemand.__tablename__, Order.__tablename__
+    )
+
+    # engine url -> (etag, JSON 字串)
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    # Excel 報表欄位名稱
+    MISSING_REPORT_COLUMNS = {
+        'part_number': '零件編號',
+        'description': '物料說明',
+        'total_required': '總需求量',
+        'order_count': '關聯工單數',
+        'status': '狀態',
+        'action': '建議動作'
+    }
+    INVENTORY_REPORT_COLUMNS = {
+        'part_number': '零件編號',
+        'name': '零件名稱',
+        'description': '零件說明',
+        'unit': '單位',
+        'required_quantity': '工單需求量',
+        'total_stock': '庫存總量',
+        'available_stock': '可用庫存',
+        'shortage': '缺料數量',
+        'first_shortage_date': '首次缺料日',
+        'order_count': '關聯工單數',
+        'has_demand': '是否有工單需求',
+        'stock_status': '庫存狀況'
+    }
+    UNUSED_REPORT_COLUMNS = {
+        'part_number': '零件編號',
+        'name': '零件名稱',
+        'description': '零件說明',
+        'unit': '單位',
+        'total_stock': '庫存總量',
+        'available_stock': '可用庫存',
+        'status': '狀態',
+        'action': '建議動作'
+    }
+    SUMMARY_LABELS = {
+        'work_order_parts_count': '工單需求零件總數',
+        'inventory_parts_count': '零件倉零件總數',
+        'common_parts_count': '共同零件數',
+        'missing_in_inventory_count': '工單需求有但零件倉沒有',
+        'unused_in_inventory_count': '零件倉有但工單需求沒有',
+        'shortage_parts_count': '有庫存缺料的零件數',
+        'sufficient_parts_count': '庫存充足的零件數'
+    }
+
+    @staticmethod
+    def _frame(query, columns):
+        return pd.DataFrame.from_records(query.all(), columns=columns)
+
+    @classmethod
+    def load_frames(cls):
+        """
+        以欄位查詢取得三個彙總資料：
+        demand (part_number, description, total_required, order_count)：每個料號一筆，讀取預先彙總的 part_demand_summary
+        parts (part_number, name, unit, description)
+        stock (part_number, total_stock, available_stock)：各倉庫加總
+        """
+        demand = cls._frame(db.session.query(
+            PartDemandSummary.part_number,
+            PartDemandSummary.material_description,
+            PartDemandSummary.total_required,
+            PartDemandSummary.order_count
+        ), ['part_number', 'description', 'total_required', 'order_count'])
+
+        parts = cls._frame(db.session.query(
+            Part.part_number, Part.name, Part.unit, Part.description
+        ), ['part_number', 'name', 'unit', 'description'])
+
+        stock = cls._frame(db.session.query(
+            Part.part_number,
+            db.func.sum(CurrentInventory.quantity_on_hand),
+            db.func.sum(CurrentInventory.available_quantity)
+        ).join(CurrentInventory, Part.id == CurrentInventory.part_id).group_by(Part.part_number),
+            ['part_number', 'total_stock', 'available_stock'])
+
+        return demand, parts, stock
+
+    @staticmethod
+    def compare(demand, parts, stock, shortage_dates=None):
+        """
+        以向量化合併計算差異分析。
+        shortage_dates (part_number, first_shortage_date) 為 MrpService 依需求日期與在途訂單算出的首次缺料日。
+        Returns {'summary': dict, 'missing_in_inventory': DataFrame,
+                 'inventory_with_demand': DataFrame, 'unused_inventory': DataFrame}
+        """
+        demand = demand.astype({'total_required': float, 'order_count': int})
+        parts = parts.assign(
+            unit=parts['unit'].fillna(''),
+            description=parts['description'].fillna('')
+        )
+        stock = stock.astype({'total_stock': float, 'available_stock': float})
+
+        in_inventory = demand['part_number'].isin(parts['part_number'])
+
+        # 工單需求有但零件倉沒有的零件
+        missing = demand.loc[~in_inventory].assign(
+            status='工單需求有，零件倉缺少',
+            action='新增至零件倉'
+        )
+
+        # 零件倉有的零件與工單需求對比
+        inventory = parts.merge(
+            demand[['part_number', 'total_required', 'order_count']], on='part_number', how='left'
+        ).merge(stock, on='part_number', how='left')
+        if shortage_dates is None:
+            inventory['first_shortage_date'] = None
+        else:
+            inventory = inventory.merge(shortage_dates, on='part_number', how='left')
+            inventory['first_shortage_date'] = inventory['first_shortage_date'].astype(object).where(
+                inventory['first_shortage_date'].notna(), None
+            )
+        inventory = inventory.fillna({'total_required': 0.0, 'order_count': 0, 'total_stock': 0.0, 'available_stock': 0.0})
+        inventory = inventory.rename(columns={'total_required': 'required_quantity'})
+        inventory['order_count'] = inventory['order_count'].astype(int)
+        inventory['shortage'] = (inventory['required_quantity'] - inventory['available_stock']).clip(lower=0)
+        inventory['has_demand'] = inventory['required_quantity'] > 0
+        inventory['stock_status'] = np.select(
+            [inventory['shortage'] > 0, inventory['has_demand']],
+            ['缺料', '充足'],
+            default='無需求'
+        )
+        inventory = inventory[list(PartsComparisonService.INVENTORY_REPORT_COLUMNS)]
+
+        # 零件倉有但工單需求沒有的零件
+        unused = inventory.loc[
+            ~inventory['part_number'].isin(demand['part_number']),
+            ['part_number', 'name', 'description', 'unit', 'total_stock', 'available_stock']
+        ].assign(
+            status='零件倉有，無工單需求',
+            action='檢視是否為過剩庫存'
+        )
+
+        summary = {
+            'work_order_parts_count': len(demand),
+            'inventory_parts_count': len(parts),
+            'common_parts_count': int(in_inventory.sum()),
+            'missing_in_inventory_count': len(missing),
+            'unused_in_inventory_count': len(unused),
+            'shortage_parts_count': int((inventory['shortage'] > 0).sum()),
+            'sufficient_parts_count': int((inventory['stock_status'] == '充足').sum())
+        }
+
+        return {
+            'summary': summary,
+            'missing_in_inventory': missing.sort_values('total_required', ascending=False, kind='stable'),
+            'inventory_with_demand': inventory.sort_values('shortage', ascending=False, kind='stable'),
+            'unused_inventory': unused.sort_values('total_stock', ascending=False, kind='stable')
+        }
+
+    @classmethod
+    def run(cls):
+        """查詢資料並進行差異分析（含分時段淨需求的首次缺料日）"""
+        demand, parts, stock = cls.load_frames()
+        mrp_parts, _ = MrpService.run()
+        return cls.compare(demand, parts, stock, MrpService.first_shortage_dates(mrp_parts))
+
+    @classmethod
+    def to_payload(cls, result):
+        """轉為 JSON 回應格式"""
+        return {
+            'success': True,
+            'summary': result['summary'],
+            'missing_in_inventory': result['missing_in_inventory'].to_dict('records'),
+            'inventory_with_demand': result['inventory_with_demand'].to_dict('records'),
+            'unused_inventory': result['unused_inventory'].to_dict('records')
+        }
+
+    @classmethod
+    def etag(cls):
+        """
+        目前資料版本的 ETag，只讀取記憶體中的版本號，不查詢資料庫。
+        首次缺料日以今天為基準計算（逾期需求視為今天），因此加上今天日期，換日後即重新計算。
+        """
+        return f'{change_tracker.etag(*cls.SOURCE_TABLES)}-{date.today().isoformat()}'
+
+    @classmethod
+    def cached_payload_json(cls, dumps):
+        """
+        回傳 (etag, JSON 字串)。資料版本與日期（皆包含於 etag）未變動時直接使用快取結果，
+        否則重新計算並以 dumps 序列化；同時間的多個請求只會計算一次。
+        """
+        key = str(db.engine.url)
+        etag = cls.etag()
+        cached = cls._cache.get(key)
+        if cached and cached[0] == etag:
+            return cached
+
+        with cls._cache_lock:
+            # 等待鎖期間可能已由其他請求計算完成
+            etag = cls.etag()
+            cached = cls._cache.get(key)
+            if cached and cached[0] == etag:
+                return cached
+            # 先取得版本再查詢：計算期間若有異動，結果會對應到舊版本，下次請求即重新計算
+            cached = (etag, dumps(cls.to_payload(cls.run())))
+            cls._cache[key] = cached
+            return cached
+
+    @classmethod
+    def to_report_frames(cls, result):
+        """
+        轉為 Excel 報表用的中文欄位 DataFrame。
+        Returns (summary_df, missing_df, inventory_df, unused_df)
+        """
+        summary = pd.DataFrame({
+            '項目': list(cls.SUMMARY_LABELS.values()),
+            '數量': [result['summary'][key] for key in cls.SUMMARY_LABELS]
+        })
+        inventory = result['inventory_with_demand'].assign(
+            has_demand=np.where(result['inventory_with_demand']['has_demand'], '是', '否')
+        )
+        return (
+            summary,
+            result['missing_in_inventory'].rename(columns=cls.MISSING_REPORT_COLUMNS),
+            inventory.rename(columns=cls.INVENTORY_REPORT_COLUMNS),
+            result['unused_inventory'].rename(columns=cls.UNUSED_REPORT_COLUMNS)
+        )
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from models.part import Part
+from models.order import Order
+from models.inventory import CurrentInventory
+from models.weekly_order import WeeklyOrderCycle, OrderRegistration
+from services.mrp_service import MrpService
+from extensions import db
+
+class ReorderService:
+    """
+    自動補貨建議。
+    一次計算所有啟用零件的建議訂購量，寫入當前週期申請（申請人「系統自動」）：
+    1. 工單需求：以 MrpService 分時段淨需求補足缺料
+    2. 再訂購點／安全庫存：補足需求後的預計庫存（可用庫存＋在途訂單＋本週期已登記－工單需求）
+       低於再訂購點或安全庫存時，補到兩者中較高者
+    3. 數量依每箱數量無條件進位
+    本週期已登記（未被拒絕）的數量視為已訂購，重複執行不會重複登記。
+    """
+    APPLICANT_NAME = '系統自動'
+    DEPARTMENT = '自動申請'
+    # 首次缺料日在此天數內標記為急件
+    URGENT_DAYS = 7
+
+    @staticmethod
+    def _frame(query, columns):
+        return pd.DataFrame.from_records(query.all(), columns=columns)
+
+    @classmethod
+    def load_parts(cls, cycle_id):
+        """啟用零件與其可用庫存、在途訂單、本週期已登記數量（各一個彙總查詢）"""
+        parts = cls._frame(db.session.query(
+            Part.part_number, Part.name, Part.unit, Part.type, Part.quantity_per_box,
+            Part.safety_stock, Part.reorder_point
+        ).filter(Part.is_active.isnot(False)),
+            ['part_number', 'name', 'unit', 'type', 'quantity_per_box', 'safety_stock', 'reorder_point'])
+
+        available = cls._frame(db.session.query(
+            Part.part_number, db.func.sum(CurrentInventory.available_quantity)
+        ).join(CurrentInventory, Part.id == CurrentInventory.part_id).group_by(Part.part_number),
+            ['part_number', 'available'])
+
+        open_quantity = Order.quantity_ordered - db.func.coalesce(Order.quantity_received, 0)
+        on_order = cls._frame(db.session.query(
+            Part.part_number, db.func.sum(open_quantity)
+        ).join(Part, Order.part_id == Part.id).filter(
+            Order.status.in_(MrpService.OPEN_ORDER_STATUSES), open_quantity > 0
+        ).group_by(Part.part_number), ['part_number', 'on_order'])
+
+        registered = cls._frame(db.session.query(
+            OrderRegistration.part_number, db.func.sum(OrderRegistration.quantity)
+        ).filter(
+            OrderRegistration.cycle_id == cycle_id, OrderRegistration.status != 'rejected'
+        ).group_by(OrderRegistration.part_number), ['part_number', 'registered'])
+
+        for frame in (available, on_order, registered):
+            parts = parts.merge(frame, on='part_number', how='left')
+        return parts
+
+    @classmethod
+    def suggest(cls, cycle_id, today=None):
+        """
+        計算建議訂購量，回傳需要訂購的零件 DataFrame：
+        part_number, name, unit, type, quantity, required_date, priority, available, on_order, registered,
+        demand, net_requirement
+        """
+        today = pd.Timestamp(today or datetime.now()).normalize()
+        parts = cls.load_parts(cycle_id)
+        mrp, _ = MrpService.run(today=today)
+        parts = parts.merge(
+            mrp[['part_number', 'total_demand', 'net_requirement', 'first_shortage_date']],
+            on='part_number', how='left'
+        )
+        parts = parts.fillna({
+            'available': 0.0, 'on_order': 0.0, 'registered': 0.0, 'total_demand': 0.0, 'net_requirement': 0.0,
+            'safety_stock': 0, 'reorder_point': 0, 'unit': '個', 'type': ''
+        })
+
+        # 本週期已登記的數量先抵扣工單缺料
+        shortfall = np.maximum(parts['net_requirement'] - parts['registered'], 0.0)
+        # 補足缺料後的預計庫存（不低於 0）
+        ending = parts['available'] + parts['on_order'] + parts['registered'] + shortfall - parts['total_demand']
+        target = np.maximum(parts['reorder_point'], parts['safety_stock']).astype(float)
+        below_target = (ending < parts['reorder_point']) | (ending < parts['safety_stock'])
+        quantity = shortfall + np.where(below_target, target - ending, 0.0)
+
+        # 依每箱數量無條件進位
+        box = parts['quantity_per_box'].fillna(1).clip(lower=1).astype(int)
+        parts['quantity'] = (np.ceil(quantity / box) * box).astype(int)
+        needed = parts['quantity'] > 0
+
+        parts = parts.loc[needed].copy()
+        urgent_before = today + timedelta(days=cls.URGENT_DAYS)
+        parts['priority'] = np.where(parts['first_shortage_date'] < urgent_before, 'urgent', 'normal')
+        parts = parts.rename(columns={'total_demand': 'demand', 'first_shortage_date': 'required_date'})
+        return parts.sort_values(['priority', 'required_date', 'part_number'], ascending=[False, True, True], na_position='last')
+
+    @classmethod
+    def register_suggestions(cls, cycle, suggestions):
+        """將建議以單次批量 INSERT 寫入週期申請，項次一次配置（不 commit）"""
+        if suggestions.empty:
+            return 0
+        first_sequence = WeeklyOrderCycle.reserve_sequences(cycle.id, len(suggestions))
+
+        required_dates = suggestions['required_date'].astype(object).where(suggestions['required_date'].notna(), None)
+        notes = [
+            f'自動補貨建議 (可用{available:g}/在途{on_order:g}/需求{demand:g})'
+            for available, on_order, demand in zip(suggestions['available'], suggestions['on_order'], suggestions['demand'])
+        ]
+        records = [
+            {
+                'cycle_id': cycle.id,
+                'item_sequence': first_sequence + offset,
+                'part_number': part_number,
+                'part_name': name,
+                'quantity': int(quantity),
+                'unit': unit,
+                'category': category,
+                'required_date': required_date.to_pydatetime() if required_date is not None else None,
+                'priority': priority,
+                'purpose_notes': note,
+                'applicant_name': cls.APPLICANT_NAME,
+                'department': cls.DEPARTMENT,
+            }
+            for offset, (part_number, name, quantity, unit, category, required_date, priority, note) in enumerate(zip(
+                suggestions['part_number'], suggestions['name'], suggestions['quantity'], suggestions['unit'],
+                suggestions['type'], required_dates, suggestions['priority'], notes
+            ))
+        ]
+        db.session.execute(insert(OrderRegistration), records)
+        return len(records)
+
+    @classmethod
+    def generate(cls, dry_run=False):
+        """
+        為當前週期產生補貨建議。
+        Returns {'success': bool, 'added_count': int, 'suggestions': [...]}；dry_run 為 True 時只計算不寫入
+        """
+        cycle = WeeklyOrderCycle.get_current_cycle()
+        if not cycle or not cycle.is_active:
+            return {'success': False, 'error': '目前沒有可登記的申請週期'}
+
+        try:
+            suggestions = cls.suggest(cycle.id)
+            added_count = 0
+            if not dry_run:
+                added_count = cls.register_suggestions(cycle, suggestions)
+                db.session.commit()
+
+            columns = ['part_number', 'name', 'quantity', 'priority', 'available', 'on_order', 'registered', 'demand', 'net_requirement']
+            payload = suggestions[columns].assign(
+                required_date=MrpService.format_dates(suggestions['required_date'])
+            ).to_dict('records')
+            return {
+                'success': True,
+                'cycle_id': cycle.id,
+                'added_count': added_count,
+                'suggestion_count': len(payload),
+                'suggestions': payload
+            }
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': f'產生補貨建議失敗: {str(e)}'}
@@ -0,0 +1,206 @@
+import heapq
+import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from flask import Response, current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class _RequestStats:
+    """單一請求的 SQL 統計"""
+
+    __slots__ = ('started', 'query_count', 'sql_seconds', 'slowest')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_seconds = 0.0
+        # (耗時, 序號, SQL) 的最小堆積，只保留最慢的幾筆
+        self.slowest = []
+
+
+class RequestMetrics:
+    """
+    請求層級的 SQL 次數與延遲統計。
+    啟用時（設定 METRICS_ENABLED 或環境變數 METRICS_ENABLED=1）透過 SQLAlchemy cursor 事件與 Flask 請求掛鉤記錄
+    每個請求的查詢次數、SQL 總耗時與最慢的 SQL，回應附上 Server-Timing 標頭，
+    並依端點累計延遲直方圖，由 /metrics 以 Prometheus 文字格式輸出。
+    未啟用時不註冊任何事件與路由，沒有額外負擔。
+    統計只存在於本行程記憶體中，服務重啟後歸零。
+    """
+
+    # 延遲直方圖的上界（秒）
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    # 每個請求保留的最慢 SQL 筆數
+    SLOWEST_STATEMENTS = 5
+    # SQL 記錄的最大長度
+    STATEMENT_PREVIEW_LENGTH = 200
+
+    _current = ContextVar('request_metrics_stats', default=None)
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._listening = False
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    def reset(self):
+        """清除累計的統計"""
+        # (endpoint, method) -> 統計
+        self._requests = defaultdict(lambda: {
+            'buckets': [0] * len(self.LATENCY_BUCKETS),
+            'count': 0,
+            'seconds': 0.0,
+            'queries': 0,
+            'sql_seconds': 0.0,
+            'max_queries': 0,
+        })
+        # endpoint -> {SQL: 最長耗時}，各端點歷來最慢的 SQL（同一 SQL 只保留一筆，輸出時標籤不重複）
+        self._slowest = defaultdict(dict)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', os.environ.get('METRICS_ENABLED') == '1')
+        # 請求超過此毫秒數時記錄最慢的 SQL 至 app.logger
+        app.config.setdefault('METRICS_SLOW_REQUEST_MS', 500)
+        app.extensions['request_metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        self.enabled = True
+        if not self._listening:
+            # 監聽 Engine 類別，涵蓋 Flask-SQLAlchemy 延遲建立的 engine
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and self._current.get() is not None:
+            context._request_metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._current.get()
+        started = getattr(context, '_request_metrics_started', None)
+        if stats is None or started is None:
+            return
+        elapsed = time.perf_counter() - started
+        stats.query_count += 1
+        stats.sql_seconds += elapsed
+        entry = (elapsed, stats.query_count, statement[:self.STATEMENT_PREVIEW_LENGTH])
+        if len(stats.slowest) < self.SLOWEST_STATEMENTS:
+            heapq.heappush(stats.slowest, entry)
+        elif elapsed > stats.slowest[0][0]:
+            heapq.heapreplace(stats.slowest, entry)
+
+    def _before_request(self):
+        self._current.set(_RequestStats())
+
+    def _after_request(self, response):
+        stats = self._current.get()
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or 'unknown'
+        # SQL 中的換行與縮排壓縮為單一空白，方便記錄與輸出
+        slowest = [(seconds, order, ' '.join(statement.split())) for seconds, order, statement in sorted(stats.slowest, reverse=True)]
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.query_count} queries", app;dur={elapsed * 1000:.1f}'
+        )
+        if endpoint == 'metrics':
+            return response
+        self.record(endpoint, request.method, elapsed, stats.query_count, stats.sql_seconds, slowest)
+
+        if elapsed * 1000 >= current_app.config['METRICS_SLOW_REQUEST_MS']:
+            current_app.logger.warning(
+                '慢請求 %s %s: %.1f ms, %d 次查詢 (SQL %.1f ms), 最慢 SQL: %s',
+                request.method, request.path, elapsed * 1000, stats.query_count, stats.sql_seconds * 1000,
+                ' | '.join(f'{seconds * 1000:.1f} ms {statement}' for seconds, _, statement in slowest)
+            )
+        return response
+
+    def _teardown_request(self, exc):
+        self._current.set(None)
+
+    def record(self, endpoint, method, seconds, query_count, sql_seconds, slowest=()):
+        """累計一個請求的統計（一般由 after_request 呼叫）"""
+        with self._lock:
+            stats = self._requests[(endpoint, method)]
+            for index, bound in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats['buckets'][index] += 1
+                    break
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['queries'] += query_count
+            stats['sql_seconds'] += sql_seconds
+            stats['max_queries'] = max(stats['max_queries'], query_count)
+
+            if slowest:
+                merged = self._slowest[endpoint]
+                for elapsed, _, statement in slowest:
+                    merged[statement] = max(elapsed, merged.get(statement, 0.0))
+                if len(merged) > self.SLOWEST_STATEMENTS:
+                    self._slowest[endpoint] = dict(heapq.nlargest(self.SLOWEST_STATEMENTS, merged.items(), key=lambda item: item[1]))
+
+    @staticmethod
+    def _labels(**labels):
+        """Prometheus 標籤，值中的反斜線、雙引號與換行需跳脫"""
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+    def render(self):
+        """以 Prometheus 文字格式輸出目前的統計"""
+        with self._lock:
+            requests = {key: dict(value, buckets=list(value['buckets'])) for key, value in self._requests.items()}
+            slowest = {
+                endpoint: sorted(statements.items(), key=lambda item: item[1], reverse=True)
+                for endpoint, statements in self._slowest.items()
+            }
+
+        lines = [
+            '# HELP http_request_duration_seconds Request latency by endpoint.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (endpoint, method), stats in sorted(requests.items()):
+            cumulative = 0
+            for bound, count in zip(self.LATENCY_BUCKETS, stats['buckets']):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{self._labels(endpoint=endpoint, method=method, le=bound)} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{self._labels(endpoint=endpoint, method=method, le="+Inf")} {stats["count"]}')
+            lines.append(f'http_request_duration_seconds_sum{self._labels(endpoint=endpoint, method=method)} {stats["seconds"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{self._labels(endpoint=endpoint, method=method)} {stats["count"]}')
+
+        metrics = (
+            ('http_request_db_queries_total', 'counter', 'SQL statements executed by endpoint.', 'queries', '{}'),
+            ('http_request_db_seconds_total', 'counter', 'Time spent executing SQL by endpoint.', 'sql_seconds', '{:.6f}'),
+            ('http_request_db_queries_max', 'gauge', 'Most SQL statements executed by a single request.', 'max_queries', '{}'),
+        )
+        for name, metric_type, help_text, key, value_format in metrics:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for (endpoint, method), stats in sorted(requests.items()):
+                lines.append(f'{name}{self._labels(endpoint=endpoint, method=method)} {value_format.format(stats[key])}')
+
+        lines.append('# HELP db_slowest_statement_seconds Slowest SQL statements seen by endpoint.')
+        lines.append('# TYPE db_slowest_statement_seconds gauge')
+        for endpoint, statements in sorted(slowest.items()):
+            for statement, seconds in statements:
+                lines.append(f'db_slowest_statement_seconds{self._labels(endpoint=endpoint, statement=statement)} {seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,248 @@
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models.work_order import WorkOrderDemand, PartDemandSummary
+from extensions import db
+
+class WorkOrderService:
+    # Excel 欄位 -> 資料表欄位
+    COLUMN_MAP = {
+        '訂單': 'order_id',
+        '物料': 'part_number',
+        '需求數量 (EINHEIT)': 'required_quantity',
+        '物料說明': 'material_description',
+        '作業說明': 'operation_description',
+        '上層物料說明': 'parent_material_description',
+        '需求日期': 'required_date',
+        '散裝物料': 'bulk_material'
+    }
+    TEXT_COLUMNS = ['material_description', 'operation_description', 'parent_material_description', 'bulk_material']
+    UPSERT_CHUNK_SIZE = 500
+    # 匯入結果最多列出的錯誤訊息筆數（error_count 仍為全部錯誤列數）
+    MAX_ERROR_MESSAGES = 100
+
+    @staticmethod
+    def _clean_text(series):
+        """轉為去除空白的字串，空值轉為空字串"""
+        return series.astype(object).where(series.notna(), '').astype(str).str.strip()
+
+    @staticmethod
+    def _parse_required_dates(series, fallback):
+        """
+        解析需求日期：datetime 直接使用，字串依 %Y-%m-%d 解析，
+        其餘或無法解析的值以 fallback 取代（與逐行匯入時的行為一致）
+        """
+        if pd.api.types.is_datetime64_any_dtype(series):
+            dates = series
+        else:
+            dates = pd.to_datetime(series, format='%Y-%m-%d', errors='coerce')
+        if getattr(dates.dt, 'tz', None) is not None:
+            dates = dates.dt.tz_localize(None)
+        return dates.astype(object).where(dates.notna(), fallback)
+
+    @classmethod
+    def normalize_dataframe(cls, df):
+        """
+        以向量化方式驗證並整理工單需求 DataFrame。
+        Returns (valid_df, errors, filtered_count)，valid_df 每個 (order_id, part_number) 只保留最後一筆，
+        並附帶 occurrences 欄位記錄該組合在檔案中出現的次數；errors 為各錯誤列的行號與原因。
+        """
+        frame = df[list(cls.COLUMN_MAP.keys())].rename(columns=cls.COLUMN_MAP)
+
+        order_ids = cls._clean_text(frame['order_id'])
+        part_numbers = cls._clean_text(frame['part_number'])
+        quantities = pd.to_numeric(frame['required_quantity'], errors='coerce')
+
+        # 無法轉換數量或缺少訂單/物料的列視為錯誤
+        error_mask = quantities.isna() | frame['order_id'].isna() | frame['part_number'].isna()
+        errors = [cls._row_error(index, frame.loc[index]) for index in frame.index[error_mask]]
+
+        normalized = pd.DataFrame({
+            'order_id': order_ids,
+            'part_number': part_numbers,
+            'required_quantity': quantities.astype(float),
+        })
+        for column in cls.TEXT_COLUMNS:
+            normalized[column] = cls._clean_text(frame[column])
+        normalized = normalized[~error_mask]
+
+        # 篩選：跳過物料說明包含"圖"的項目
+        drawing_mask = normalized['material_description'].str.contains('圖', regex=False)
+        filtered_count = int(drawing_mask.sum())
+        normalized = normalized[~drawing_mask]
+
+        normalized['required_date'] = cls._parse_required_dates(
+            frame.loc[normalized.index, 'required_date'], datetime.now()
+        )
+
+        keys = ['order_id', 'part_number']
+        occurrences = normalized.groupby(keys, sort=False)['order_id'].transform('size')
+        normalized['occurrences'] = occurrences
+        normalized = normalized.drop_duplicates(subset=keys, keep='last')
+
+        return normalized, errors, filtered_count
+
+    @staticmethod
+    def _row_error(index, row):
+        """錯誤列的說明（行號與 PartService 相同，以 Excel 列號表示，標題列為第 1 行）"""
+        reasons = []
+        if pd.isna(row['order_id']):
+            reasons.append('缺少訂單')
+        if pd.isna(row['part_number']):
+            reasons.append('缺少物料')
+        if pd.isna(row['required_quantity']):
+            reasons.append('缺少需求數量')
+        elif pd.isna(pd.to_numeric(pd.Series([row['required_quantity']]), errors='coerce')[0]):
+            reasons.append(f"需求數量 '{row['required_quantity']}' 無效，必須是數字")
+        return f"第 {index + 2} 行: {'、'.join(reasons)}"
+
+    @staticmethod
+    def _existing_quantities(keys):
+        """取得資料庫中已存在的 (order_id, part_number) 組合及其需求數量"""
+        if not keys:
+            return {}
+        rows = db.session.query(
+            WorkOrderDemand.order_id, WorkOrderDemand.part_number, WorkOrderDemand.required_quantity
+        ).filter(
+            tuple_(WorkOrderDemand.order_id, WorkOrderDemand.part_number).in_(keys)
+        ).all()
+        return {(row[0], row[1]): row[2] for row in rows}
+
+    @staticmethod
+    def _summary_deltas(part_numbers, quantity_deltas, count_deltas, descriptions):
+        """將逐筆需求的差異量依料號加總為 PartDemandSummary.apply_deltas 的格式"""
+        frame = pd.DataFrame({
+            'part_number': part_numbers,
+            'total_required': quantity_deltas,
+            'order_count': count_deltas,
+            'material_description': descriptions,
+        })
+        grouped = frame.groupby('part_number', sort=False).agg(
+            total_required=('total_required', 'sum'),
+            order_count=('order_count', 'sum'),
+            material_description=('material_description', 'max'),
+        ).reset_index()
+        grouped['total_required'] = grouped['total_required'].astype(float)
+        grouped['order_count'] = grouped['order_count'].astype(int)
+        return grouped.to_dict('records')
+
+    @classmethod
+    def _upsert_statement(cls):
+        """依 _order_part_uc 唯一約束建立 INSERT ... ON CONFLICT DO UPDATE 語句"""
+        table = WorkOrderDemand.__table__
+        stmt = sqlite_insert(table)
+        update_columns = ['required_quantity', 'required_date'] + cls.TEXT_COLUMNS
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.order_id, table.c.part_number],
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+
+    @classmethod
+    def upsert_demands(cls, frame, progress_callback=None):
+        """
+        分批將整理後的需求寫入資料庫。
+        Returns (imported_count, updated_count)，計算方式與逐行匯入相同：
+        新組合第一次出現算新增，其餘出現次數都算更新。
+        每批依原有需求數量計算差異量，同步更新 part_demand_summary。
+        progress_callback(rows) 於每批寫入後以該批涵蓋的原始列數呼叫。
+        """
+        imported_count = 0
+        updated_count = 0
+        stmt = cls._upsert_statement()
+        columns = ['order_id', 'part_number', 'required_quantity', 'required_date'] + cls.TEXT_COLUMNS
+
+        for start in range(0, len(frame), cls.UPSERT_CHUNK_SIZE):
+            chunk = frame.iloc[start:start + cls.UPSERT_CHUNK_SIZE]
+            keys = list(zip(chunk['order_id'], chunk['part_number']))
+            existing = cls._existing_quantities(keys)
+
+            is_new = [key not in existing for key in keys]
+            new_rows = int(sum(is_new))
+            imported_count += new_rows
+            updated_count += int(chunk['occurrences'].sum()) - new_rows
+
+            records = chunk[columns].to_dict('records')
+            db.session.execute(stmt, records)
+            PartDemandSummary.apply_deltas(cls._summary_deltas(
+                chunk['part_number'].tolist(),
+                [quantity - existing.get(key, 0.0) for key, quantity in zip(keys, chunk['required_quantity'])],
+                [int(flag) for flag in is_new],
+                chunk['material_description'].tolist()
+            ))
+            if progress_callback:
+                progress_callback(int(chunk['occurrences'].sum()))
+
+        return imported_count, updated_count
+
+    @classmethod
+    def delete_order_demands(cls, order_id):
+        """
+        刪除指定訂單的所有工單需求，並自 part_demand_summary 扣除對應數量。
+        Returns {'success': bool, 'deleted_count': int}，找不到訂單時 deleted_count 為 0
+        """
+        try:
+            rows = db.session.query(
+                WorkOrderDemand.part_number, WorkOrderDemand.required_quantity
+            ).filter(WorkOrderDemand.order_id == order_id).all()
+            if not rows:
+                return {'success': False, 'error': '找不到該訂單的工單需求', 'deleted_count': 0}
+
+            table = WorkOrderDemand.__table__
+            db.session.execute(table.delete().where(table.c.order_id == order_id))
+            PartDemandSummary.apply_deltas(cls._summary_deltas(
+                [row[0] for row in rows],
+                [-row[1] for row in rows],
+                [-1] * len(rows),
+                [''] * len(rows)
+            ))
+            db.session.commit()
+            return {'success': True, 'deleted_count': len(rows)}
+
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': f'刪除工單需求時發生錯誤: {str(e)}'}
+
+    @classmethod
+    def import_work_order_demands(cls, file_stream, progress_callback=None):
+        """
+        Handles the bulk import of work order demands from an Excel file.
+        Returns a dictionary with success status and imported/updated/filtered/error counts.
+        progress_callback(processed_rows, total_rows) is called as chunks are written.
+        """
+        try:
+            df = pd.read_excel(file_stream)
+
+            missing_columns = [col for col in cls.COLUMN_MAP.keys() if col not in df.columns]
+            if missing_columns:
+                return {'success': False, 'error': f'Excel 檔案缺少必要欄位: {", ".join(missing_columns)}'}
+
+            frame, errors, filtered_count = cls.normalize_dataframe(df)
+            error_count = len(errors)
+
+            total_rows = len(df)
+            processed = {'rows': error_count + filtered_count}
+
+            def report_chunk(rows):
+                processed['rows'] += rows
+                if progress_callback:
+                    progress_callback(processed['rows'], total_rows)
+
+            report_chunk(0)
+            imported_count, updated_count = cls.upsert_demands(frame, progress_callback=report_chunk)
+
+            db.session.commit()
+
+            return {
+                'success': True,
+                'imported_count': imported_count,
+                'updated_count': updated_count,
+                'error_count': error_count,
+                'errors': errors[:cls.MAX_ERROR_MESSAGES],
+                'filtered_count': filtered_count,
+                'total_processed': len(df)
+            }
+
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': f'匯入過程發生錯誤: {str(e)}'}
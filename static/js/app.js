@@ -197,6 +197,13 @@ function showSuccess(message, container) {
     }
 }
 
+// 跳脫 HTML 特殊字元，使用者輸入或資料庫內容放入 innerHTML 前使用
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML.replace(/"/g, '&quot;').replace(/'/g, '&#39;');
+}
+
 // 確認對話框
 function confirmAction(message, callback) {
     if (confirm(message)) {
@@ -319,6 +326,7 @@ window.AppUtils = {
     showLoading,
     showError,
     showSuccess,
+    escapeHtml,
     confirmAction,
     formatDate,
     formatNumber,
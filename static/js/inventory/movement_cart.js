@@ -0,0 +1,137 @@
+// 入出庫清單：將多筆明細暫存在頁面上，再透過 /api/inventory/movements/batch 一次送出
+const movementCart = [];
+
+// 讀取表單目前的明細並加入清單
+function addToCart() {
+    const partNumber = document.getElementById('part_number').value.trim();
+    const warehouseSelect = document.getElementById('warehouse_id');
+    const warehouseId = warehouseSelect.value;
+    const quantity = parseInt(document.getElementById('quantity').value) || 0;
+    const typeSelect = document.getElementById('transaction_type');
+    const transactionType = typeSelect.value;
+    const notes = document.getElementById('notes').value.trim();
+    const workOrderSelect = document.getElementById('work_order_id');
+    const reference = workOrderSelect && transactionType === 'OUT_WORK_ORDER' ? workOrderSelect.value : '';
+
+    if (!partNumber || !warehouseId || !quantity || !transactionType) {
+        alert('請填寫所有必填欄位');
+        return;
+    }
+
+    if (quantity <= 0) {
+        alert('數量必須大於0');
+        return;
+    }
+
+    if (transactionType === 'OUT_WORK_ORDER' && !reference) {
+        alert('工單領用必須選擇工單編號');
+        return;
+    }
+
+    movementCart.push({
+        part_number: partNumber,
+        part_name: document.getElementById('partNameDisplay').textContent,
+        warehouse_id: parseInt(warehouseId),
+        warehouse_label: warehouseSelect.options[warehouseSelect.selectedIndex].textContent,
+        qty: quantity,
+        type: transactionType,
+        type_label: typeSelect.options[typeSelect.selectedIndex].textContent,
+        reference: reference,
+        notes: notes
+    });
+
+    // 清空零件與數量，保留倉庫與類型方便連續掃描
+    document.getElementById('part_number').value = '';
+    document.getElementById('quantity').value = '';
+    document.getElementById('partNameDisplay').textContent = '';
+    document.getElementById('part_number').focus();
+
+    renderCart();
+}
+
+function removeFromCart(index) {
+    movementCart.splice(index, 1);
+    renderCart();
+}
+
+function clearCart() {
+    movementCart.length = 0;
+    renderCart();
+}
+
+// 重新繪製清單，errors 為各列的錯誤訊息（以列索引對應）
+function renderCart(errors = {}) {
+    const card = document.getElementById('cartCard');
+    const tbody = document.getElementById('cartTableBody');
+    document.getElementById('cartCount').textContent = movementCart.length;
+    card.style.display = movementCart.length ? 'block' : 'none';
+
+    tbody.innerHTML = '';
+    movementCart.forEach((line, index) => {
+        const row = document.createElement('tr');
+        if (errors[index]) {
+            row.classList.add('table-danger');
+        }
+        // 料號、品名、倉庫名稱、備註與錯誤訊息來自使用者輸入或資料庫，以 app.js 的 escapeHtml 跳脫
+        row.innerHTML = `
+            <td><strong>${escapeHtml(line.part_number)}</strong><br><small class="text-muted">${escapeHtml(line.part_name)}</small></td>
+            <td>${escapeHtml(line.warehouse_label)}</td>
+            <td>${line.qty}</td>
+            <td>${escapeHtml(line.type_label)}${line.reference ? `<br><small class="text-muted">${escapeHtml(line.reference)}</small>` : ''}
+                ${errors[index] ? `<br><small class="text-danger">${escapeHtml(errors[index])}</small>` : ''}</td>
+            <td>
+                <button type="button" class="btn btn-sm btn-outline-danger" onclick="removeFromCart(${index})">
+                    <i class="fas fa-trash"></i>
+                </button>
+            </td>
+        `;
+        tbody.appendChild(row);
+    });
+}
+
+// 整批送出，全部成功才會異動庫存
+async function submitCart() {
+    if (!movementCart.length) {
+        return;
+    }
+
+    const submitButton = document.getElementById('cartSubmitButton');
+    submitButton.disabled = true;
+
+    try {
+        const response = await fetch('/api/inventory/movements/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                lines: movementCart.map(line => ({
+                    part_number: line.part_number,
+                    warehouse_id: line.warehouse_id,
+                    qty: line.qty,
+                    type: line.type,
+                    reference: line.reference,
+                    notes: line.notes
+                }))
+            })
+        });
+        const data = await response.json();
+
+        if (data.success) {
+            alert(`已完成 ${movementCart.length} 筆異動`);
+            clearCart();
+        } else {
+            const errors = {};
+            (data.results || []).forEach(result => {
+                if (!result.success && result.error !== 'Rolled back') {
+                    errors[result.line] = result.error;
+                }
+            });
+            renderCart(errors);
+            alert(data.error || '整批異動失敗');
+        }
+    } catch (error) {
+        console.error('整批異動失敗:', error);
+        alert('整批異動失敗，請稍後再試');
+    } finally {
+        submitButton.disabled = false;
+    }
+}
@@ -17,9 +17,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 return;
             }
             
-            // I see a bug here, the API endpoint /api/parts/search does not exist.
-            // I will assume it should be /api/part/<part_number> or similar, but for now I will leave it as is.
-            fetch(`/api/parts/search?q=${encodeURIComponent(query)}`)
+            fetch(`/api/parts/search?q=${encodeURIComponent(query)}&limit=20`)
                 .then(response => response.json())
                 .then(data => {
                     searchResults.innerHTML = '';
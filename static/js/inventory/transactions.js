@@ -24,8 +24,8 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
-// 載入異動記錄
-function loadTransactions(page = 1) {
+// 載入異動記錄（cursor 為空時載入最新一頁）
+function loadTransactions(cursor = '', direction = 'next', extraParams = {}) {
     const filterForm = document.getElementById('filterForm');
     if (!filterForm) return;
 
@@ -37,7 +37,13 @@ function loadTransactions(page = 1) {
             params.append(key, value);
         }
     }
-    params.append('page', page);
+    if (cursor) {
+        params.append('cursor', cursor);
+        params.append('direction', direction);
+    }
+    for (const [key, value] of Object.entries(extraParams)) {
+        params.append(key, value);
+    }
     
     // 重新載入頁面
     if (typeof TRANSACTIONS_URL !== 'undefined') {
@@ -47,9 +53,17 @@ function loadTransactions(page = 1) {
     }
 }
 
-// 載入指定頁面
-function loadPage(page) {
-    loadTransactions(page);
+// 載入上一頁/下一頁
+function loadPage(cursor, direction) {
+    if (cursor) {
+        loadTransactions(cursor, direction);
+    }
+}
+
+// 重新載入目前頁面並顯示總筆數
+function loadTotal() {
+    const current = new URLSearchParams(window.location.search);
+    loadTransactions(current.get('cursor') || '', current.get('direction') || 'next', { count: '1' });
 }
 
 // 匯出異動記錄
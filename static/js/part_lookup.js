@@ -32,7 +32,11 @@ document.addEventListener('DOMContentLoaded', function () {
         console.log('📝 表單提交事件觸發');
         const partNumber = document.getElementById('partNumber').value.trim();
         console.log('🔍 查詢零件編號:', partNumber);
-        if (partNumber) {
+        if (partNumber && batchMode()) {
+            // 連續掃描模式下，條碼槍輸入也先暫存
+            bufferScan(partNumber);
+            document.getElementById('partNumber').value = '';
+        } else if (partNumber) {
             searchPart(partNumber);
         } else {
             console.warn('⚠️ 零件編號為空');
@@ -43,6 +47,29 @@ document.addEventListener('DOMContentLoaded', function () {
     let codeReader = null;
     let controls = null;
 
+    // 連續掃描：掃到的零件編號先暫存，最後以 POST /api/parts/lookup 一次查詢
+    const BATCH_LOOKUP_MAX = 200;  // 與 PartLookupService.MAX_BATCH_SIZE 相同
+    const DUPLICATE_SCAN_INTERVAL_MS = 2000;  // 相機持續對準同一條碼時，此時間內的重複結果忽略
+    let scanBuffer = [];
+    let lastScan = { text: null, at: 0 };
+
+    function batchMode() {
+        return document.getElementById('batchScanMode').checked;
+    }
+
+    document.getElementById('batchScanMode').addEventListener('change', function() {
+        document.getElementById('batch-scan-panel').style.display = this.checked ? 'block' : 'none';
+    });
+
+    document.getElementById('batchLookup').addEventListener('click', function() {
+        lookupBuffered();
+    });
+
+    document.getElementById('batchClear').addEventListener('click', function() {
+        scanBuffer = [];
+        renderScanBuffer();
+    });
+
     document.getElementById('toggleScanner').addEventListener('click', function() {
         startScanner();
     });
@@ -90,7 +117,18 @@ document.addEventListener('DOMContentLoaded', function () {
 
             // 使用 decodeFromVideoDevice 進行連續掃描
             controls = await codeReader.decodeFromVideoDevice(selectedDeviceId, 'scanner-video', (result, err) => {
-                if (result) {
+                if (result && batchMode()) {
+                    const now = Date.now();
+                    if (result.text !== lastScan.text || now - lastScan.at > DUPLICATE_SCAN_INTERVAL_MS) {
+                        bufferScan(result.text);
+                        status.textContent = `✅ 已加入：${result.text}（共 ${scanBuffer.length} 個）`;
+                        status.className = 'alert alert-success mt-2';
+                        if (navigator.vibrate) {
+                            navigator.vibrate(100);
+                        }
+                    }
+                    lastScan = { text: result.text, at: now };
+                } else if (result) {
                     console.log('✅ 掃描成功!', result.text);
                     status.textContent = `✅ 掃描成功！條碼: ${result.text}`;
                     status.className = 'alert alert-success mt-2';
@@ -136,6 +174,143 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
+    function bufferScan(partNumber) {
+        if (!scanBuffer.includes(partNumber)) {
+            scanBuffer.push(partNumber);
+        }
+        renderScanBuffer();
+        // 達到單次查詢上限時先送出
+        if (scanBuffer.length >= BATCH_LOOKUP_MAX) {
+            lookupBuffered();
+        }
+    }
+
+    function renderScanBuffer() {
+        document.getElementById('batchScanCount').textContent = scanBuffer.length;
+        document.getElementById('batchLookup').disabled = scanBuffer.length === 0;
+        // 條碼內容以 textContent 顯示，不當作 HTML 解讀
+        const list = document.getElementById('batchScanList');
+        list.replaceChildren(...scanBuffer.map(partNumber => {
+            const badge = document.createElement('span');
+            badge.className = 'badge bg-secondary me-1 mb-1';
+            badge.textContent = partNumber;
+            return badge;
+        }));
+    }
+
+    // 掃描或輸入的條碼與零件資料放入 HTML 前先跳脫
+    function escapeHtml(value) {
+        const div = document.createElement('div');
+        div.textContent = value == null ? '' : String(value);
+        return div.innerHTML.replace(/"/g, '&quot;').replace(/'/g, '&#39;');
+    }
+
+    // 批次查詢暫存的零件編號
+    function lookupBuffered() {
+        if (scanBuffer.length === 0) {
+            return;
+        }
+        const partNumbers = scanBuffer;
+        scanBuffer = [];
+        renderScanBuffer();
+
+        const loading = document.getElementById('loading');
+        const error = document.getElementById('error');
+        error.style.display = 'none';
+        loading.style.display = 'block';
+
+        fetch('/api/parts/lookup', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ part_numbers: partNumbers })
+        })
+            .then(response => response.json())
+            .then(data => {
+                loading.style.display = 'none';
+                if (data.error) {
+                    // 查詢失敗時放回暫存，可再次查詢
+                    scanBuffer = partNumbers.concat(scanBuffer.filter(partNumber => !partNumbers.includes(partNumber)));
+                    renderScanBuffer();
+                    showError(data.error);
+                } else {
+                    showBatchResults(data);
+                }
+            })
+            .catch(err => {
+                console.error('❌ 批次查詢錯誤:', err);
+                loading.style.display = 'none';
+                scanBuffer = partNumbers.concat(scanBuffer.filter(partNumber => !partNumbers.includes(partNumber)));
+                renderScanBuffer();
+                showError('網路錯誤：' + err.message);
+            });
+    }
+
+    function showBatchResults(data) {
+        const results = document.getElementById('results');
+        const rows = data.results.map(item => {
+            if (!item.found) {
+                return `
+                    <tr class="table-danger">
+                        <td>${escapeHtml(item.part_number)}</td>
+                        <td colspan="3" class="text-danger">找不到零件</td>
+                    </tr>
+                `;
+            }
+            const part = item.part_info;
+            const locationStr = part.locations.length > 0 ?
+                part.locations.map(loc => escapeHtml(`${loc.warehouse_name}:${loc.location_code}`)).join(', ') :
+                '<span class="text-muted">未設定</span>';
+            const stockStr = item.inventories.length > 0 ?
+                item.inventories.map(inv => escapeHtml(`${inv.warehouse_name}: ${inv.available_quantity || 0}`)).join('<br>') :
+                '<span class="text-muted">暫無庫存</span>';
+            return `
+                <tr class="batch-result-row" data-part-number="${escapeHtml(part.part_number)}" style="cursor: pointer;">
+                    <td>${escapeHtml(part.part_number)}</td>
+                    <td>${escapeHtml(part.name)}</td>
+                    <td>${locationStr}</td>
+                    <td>${stockStr}</td>
+                </tr>
+            `;
+        }).join('');
+
+        results.innerHTML = `
+            <div class="card mb-3">
+                <div class="card-header d-flex justify-content-between align-items-center">
+                    <h5 class="mb-0">批次查詢結果</h5>
+                    <span>
+                        共 ${data.results.length} 個零件
+                        ${data.not_found.length > 0 ? `<span class="badge bg-danger ms-2">${data.not_found.length} 個找不到</span>` : ''}
+                    </span>
+                </div>
+                <div class="card-body">
+                    <div class="table-responsive">
+                        <table class="table table-sm table-hover">
+                            <thead>
+                                <tr>
+                                    <th>零件編號</th>
+                                    <th>名稱</th>
+                                    <th>儲存位置</th>
+                                    <th>可用數量</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                ${rows}
+                            </tbody>
+                        </table>
+                    </div>
+                    <small class="text-muted">點選零件可查看訂購歷史等詳細資訊</small>
+                </div>
+            </div>
+        `;
+
+        results.querySelectorAll('.batch-result-row').forEach(row => {
+            row.addEventListener('click', () => searchPart(row.dataset.partNumber));
+        });
+        results.style.display = 'block';
+    }
+
     // 搜尋零件
     function searchPart(partNumber) {
         console.log('🔍 開始搜尋零件:', partNumber);
@@ -229,6 +229,7 @@ function renderShortageTable() {
             <td class="text-end">${item.total_stock.toLocaleString()}</td>
             <td class="text-end">${item.available_stock.toLocaleString()}</td>
             <td class="text-end text-danger"><strong>${item.shortage.toLocaleString()}</strong></td>
+            <td>${item.first_shortage_date || '-'}</td>
             <td class="text-end text-info"><strong>${suggestedOrder.toLocaleString()}</strong></td>
             <td class="text-end">${item.order_count}</td>
             <td>
@@ -1,5 +1,5 @@
 // Service Worker for PWA support
-const CACHE_NAME = 'inventory-management-v1';
+const CACHE_NAME = 'inventory-management-v2';
 const urlsToCache = [
   '/',
   '/static/css/style.css',
@@ -25,6 +25,11 @@ self.addEventListener('install', function(event) {
 
 // 攔截網路請求
 self.addEventListener('fetch', function(event) {
+  // API 回應不放入 Service Worker 快取，交由瀏覽器依 ETag / Cache-Control 向伺服器確認
+  if (new URL(event.request.url).pathname.startsWith('/api/')) {
+    return;
+  }
+
   event.respondWith(
     caches.match(event.request)
       .then(function(response) {